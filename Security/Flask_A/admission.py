@@ -0,0 +1,9 @@
+# admission.py
+# 제한 구현은 common/admission.py. 여기서는 A의 단계와 기본값만 정한다
+import shared_path  # noqa: F401
+from common.admission import Saturated, stage_limit  # noqa: F401
+
+# 동시에 압축을 풀 작업 수 / Semgrep을 돌릴 작업 수 (작업 하나가 SEMGREP_WORKERS개 프로세스를 쓴다)
+EXTRACT = stage_limit("extract", 4, 16)
+SEMGREP = stage_limit("semgrep", 2, 16)
+STAGES = (EXTRACT, SEMGREP)
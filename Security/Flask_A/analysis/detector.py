@@ -1,12 +1,40 @@
 import os
+import time
 import subprocess
 import json
-from .file_finder import find_source_files
+import tempfile
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .file_finder import (
+    scan_source_files, EXTENSION_LANGUAGES, IGNORED_DIRS, SCAN_IGNORE, SCAN_MAX_FILE_BYTES,
+)
+from .rules import resolve_ruleset
 from .formatter import format_semgrep_results
+from .issue import Issue
+from .findings_cache import get_cache, semgrep_version, file_digest, make_key
 
-SEMGREP_TIMEOUT = 60  # 전체 분석 여유 시간
+# Semgrep 실행 1회 제한 시간(초) = SEMGREP_TIMEOUT + 대상 MB당 SEMGREP_TIMEOUT_PER_MB.
+# grouped 모드는 언어 하나를 통째로 한 번에 돌리므로 고정값이면 큰 저장소에서 언어 전체가 한꺼번에 실패한다
+SEMGREP_TIMEOUT = float(os.environ.get("SEMGREP_TIMEOUT", "60"))
+SEMGREP_TIMEOUT_PER_MB = float(os.environ.get("SEMGREP_TIMEOUT_PER_MB", "30"))
 MAX_CMD_LENGTH = 8000  # Windows 경로 길이 제한
 
+# Semgrep 룰 설정. auto는 레지스트리 룰이 바뀔 수 있으니 SEMGREP_RULESET_TAG로 캐시를 갈아엎을 수 있다
+SEMGREP_CONFIG = os.environ.get("SEMGREP_CONFIG", "auto")
+SEMGREP_RULESET_TAG = os.environ.get("SEMGREP_RULESET_TAG", "")
+
+# 병렬 모드: 동시에 실행할 Semgrep 배치 수 (1이면 기존처럼 순차 실행)
+SEMGREP_WORKERS = int(os.environ.get("SEMGREP_WORKERS", "1"))
+# 전체 배치에 걸친 총 제한 시간(초). 0이면 배치별 SEMGREP_TIMEOUT만 적용
+SEMGREP_TOTAL_TIMEOUT = float(os.environ.get("SEMGREP_TOTAL_TIMEOUT", "0"))
+
+# batch: 경로 목록을 argv에 실어 MAX_CMD_LENGTH 단위로 실행 (기존 동작)
+# grouped: 언어 그룹당 프로세스 하나. 그룹 전체가 대상이면 디렉토리 + --include 필터로 실행
+SEMGREP_INVOCATION = os.environ.get("SEMGREP_INVOCATION", "batch").lower()
+# 빈 디렉토리 스캔으로 프로세스당 고정 비용(기동 + 룰 해석)을 한 번 측정해 통계에 남긴다.
+# semgrep을 한 번 더 띄우고 레지스트리 룰이면 네트워크도 쓰므로 기본은 끔
+SEMGREP_MEASURE_OVERHEAD = os.environ.get("SEMGREP_MEASURE_OVERHEAD", "0") not in ("0", "false", "off")
+
 def split_file_list(file_paths, max_length):
     """
     경로 총합이 max_length보다 넘지 않도록 분할
@@ -25,39 +53,317 @@ def split_file_list(file_paths, max_length):
         batches.append(current_batch)
     return batches
 
-def analyze_project(project_path):
-    # 🔍 모든 코드 파일 수집
-    files_by_ext = find_source_files(project_path)
+def _semgrep_cmd(targets, workers, ruleset):
+    cmd = ["semgrep", "--config", ruleset["config"]]
+    if ruleset["local"]:
+        # 로컬 룰은 레지스트리 조회가 필요 없으므로 네트워크 전송도 끈다 (auto는 metrics가 필요)
+        cmd += ["--metrics", "off"]
+    if workers > 1:
+        # 배치끼리 코어를 나눠 쓰도록 프로세스당 병렬도를 낮춘다
+        cmd += ["--jobs", str(max(1, (os.cpu_count() or 1) // workers))]
+    return [*cmd, *targets, "--json"]
+
+@lru_cache(maxsize=None)
+def startup_overhead(config, local):
+    """
+    대상 파일 없이 semgrep 한 번 실행에 걸리는 시간(초) = 실행 1회당 고정 비용. 실패하면 None
+    """
+    ruleset = {"config": config, "local": local}
+    with tempfile.TemporaryDirectory() as empty:
+        started = time.monotonic()
+        try:
+            subprocess.run(_semgrep_cmd([empty], 1, ruleset), capture_output=True, text=True,
+                           encoding="utf-8", timeout=SEMGREP_TIMEOUT)
+        except Exception as e:
+            print(f"[Semgrep] 기동 비용 측정 실패 → {e}")
+            return None
+        return round(time.monotonic() - started, 3)
+
+def invocation_timeout(files):
+    """대상 파일 크기에 비례한 실행 1회 제한 시간(초)"""
+    size = 0
+    for path in files:
+        try:
+            size += os.path.getsize(path)
+        except OSError:
+            pass
+    return SEMGREP_TIMEOUT + SEMGREP_TIMEOUT_PER_MB * size / (1024 * 1024)
+
+def _language(path):
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    return EXTENSION_LANGUAGES.get(ext, ext)
+
+def _directory_filters():
+    args = ["--max-target-bytes", str(SCAN_MAX_FILE_BYTES)] if SCAN_MAX_FILE_BYTES else []
+    for name in sorted(IGNORED_DIRS) + list(SCAN_IGNORE):
+        args += ["--exclude", name]
+    return args
+
+def plan_invocations(targets, all_files, project_path, mode=None):
+    """
+    → [{"label", "files", "targets", "only"}] Semgrep 실행 계획.
+    only: 디렉토리 스캔일 때 결과를 남길 상대 경로 집합 (탐색 단계에서 뺀 파일은 버린다)
+    """
+    mode = (mode or SEMGREP_INVOCATION).lower()
+    if mode != "grouped":
+        return [{"label": "batch", "files": batch, "targets": batch, "only": None}
+                for batch in split_file_list(targets, MAX_CMD_LENGTH)]
+
+    by_lang, totals = {}, {}
+    for path in targets:
+        by_lang.setdefault(_language(path), []).append(path)
+    for path in all_files:
+        lang = _language(path)
+        totals[lang] = totals.get(lang, 0) + 1
+
+    plan = []
+    for lang, files in sorted(by_lang.items()):
+        if len(files) == totals[lang]:
+            # 그룹 전체가 대상(캐시 적중 없음) → 경로 목록 대신 include 필터 한 번
+            includes = sorted({"*" + os.path.splitext(p)[1] for p in files})
+            args = [a for pattern in includes for a in ("--include", pattern)]
+            plan.append({
+                "label": lang, "files": files,
+                "targets": [*args, *_directory_filters(), project_path],
+                "only": {_rel(p, project_path) for p in files},
+            })
+        else:
+            for batch in split_file_list(files, MAX_CMD_LENGTH):
+                plan.append({"label": lang, "files": batch, "targets": batch, "only": None})
+    return plan
+
+def _run_batch(index, total, invocation, project_path, workers, deadline, ruleset):
+    """
+    실행 계획 하나를 실행하고 (issues, stat, error_paths) 반환. 예외는 stat에 기록하고 삼킨다.
+    error_paths: Semgrep이 오류를 보고한 파일(캐시에 넣지 않는다)
+    """
+    batch = invocation["files"]
+    stat = {
+        "batch": index + 1,
+        "label": invocation["label"],
+        "scope": "files" if invocation["only"] is None else "directory",
+        "files": len(batch),
+        "findings": 0,
+        "wall_time": 0.0,
+        "timeout": None,
+        "failed": False,
+        "error": None,
+    }
+    issues = []
+    error_paths = set()
+    started = time.monotonic()
+
+    timeout = invocation_timeout(batch)
+    if deadline is not None:
+        timeout = min(timeout, deadline - started)
+
+    if timeout <= 0:
+        stat["failed"] = True
+        stat["error"] = "total timeout exceeded before start"
+        print(f"[건너뜀] batch {index+1}: 총 제한 시간 초과")
+        return issues, stat, error_paths
+    stat["timeout"] = round(timeout, 1)
+
+    print(f"[Semgrep 실행] Batch {index+1}/{total} ({invocation['label']}): {len(batch)} files")
+    try:
+        completed = subprocess.run(
+            _semgrep_cmd(invocation["targets"], workers, ruleset),
+            capture_output=True,
+            text=True,
+            encoding="utf-8",  # ✅ CP949 에러 방지
+            timeout=timeout
+        )
+        if completed.returncode == 0:
+            json_output = json.loads(completed.stdout)
+            issues = format_semgrep_results(json_output, project_path)
+            if invocation["only"] is not None:
+                issues = [i for i in issues if i.path in invocation["only"]]
+            for err in json_output.get("errors", []):
+                if err.get("path"):
+                    error_paths.add(os.path.normpath(err["path"]))
+        else:
+            stat["failed"] = True
+            stat["error"] = completed.stderr.strip()
+            print(f"[실패] batch {index+1}: {stat['error']}")
+    except subprocess.TimeoutExpired:
+        stat["failed"] = True
+        stat["error"] = f"timeout after {round(timeout, 1)}s"
+        print(f"[시간 초과] batch {index+1}: {stat['error']}")
+    except Exception as e:
+        stat["failed"] = True
+        stat["error"] = f"{type(e).__name__}: {e}"
+        print(f"[에러] batch {index+1}: {e}")
+
+    stat["findings"] = len(issues)
+    stat["wall_time"] = round(time.monotonic() - started, 3)
+    return issues, stat, error_paths
+
+def _rel(path, project_path):
+    return os.path.relpath(path, project_path).replace("\\", "/")
+
+def _lookup_cache(cache, all_files, ruleset, version):
+    """
+    캐시 조회 → (hits, misses, keys). hits: {파일 경로: path를 뺀 issues}
+    """
+    keys = {}
+    for path in all_files:
+        try:
+            keys[path] = make_key(file_digest(path), path, ruleset, version)
+        except OSError as e:
+            print(f"[캐시] 해시 실패 {path} → {e}")
+    found = cache.get_many(keys.values())
+    hits, misses = {}, []
+    for path in all_files:
+        key = keys.get(path)
+        if key is not None and key in found:
+            hits[path] = found[key]
+        else:
+            misses.append(path)
+    return hits, misses, keys
+
+def discover_files(project_path):
+    """분석 대상 파일 목록(절대 경로)과 탐색 통계"""
+    files_by_ext, discovery = scan_source_files(project_path)
     all_files = []
     for ext_files in files_by_ext.values():
         all_files.extend(ext_files)
+    print(f"[파일 탐색] {discovery['files']}개 {discovery['bytes']} bytes, "
+          f"건너뜀 {discovery['skipped_bytes']} bytes, 제외 디렉토리 {discovery['pruned_dirs']}개")
+    return all_files, discovery
+
+def _cache_entries(batch, issues, error_paths, keys, project_path):
+    """끝난 배치 하나 → 캐시에 넣을 (키, path를 뺀 issues). 결과가 없는 파일도 빈 목록으로 넣는다"""
+    by_path = {}
+    for issue in issues:
+        by_path.setdefault(issue.path, []).append(issue.to_dict(path=False))
+    entries = []
+    for path in batch:
+        if path in keys and os.path.normpath(path) not in error_paths:
+            entries.append((keys[path], by_path.get(_rel(path, project_path), [])))
+    return entries
+
+def iter_findings(project_path, files, stats, workers=None, total_timeout=None, use_cache=True):
+    """
+    결과를 준비되는 대로 청크(list)로 내보내는 제너레이터.
+    캐시 적중 파일이 먼저 나오고, 이후 Semgrep 배치가 끝나는 순서대로 나온다 (순서는 실행마다 다를 수 있음).
+    stats: 호출자가 넘긴 dict. 제너레이터가 끝나면 배치별 통계 등이 채워진다
+    """
+    workers = max(1, workers or SEMGREP_WORKERS)
+    if total_timeout is None:
+        total_timeout = SEMGREP_TOTAL_TIMEOUT
+
+    started = time.monotonic()
+    deadline = started + total_timeout if total_timeout else None
+    all_files = list(files)
+    stats.update(workers=workers, total_files=len(all_files), batches=[])
 
     if not all_files:
         print("[!] 분석할 소스 파일이 없습니다.")
-        return []
+        stats["failed_batches"] = 0
+        stats["wall_time"] = round(time.monotonic() - started, 3)
+        return
 
-    results = []
+    # 📜 룰셋: 로컬 고정 팩이면 그 버전이 캐시 키에 들어간다
+    ruleset = resolve_ruleset(SEMGREP_CONFIG)
+    stats["ruleset"] = {"config": ruleset["config"], "version": ruleset["version"]}
 
-    # 📦 Batch로 나눠서 Semgrep 실행
-    batches = split_file_list(all_files, MAX_CMD_LENGTH)
+    # 💾 캐시 적중 파일은 이전 결과 재사용, 미스만 Semgrep으로
+    cache = get_cache() if use_cache else None
+    hits, targets, keys = {}, all_files, {}
+    if cache is not None:
+        ruleset_id = ruleset["id"] or f"{SEMGREP_CONFIG}:{SEMGREP_RULESET_TAG}"
+        hits, targets, keys = _lookup_cache(cache, all_files, ruleset_id, semgrep_version())
+        stats["cache"] = {"hits": len(hits), "misses": len(targets)}
+        print(f"[캐시] 적중 {len(hits)}개 / 미스 {len(targets)}개")
 
-    for i, batch in enumerate(batches):
-        print(f"[Semgrep 실행] Batch {i+1}/{len(batches)}: {len(batch)} files")
-        try:
-            completed = subprocess.run(
-                ["semgrep", "--config", "auto", *batch, "--json"],
-                capture_output=True,
-                text=True,
-                encoding="utf-8",  # ✅ CP949 에러 방지
-                timeout=SEMGREP_TIMEOUT
-            )
-            if completed.returncode == 0:
-                json_output = json.loads(completed.stdout)
-                results.extend(format_semgrep_results(json_output, project_path))
-            else:
-                print(f"[실패] batch {i+1}: {completed.stderr.strip()}")
-        except Exception as e:
-            print(f"[에러] batch {i+1}: {e}")
+    cached = []
+    for path, issues in hits.items():
+        rel = _rel(path, project_path)
+        cached.extend(Issue.from_dict(i, path=rel) for i in issues)
+    if cached:
+        yield cached
+
+    # 📦 실행 계획(배치 또는 언어 그룹)대로 Semgrep 실행
+    plan = plan_invocations(targets, all_files, project_path)
+    args = [(i, len(plan), inv, project_path, workers, deadline, ruleset) for i, inv in enumerate(plan)]
+    overhead = (startup_overhead(ruleset["config"], ruleset["local"])
+                if plan and SEMGREP_MEASURE_OVERHEAD else None)
+    stats["invocations"] = {
+        "mode": SEMGREP_INVOCATION,
+        "count": len(plan),
+        "startup_overhead": overhead,
+        "estimated_overhead": round(overhead * len(plan), 3) if overhead is not None else None,
+    }
+
+    batch_stats = [None] * len(plan)
+    to_store = []
+
+    def finished(index, outcome):
+        issues, stat, error_paths = outcome
+        batch_stats[index] = stat
+        if cache is not None and not stat["failed"]:
+            to_store.extend(_cache_entries(plan[index]["files"], issues, error_paths, keys, project_path))
+        return issues
+
+    pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 and len(plan) > 1 else None
+    try:
+        if pool is None:
+            for a in args:
+                issues = finished(a[0], _run_batch(*a))
+                if issues:
+                    yield issues
+        else:
+            futures = {pool.submit(_run_batch, *a): a[0] for a in args}
+            for future in as_completed(futures):
+                issues = finished(futures[future], future.result())
+                if issues:
+                    yield issues
+    finally:
+        # 소비자가 중간에 끊어도(클라이언트 연결 종료 등) 끝난 배치 결과는 캐시에 남긴다
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        if cache is not None:
+            try:
+                cache.put_many(to_store)
+            except Exception as e:
+                print(f"[캐시] 저장 실패 → {e}")
+            stats["cache"]["store"] = cache.stats()
+        stats["batches"] = [s for s in batch_stats if s is not None]
+        stats["failed_batches"] = sum(1 for s in stats["batches"] if s["failed"])
+        stats["wall_time"] = round(time.monotonic() - started, 3)
+
+def analyze_project(project_path, workers=None, total_timeout=None, return_stats=False, use_cache=True,
+                    files=None):
+    """
+    files: 미리 탐색한 대상 파일(절대 경로) 목록. 주면 탐색을 건너뛰고 이 파일만 분석 (증분 스캔)
+    workers: 동시에 실행할 배치 수 (기본 SEMGREP_WORKERS)
+    total_timeout: 전체 배치 제한 시간(초, 기본 SEMGREP_TOTAL_TIMEOUT)
+    use_cache: 내용 해시 캐시에 적중한 파일은 Semgrep을 돌리지 않고 이전 결과를 재사용
+    return_stats=True면 (results, stats) 반환. stats["batches"]에 배치별 통계,
+    stats["cache"]에 적중/미스 수가 담긴다.
+    """
+    # 🔍 모든 코드 파일 수집
+    discovery = None
+    if files is None:
+        files, discovery = discover_files(project_path)
+
+    stats = {}
+    if discovery is not None:
+        stats["discovery"] = discovery
+
+    # 파일 단위로 모은 뒤 원래 파일 순서대로 병합 → 배치 완료 순서/캐시 사용 여부와 무관하게 순서가 같다
+    per_file = {}
+    for chunk in iter_findings(project_path, files, stats, workers, total_timeout, use_cache):
+        for issue in chunk:
+            per_file.setdefault(issue.path, []).append(issue)
+
+    results = []
+    for path in files:
+        results.extend(per_file.pop(_rel(path, project_path), []))
+    for rel in sorted(per_file):
+        results.extend(per_file[rel])
 
-    print(f"[분석 완료] 총 발견된 취약점: {len(results)}개")
-    return results
+    if stats["total_files"]:
+        print(f"[분석 완료] 총 발견된 취약점: {len(results)}개 "
+              f"(배치 {len(stats['batches'])}개, 실패 {stats['failed_batches']}개, {stats['wall_time']}s)")
+    return (results, stats) if return_stats else results
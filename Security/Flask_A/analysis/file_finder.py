@@ -1,25 +1,232 @@
 import os
+import re
+import fnmatch
 
-def find_source_files(directory, extensions=None):
-    if extensions is None:
-        # Semgrep 지원 언어 확장자 전체 목록
-        extensions = [
-            ".py", ".java", ".js", ".jsx", ".ts", ".tsx", ".go", ".rb", ".php",
-            ".c", ".cpp", ".cs", ".kt", ".kts", ".swift", ".scala",
-            ".html", ".vue", ".json", ".yaml", ".yml", ".xml",
-            ".jsp", ".jspf", ".pl", ".rs", ".rkt", ".dart"
-        ]
+# Semgrep 지원 언어 확장자 전체 목록
+SOURCE_EXTENSIONS = (
+    ".py", ".java", ".js", ".jsx", ".ts", ".tsx", ".go", ".rb", ".php",
+    ".c", ".cpp", ".cs", ".kt", ".kts", ".swift", ".scala",
+    ".html", ".vue", ".json", ".yaml", ".yml", ".xml",
+    ".jsp", ".jspf", ".pl", ".rs", ".rkt", ".dart"
+)
+
+# 언어별 집계용 (없는 확장자는 확장자 이름 그대로)
+EXTENSION_LANGUAGES = {
+    "py": "python", "java": "java", "js": "javascript", "jsx": "javascript",
+    "ts": "typescript", "tsx": "typescript", "go": "go", "rb": "ruby", "php": "php",
+    "c": "c", "cpp": "cpp", "cs": "csharp", "kt": "kotlin", "kts": "kotlin",
+    "swift": "swift", "scala": "scala", "html": "html", "vue": "vue", "json": "json",
+    "yaml": "yaml", "yml": "yaml", "xml": "xml", "jsp": "jsp", "jspf": "jsp",
+    "pl": "perl", "rs": "rust", "rkt": "racket", "dart": "dart",
+}
+
+# 분석 대상이 아닌 디렉토리 (의존성, VCS 메타데이터, 빌드 산출물)
+IGNORED_DIRS = frozenset({
+    ".git", ".hg", ".svn", "node_modules", "bower_components", "vendor",
+    "dist", "build", "target", "__pycache__", ".venv", "venv", ".tox",
+    ".mypy_cache", ".pytest_cache", ".gradle", ".idea", ".next", "coverage",
+})
+
+# 추가 무시 패턴 (쉼표 구분, 디렉토리/파일 이름 또는 상대 경로에 fnmatch). 예: "fixtures,*.generated.*,docs/api"
+SCAN_IGNORE = tuple(p.strip().strip("/") for p in os.environ.get("SCAN_IGNORE", "").split(",") if p.strip())
+SCAN_GITIGNORE = os.environ.get("SCAN_GITIGNORE", "1") not in ("0", "false", "off")
+SCAN_MAX_FILE_BYTES = int(float(os.environ.get("SCAN_MAX_FILE_KB", "1024")) * 1024)
+SCAN_SKIP_MINIFIED = os.environ.get("SCAN_SKIP_MINIFIED", "1") not in ("0", "false", "off")
+
+SNIFF_BYTES = 8192
+# 스니프 블록의 평균 줄 길이가 이보다 길면 압축(minified)/생성 파일로 본다
+MINIFIED_LINE_LENGTH = 500
+MINIFIED_NAME = re.compile(r"[.-]min\.[^.]+$|\.bundle\.js$|\.chunk\.js$", re.IGNORECASE)
+
+def is_ignored_dir(name, rel_path=None):
+    """기본 무시 디렉토리 또는 SCAN_IGNORE 패턴에 걸리면 True"""
+    if name in IGNORED_DIRS:
+        return True
+    return _matches_extra(name, rel_path)
+
+def _matches_extra(name, rel_path):
+    for pattern in SCAN_IGNORE:
+        if fnmatch.fnmatch(name, pattern) or (rel_path and fnmatch.fnmatch(rel_path, pattern)):
+            return True
+    return False
+
+def _glob_to_regex(pattern):
+    """gitignore 글롭 → 정규식 ('*'는 '/'를 넘지 않고 '**'는 넘는다)"""
+    out, i = [], 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            out.append("/.*")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        elif pattern[i] == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape("["))
+                i += 1
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = end + 1
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    return re.compile("".join(out) + r"\Z")
+
+def parse_gitignore(path, base):
+    """
+    .gitignore → [(base, regex, negate, dir_only, anchored)] 규칙 목록.
+    base: 이 .gitignore가 있는 디렉토리의 스캔 루트 기준 상대 경로 ("" = 루트)
+    """
+    rules = []
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return rules
+    for line in lines:
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        elif line.startswith("\\"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        # 중간에 '/'가 있거나 '/'로 시작하면 .gitignore 위치 기준, 아니면 어느 깊이의 이름에도 적용
+        anchored = "/" in line
+        line = line.lstrip("/")
+        if not line:
+            continue
+        rules.append((base, _glob_to_regex(line), negate, dir_only, anchored))
+    return rules
+
+def gitignored(rules, rel_path, is_dir):
+    """마지막으로 맞는 규칙이 이긴다 (! 규칙은 다시 포함)"""
+    ignored = False
+    name = rel_path.rsplit("/", 1)[-1]
+    for base, regex, negate, dir_only, anchored in rules:
+        if dir_only and not is_dir:
+            continue
+        if base:
+            if not rel_path.startswith(base + "/"):
+                continue
+            sub = rel_path[len(base) + 1:]
+        else:
+            sub = rel_path
+        if regex.match(sub if anchored else name):
+            ignored = not negate
+    return ignored
+
+def sniff_file(path, name):
+    """
+    파일 앞부분만 읽어 분석 제외 사유 판정: "binary" | "minified" | None
+    """
+    try:
+        with open(path, "rb") as f:
+            block = f.read(SNIFF_BYTES)
+    except OSError:
+        return "unreadable"
+    if b"\0" in block:
+        return "binary"
+    if SCAN_SKIP_MINIFIED:
+        if MINIFIED_NAME.search(name):
+            return "minified"
+        if len(block) >= SNIFF_BYTES // 2 and len(block) // (block.count(b"\n") + 1) > MINIFIED_LINE_LENGTH:
+            return "minified"
+    return None
+
+def _skip(stats, reason, size):
+    bucket = stats["skipped"].setdefault(reason, {"files": 0, "bytes": 0})
+    bucket["files"] += 1
+    bucket["bytes"] += size
+    stats["skipped_bytes"] += size
+
+def scan_source_files(directory, extensions=None, max_file_bytes=None):
+    """
+    os.scandir 기반 탐색. 무시 디렉토리/SCAN_IGNORE/.gitignore에 걸린 디렉토리는 내려가지 않고,
+    크기 초과·압축(minified)·바이너리 파일은 건너뛴다.
+    반환: (확장자별 경로 목록, 통계). 통계에는 언어별 파일 수와 사유별 건너뛴 파일/바이트가 담긴다
+    """
+    extensions = frozenset(e.lower() for e in (extensions or SOURCE_EXTENSIONS))
+    max_file_bytes = SCAN_MAX_FILE_BYTES if max_file_bytes is None else max_file_bytes
 
     files_by_extension = {}
+    stats = {"files": 0, "bytes": 0, "languages": {}, "pruned_dirs": 0, "skipped": {}, "skipped_bytes": 0}
+
+    # (절대 경로, 루트 기준 상대 경로, 누적 gitignore 규칙)
+    stack = [(directory, "", [])]
+    while stack:
+        path, rel_dir, rules = stack.pop()
+        try:
+            with os.scandir(path) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+
+        if SCAN_GITIGNORE and any(e.name == ".gitignore" for e in entries):
+            rules = rules + parse_gitignore(os.path.join(path, ".gitignore"), rel_dir)
+
+        subdirs = []
+        for entry in entries:
+            rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_dir:
+                if is_ignored_dir(entry.name, rel) or (rules and gitignored(rules, rel, True)):
+                    stats["pruned_dirs"] += 1
+                else:
+                    subdirs.append((entry.path, rel, rules))
+                continue
 
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            ext = os.path.splitext(file)[1].lower()
-            if ext in extensions:
-                full_path = os.path.join(root, file)
-                ext_key = ext.lstrip(".")
-                if ext_key not in files_by_extension:
-                    files_by_extension[ext_key] = []
-                files_by_extension[ext_key].append(full_path)
-
-    return files_by_extension
+            ext = os.path.splitext(entry.name)[1].lower()
+            if ext not in extensions:
+                continue
+            try:
+                size = entry.stat().st_size
+            except OSError:
+                continue
+            if _matches_extra(entry.name, rel):
+                _skip(stats, "ignored", size)
+                continue
+            if rules and gitignored(rules, rel, False):
+                _skip(stats, "gitignore", size)
+                continue
+            if max_file_bytes and size > max_file_bytes:
+                _skip(stats, "too_large", size)
+                continue
+            reason = sniff_file(entry.path, entry.name)
+            if reason:
+                _skip(stats, reason, size)
+                continue
+
+            ext_key = ext.lstrip(".")
+            files_by_extension.setdefault(ext_key, []).append(entry.path)
+            lang = EXTENSION_LANGUAGES.get(ext_key, ext_key)
+            stats["languages"][lang] = stats["languages"].get(lang, 0) + 1
+            stats["files"] += 1
+            stats["bytes"] += size
+
+        # 스택이므로 역순으로 넣어야 이름순으로 내려간다
+        stack.extend(reversed(subdirs))
+
+    return files_by_extension, stats
+
+def find_source_files(directory, extensions=None):
+    return scan_source_files(directory, extensions)[0]
@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import subprocess
+from functools import lru_cache
+
+# 캐시 포맷이 바뀌면 올려서 기존 항목을 무효화 (2: extra를 보고서에 쓰는 필드만 남긴 발견)
+CACHE_SCHEMA = 2
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "findings.sqlite"
+)
+CACHE_PATH = os.environ.get("SEMGREP_CACHE_PATH", DEFAULT_CACHE_PATH)
+CACHE_MAX_BYTES = int(float(os.environ.get("SEMGREP_CACHE_MAX_MB", "512")) * 1024 * 1024)
+CACHE_ENABLED = os.environ.get("SEMGREP_CACHE", "1") not in ("0", "false", "off")
+
+@lru_cache(maxsize=None)
+def semgrep_version():
+    """
+    설치된 semgrep 버전 (캐시 키에 포함). 확인 불가하면 None → 캐시 비활성
+    """
+    try:
+        completed = subprocess.run(
+            ["semgrep", "--version"], capture_output=True, text=True, encoding="utf-8", timeout=30
+        )
+        if completed.returncode == 0:
+            return completed.stdout.strip() or None
+    except Exception as e:
+        print(f"[캐시] semgrep 버전 확인 실패 → {e}")
+    return None
+
+def file_digest(file_path, chunk_size=1024 * 1024):
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def make_key(content_hash, file_path, ruleset, version):
+    """
+    내용 해시 + 확장자(언어 결정) + 룰셋 + semgrep 버전 → 캐시 키
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    raw = f"{CACHE_SCHEMA}\0{content_hash}\0{ext}\0{ruleset}\0{version}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class FindingsCache:
+    """
+    파일 단위 Semgrep 결과 캐시 (SQLite). 총 크기가 max_bytes를 넘으면
+    마지막 접근 시각이 오래된 항목부터 지운다(LRU).
+    저장되는 이슈에는 path가 없다 — 같은 내용이 다른 경로에 있어도 재사용된다.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = self.misses = self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS findings ("
+                " key TEXT PRIMARY KEY, issues TEXT NOT NULL,"
+                " size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_findings_access ON findings(last_access)"
+            )
+
+    def get_many(self, keys):
+        """
+        {key: issues} (적중한 것만). 적중 항목은 접근 시각을 갱신한다.
+        """
+        found = {}
+        keys = list(dict.fromkeys(keys))
+        with self._lock, self._conn:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, issues FROM findings WHERE key IN ({marks})", chunk
+                ).fetchall()
+                for key, issues in rows:
+                    found[key] = json.loads(issues)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE findings SET last_access = ? WHERE key = ?",
+                    [(now, k) for k in found],
+                )
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        """
+        items: [(key, issues)]
+        """
+        if not items:
+            return
+        now = time.time()
+        rows = []
+        for key, issues in items:
+            blob = json.dumps(issues, ensure_ascii=False, separators=(",", ":"))
+            rows.append((key, blob, len(blob.encode("utf-8")), now))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO findings (key, issues, size, last_access) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._evict()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM findings").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        victims, freed = [], 0
+        for key, size in self._conn.execute("SELECT key, size FROM findings ORDER BY last_access"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM findings WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM findings"
+            ).fetchone()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": entries,
+                "bytes": size,
+                "max_bytes": self.max_bytes,
+            }
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """
+    프로세스 공용 캐시 인스턴스. 비활성화되어 있거나 semgrep 버전을 모르면 None
+    """
+    global _cache
+    if not CACHE_ENABLED or semgrep_version() is None:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = FindingsCache()
+            except Exception as e:
+                print(f"[캐시] 초기화 실패 → {e}")
+                return None
+        return _cache
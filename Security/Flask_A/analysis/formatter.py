@@ -1,19 +1,81 @@
 import os
-import json
+import re
+import mmap
+from array import array
 
-def get_line_content(file_path, line_number):
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-        return lines[line_number - 1].strip() if 0 < line_number <= len(lines) else ""
-    except UnicodeDecodeError:
+from .issue import Issue, compact_metadata
+
+# 줄 끝: \r\n을 하나로, 홀로 있는 \r이나 \n도 한 줄로
+_NEWLINE = re.compile(rb"\r\n|\r|\n")
+
+class LineIndex:
+    """
+    파일을 mmap으로 열고 줄 시작 오프셋만 색인 → 임의의 줄을 O(1)로 꺼낸다.
+    파일 내용은 메모리에 올리지 않으므로 큰 파일(번들 JS 등)도 메모리 사용량이 일정하다.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._file = open(file_path, "rb")
+        self._mm = None
+        self._offsets = array("Q", [0])
         try:
-            with open(file_path, "r", encoding="ISO-8859-1") as f:
-                lines = f.readlines()
-            return lines[line_number - 1].strip() if 0 < line_number <= len(lines) else ""
-        except Exception as e:
-            print(f"[Latin-1 디코딩 실패] {file_path} → {e}")
+            self._build()
+        except BaseException:
+            # mmap/fstat 실패 시 열어 둔 파일을 닫는다 (with 블록에 들어가기 전이라 __exit__이 불리지 않는다)
+            self.close()
+            raise
+
+    def _build(self):
+        size = os.fstat(self._file.fileno()).st_size
+        if size == 0:
+            return
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm.find(b"\r") == -1:
+            find = self._mm.find
+            pos = find(b"\n")
+            while pos != -1:
+                self._offsets.append(pos + 1)
+                pos = find(b"\n", pos + 1)
+        else:
+            # 예전 텍스트 모드 readlines()처럼 \r\n, \n, \r(옛 Mac) 모두 줄 끝으로 본다
+            self._offsets.extend(m.end() for m in _NEWLINE.finditer(self._mm))
+        if self._offsets[-1] == size:
+            # 마지막 줄바꿈 뒤의 빈 줄은 readlines()처럼 세지 않는다
+            self._offsets.pop()
+
+    def __len__(self):
+        return len(self._offsets) if self._mm is not None else 0
+
+    def line(self, line_number):
+        """
+        1-based 줄 내용(strip). UTF-8 실패 시 Latin-1로 디코딩, 범위 밖이면 ""
+        """
+        if not 0 < line_number <= len(self):
             return ""
+        start = self._offsets[line_number - 1]
+        end = self._offsets[line_number] if line_number < len(self._offsets) else len(self._mm)
+        raw = self._mm[start:end]
+        try:
+            return raw.decode("utf-8").strip()
+        except UnicodeDecodeError:
+            return raw.decode("ISO-8859-1").strip()
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def get_line_content(file_path, line_number):
+    try:
+        with LineIndex(file_path) as index:
+            return index.line(line_number)
     except Exception as e:
         print(f"[파일 읽기 실패] {file_path} → {e}")
         return ""
@@ -22,23 +84,36 @@ def get_file_type(file_path):
     return os.path.splitext(file_path)[-1].lstrip(".")
 
 def format_semgrep_results(results, extracted_path):
+    # 같은 파일의 결과를 모아서 파일당 한 번만 연다
+    by_path = {}
+    for i, result in enumerate(results["results"]):
+        by_path.setdefault(result["path"], []).append(i)
+
+    source_lines = {}
+    for abs_path, indices in by_path.items():
+        try:
+            with LineIndex(abs_path) as index:
+                for i in indices:
+                    source_lines[i] = index.line(results["results"][i]["start"]["line"])
+        except Exception as e:
+            print(f"[파일 읽기 실패] {abs_path} → {e}")
+
     issues = []
+    # 같은 룰의 발견은 줄인 metadata dict 하나를 같이 쓴다 (발견이 많은 룰일수록 메모리가 준다)
+    metadata_by_rule = {}
 
-    for result in results["results"]:
+    for i, result in enumerate(results["results"]):
         abs_path = result["path"]  # Semgrep에서 반환한 절대 경로
         rel_path = os.path.relpath(abs_path, extracted_path).replace("\\", "/")  # 상대 경로
 
-        line_num = result["start"]["line"]
-
-        issue = {
-            "path": rel_path,
-            "start": result["start"],
-            "end": result["end"],
-            "check_id": result["check_id"],
-            "extra": result["extra"],
-            "source_line": get_line_content(abs_path, line_num),
-            "file_type": get_file_type(abs_path)
-        }
+        check_id = result["check_id"]
+        if check_id not in metadata_by_rule:
+            metadata_by_rule[check_id] = compact_metadata((result.get("extra") or {}).get("metadata"))
+        issue = Issue.from_dict(
+            {**result, "source_line": source_lines.get(i, ""), "file_type": get_file_type(abs_path)},
+            path=rel_path,
+            metadata=metadata_by_rule[check_id],
+        )
         issues.append(issue)
 
     return issues
@@ -0,0 +1,61 @@
+import os
+import json
+
+from .findings_cache import file_digest
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+def _rel(path, project_path):
+    return os.path.relpath(path, project_path).replace("\\", "/")
+
+def build_manifest(project_path, files, ruleset=None):
+    """
+    분석 대상 파일 → 트리 매니페스트 {"version", "ruleset", "files": {상대 경로: sha256}} (탐색 순서 유지)
+    """
+    entries = {}
+    for path in files:
+        try:
+            entries[_rel(path, project_path)] = file_digest(path)
+        except OSError as e:
+            print(f"[매니페스트] 해시 실패 {path} → {e}")
+    return {"version": MANIFEST_VERSION, "ruleset": ruleset, "files": entries}
+
+def save_manifest(job_output_dir, manifest):
+    with open(os.path.join(job_output_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+
+def load_manifest(job_output_dir):
+    """이전 작업의 매니페스트. 없거나 버전이 다르면 None"""
+    try:
+        with open(os.path.join(job_output_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+def diff_manifests(base, current):
+    """
+    → (changed, removed, unchanged) 상대 경로 집합. changed는 새로 생긴 파일 포함.
+    룰셋이 다르면 이전 결과를 믿을 수 없으므로 전부 changed
+    """
+    base_files, current_files = base["files"], current["files"]
+    if base.get("ruleset") != current.get("ruleset"):
+        return set(current_files), set(base_files) - set(current_files), set()
+    changed = {p for p, h in current_files.items() if base_files.get(p) != h}
+    removed = set(base_files) - set(current_files)
+    unchanged = set(current_files) - changed
+    return changed, removed, unchanged
+
+def carry_over(new_issues, base_issues, unchanged, manifest):
+    """
+    바뀐 파일의 새 결과 + 바뀌지 않은 파일의 기준 작업 결과 → 매니페스트(탐색) 순서로 병합
+    """
+    order = {p: i for i, p in enumerate(manifest["files"])}
+    kept = [i for i in base_issues if i.path in unchanged]
+    merged = new_issues + kept
+    # 같은 파일 안에서는 원래 순서를 유지하도록 안정 정렬
+    merged.sort(key=lambda i: order.get(i.path, len(order)))
+    return merged
@@ -0,0 +1,76 @@
+import sys
+from dataclasses import dataclass
+from typing import Optional
+
+import shared_path  # noqa: F401
+from common.issues import compact_metadata, iter_issue_dicts
+
+def _position(pos):
+    pos = pos or {}
+    return pos.get("line"), pos.get("col")
+
+@dataclass(slots=True)
+class Issue:
+    """
+    발견 하나. issues.json/NDJSON/캐시에는 to_dict()의 모양(예전 issue dict와 같은 키)으로 나간다.
+    metadata는 같은 룰의 발견끼리 같은 dict를 공유할 수 있으므로 고쳐 쓰지 않는다
+    """
+    path: str
+    check_id: str
+    start_line: int
+    start_col: Optional[int] = None
+    end_line: Optional[int] = None
+    end_col: Optional[int] = None
+    message: str = ""
+    severity: Optional[str] = None
+    metadata: Optional[dict] = None
+    source_line: str = ""
+    file_type: str = ""
+
+    @classmethod
+    def from_dict(cls, d, path=None, metadata=None):
+        """
+        issues.json/캐시 원소(또는 Semgrep 결과처럼 extra 전체가 든 dict) → Issue.
+        path: d에 path가 없을 때(캐시 항목). metadata: 이미 줄인 metadata를 공유할 때
+        """
+        extra = d.get("extra") or {}
+        start_line, start_col = _position(d.get("start"))
+        end_line, end_col = _position(d.get("end"))
+        return cls(
+            path=sys.intern(path if path is not None else d["path"]),
+            check_id=sys.intern(d["check_id"]),
+            start_line=start_line or 0,
+            start_col=start_col,
+            end_line=end_line,
+            end_col=end_col,
+            message=extra.get("message") or "",
+            severity=sys.intern(extra["severity"]) if extra.get("severity") else None,
+            metadata=metadata if metadata is not None else compact_metadata(extra.get("metadata")),
+            source_line=d.get("source_line") or "",
+            file_type=sys.intern(d.get("file_type") or ""),
+        )
+
+    def to_dict(self, path=True):
+        """예전 issue dict와 같은 키 순서 → 캐시 적중 여부와 상관없이 issues.json이 같은 바이트가 된다"""
+        start = {"line": self.start_line}
+        if self.start_col is not None:
+            start["col"] = self.start_col
+        end = {}
+        if self.end_line is not None:
+            end["line"] = self.end_line
+        if self.end_col is not None:
+            end["col"] = self.end_col
+        extra = {"message": self.message}
+        if self.severity:
+            extra["severity"] = self.severity
+        if self.metadata:
+            extra["metadata"] = self.metadata
+        d = {"path": self.path} if path else {}
+        d.update(start=start, end=end, check_id=self.check_id, extra=extra,
+                 source_line=self.source_line, file_type=self.file_type)
+        return d
+
+def load_issues(path):
+    """issues.json(또는 NDJSON) → [Issue]"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [Issue.from_dict(d) for d in iter_issue_dicts(f)]
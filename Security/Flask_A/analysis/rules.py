@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+
+import requests
+
+# 룰 출처
+#   ""(기본): SEMGREP_CONFIG(auto 등)를 매 실행마다 semgrep이 직접 해석 (기존 동작)
+#   "local": SEMGREP_RULE_PACKS를 한 번 받아 로컬 버전 디렉토리에 고정 → 오프라인/재현 가능
+#   그 외: 로컬 룰 파일/디렉토리 경로
+SEMGREP_RULES = os.environ.get("SEMGREP_RULES", "")
+SEMGREP_RULE_PACKS = tuple(
+    p.strip() for p in os.environ.get("SEMGREP_RULE_PACKS", "p/default").split(",") if p.strip()
+)
+SEMGREP_REGISTRY_URL = os.environ.get("SEMGREP_REGISTRY_URL", "https://semgrep.dev/c").rstrip("/")
+# 1이면 다음 해석 때 팩을 다시 받아 새 버전으로 교체
+SEMGREP_RULES_REFRESH = os.environ.get("SEMGREP_RULES_REFRESH", "0") in ("1", "true", "yes")
+
+DEFAULT_RULES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "rules"
+)
+RULES_DIR = os.environ.get("SEMGREP_RULES_DIR", DEFAULT_RULES_DIR)
+MANIFEST = "current.json"
+FETCH_TIMEOUT = 60
+
+class RulesetError(RuntimeError):
+    pass
+
+def _pack_filename(pack):
+    return pack.replace("/", "_").replace(":", "_") + ".yml"
+
+def _rule_files(path):
+    if os.path.isfile(path):
+        return [path]
+    found = []
+    for root, _, files in os.walk(path):
+        found.extend(os.path.join(root, f) for f in files if f.endswith((".yml", ".yaml")))
+    return sorted(found)
+
+def ruleset_hash(path):
+    """룰 파일 내용(상대 경로 포함) → 버전 해시"""
+    h = hashlib.sha256()
+    base = path if os.path.isdir(path) else os.path.dirname(path)
+    for f in _rule_files(path):
+        h.update(os.path.relpath(f, base).replace("\\", "/").encode("utf-8") + b"\0")
+        with open(f, "rb") as fp:
+            h.update(fp.read())
+        h.update(b"\0")
+    return h.hexdigest()[:16]
+
+def fetch_packs(packs=SEMGREP_RULE_PACKS, rules_dir=RULES_DIR):
+    """
+    레지스트리에서 룰 팩을 받아 rules_dir/<버전>/에 저장하고 current.json을 갱신.
+    버전은 내용 해시라 같은 룰이면 같은 디렉토리가 된다
+    """
+    os.makedirs(rules_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".fetch-", dir=rules_dir)
+    try:
+        for pack in packs:
+            url = f"{SEMGREP_REGISTRY_URL}/{pack}"
+            print(f"[룰셋] 다운로드 {url}")
+            resp = requests.get(url, timeout=FETCH_TIMEOUT, headers={"Accept": "application/x-yaml"})
+            resp.raise_for_status()
+            with open(os.path.join(staging, _pack_filename(pack)), "wb") as f:
+                f.write(resp.content)
+
+        version = ruleset_hash(staging)
+        target = os.path.join(rules_dir, version)
+        if os.path.isdir(target):
+            shutil.rmtree(staging, ignore_errors=True)
+        else:
+            os.replace(staging, target)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    manifest = {"version": version, "packs": list(packs), "path": version, "fetched_at": time.time()}
+    tmp = os.path.join(rules_dir, MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, os.path.join(rules_dir, MANIFEST))
+    return manifest
+
+def load_manifest(rules_dir=RULES_DIR):
+    try:
+        with open(os.path.join(rules_dir, MANIFEST), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not os.path.isdir(os.path.join(rules_dir, manifest.get("path", ""))):
+        return None
+    return manifest
+
+_resolved = None
+_resolve_lock = threading.Lock()
+
+def resolve_ruleset(default_config):
+    """
+    → {"config": semgrep --config 값, "id": 캐시 키용 룰셋 식별자, "local": 로컬 고정 여부, "version": ...}
+    local 모드는 프로세스당 한 번만 확인하고, 로컬 팩이 없을 때(또는 REFRESH)만 네트워크를 쓴다
+    """
+    global _resolved
+    if not SEMGREP_RULES:
+        return {"config": default_config, "id": None, "local": False, "version": None}
+
+    with _resolve_lock:
+        if _resolved is not None:
+            return _resolved
+
+        if SEMGREP_RULES == "local":
+            manifest = None if SEMGREP_RULES_REFRESH else load_manifest()
+            if manifest is None or manifest.get("packs") != list(SEMGREP_RULE_PACKS):
+                try:
+                    manifest = fetch_packs()
+                except Exception as e:
+                    # 오프라인이면 예전 팩이라도 쓴다
+                    manifest = load_manifest()
+                    if manifest is None:
+                        raise RulesetError(f"룰 팩을 받을 수 없고 로컬 사본도 없습니다: {e}")
+                    print(f"[룰셋] 갱신 실패 → 기존 버전 {manifest['version']} 사용 ({e})")
+            config = os.path.join(RULES_DIR, manifest["path"])
+            version = manifest["version"]
+        else:
+            config = SEMGREP_RULES
+            if not os.path.exists(config):
+                raise RulesetError(f"룰 경로가 없습니다: {config}")
+            version = ruleset_hash(config)
+
+        _resolved = {"config": config, "id": f"local:{version}", "local": True, "version": version}
+        print(f"[룰셋] {config} (version {version})")
+        return _resolved
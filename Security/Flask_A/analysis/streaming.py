@@ -0,0 +1,143 @@
+import os
+import json
+
+# Accept 헤더 → 스트리밍 형식. 이 형식들은 B(LLM/PDF)를 기다리지 않고 배치가 끝나는 대로 결과를 흘려보낸다
+STREAM_FORMATS = {
+    "application/x-ndjson": "ndjson",
+    "application/sarif+json": "sarif",
+}
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+SARIF_LEVELS = {"ERROR": "error", "WARNING": "warning", "INFO": "note"}
+
+def _compact(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+def stream_format(accept):
+    """Accept 헤더에서 스트리밍 형식 이름(ndjson|sarif) 또는 None"""
+    accept = (accept or "").lower()
+    for mime, fmt in STREAM_FORMATS.items():
+        if mime in accept:
+            return fmt
+    return None
+
+class IssuesWriter:
+    """
+    issues.json을 청크가 올 때마다 이어 쓰는 JSON 배열 작성기 (공백 없는 compact 형식).
+    임시 파일에 쓰고 close()에서 교체하므로 중간에 읽는 쪽은 이전 파일이나 완성된 파일만 본다
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._tmp = f"{path}.tmp"
+        self._file = open(self._tmp, "w", encoding="utf-8")
+        self._file.write("[")
+
+    def write(self, issues):
+        for issue in issues:
+            if self.count:
+                self._file.write(",")
+            self._file.write(_compact(issue.to_dict()))
+            self.count += 1
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.write("]")
+        self._file.close()
+        os.replace(self._tmp, self.path)
+
+def write_issues(path, issues):
+    """이미 다 모인 결과를 compact 형식으로 저장"""
+    writer = IssuesWriter(path)
+    try:
+        writer.write(issues)
+    finally:
+        writer.close()
+
+class NdjsonEncoder:
+    """
+    한 줄에 발견 하나 (issues.json 원소와 같은 모양). 마지막 줄은 {"type": "summary", ...}.
+    B의 /deep-analyze도 이 형식을 받는다 (summary 줄은 건너뜀)
+    """
+    mimetype = "application/x-ndjson"
+
+    def start(self):
+        return ""
+
+    def chunk(self, issues):
+        return "".join(_compact(issue.to_dict()) + "\n" for issue in issues)
+
+    def end(self, summary):
+        return _compact({"type": "summary", **summary}) + "\n"
+
+def sarif_rule(issue):
+    rule = {
+        "id": issue.check_id,
+        "shortDescription": {"text": issue.check_id},
+        "fullDescription": {"text": issue.message},
+        "defaultConfiguration": {"level": SARIF_LEVELS.get(issue.severity, "warning")},
+    }
+    source = (issue.metadata or {}).get("source")
+    if source:
+        rule["helpUri"] = source
+    return rule
+
+def sarif_result(issue):
+    region = {"startLine": issue.start_line or 1}
+    if issue.start_col:
+        region["startColumn"] = issue.start_col
+    if issue.end_line:
+        region["endLine"] = issue.end_line
+    if issue.end_col:
+        region["endColumn"] = issue.end_col
+    if issue.source_line:
+        region["snippet"] = {"text": issue.source_line}
+    return {
+        "ruleId": issue.check_id,
+        "level": SARIF_LEVELS.get(issue.severity, "warning"),
+        "message": {"text": issue.message},
+        "locations": [{
+            "physicalLocation": {
+                "artifactLocation": {"uri": issue.path, "uriBaseId": "%SRCROOT%"},
+                "region": region,
+            }
+        }],
+    }
+
+class SarifEncoder:
+    """
+    SARIF 2.1.0 문서 하나를 조각으로 출력. results 배열을 먼저 열어 발견을 바로 내보내고,
+    룰 목록(tool.driver.rules)과 실행 결과(invocations)는 끝에서 닫는다 (JSON 객체 키 순서는 무관)
+    """
+    mimetype = "application/sarif+json"
+
+    def __init__(self):
+        self.rules = {}
+        self.count = 0
+
+    def start(self):
+        return f'{{"version":"2.1.0","$schema":"{SARIF_SCHEMA}","runs":[{{"results":['
+
+    def chunk(self, issues):
+        out = []
+        for issue in issues:
+            if issue.check_id not in self.rules:
+                self.rules[issue.check_id] = sarif_rule(issue)
+            out.append(("," if self.count else "") + _compact(sarif_result(issue)))
+            self.count += 1
+        return "".join(out)
+
+    def end(self, summary):
+        invocation = {"executionSuccessful": not summary.get("error")}
+        if summary.get("error"):
+            invocation["toolExecutionNotifications"] = [
+                {"level": "error", "message": {"text": summary["error"]}}
+            ]
+        invocation["properties"] = summary
+        tool = {"driver": {"name": "Semgrep", "informationUri": "https://semgrep.dev",
+                           "rules": list(self.rules.values())}}
+        return f'],"tool":{_compact(tool)},"invocations":[{_compact(invocation)}]}}]}}\n'
+
+ENCODERS = {"ndjson": NdjsonEncoder, "sarif": SarifEncoder}
@@ -1,64 +1,28 @@
 import os
-import zipfile
 import shutil
-import json
-
-UPLOAD_DIR = "uploads"
-SEED_FILE = os.path.join(UPLOAD_DIR, "job_id_seed.txt")
-
-def get_next_job_id():
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
-    if not os.path.exists(SEED_FILE):
-        with open(SEED_FILE, "w") as f:
-            f.write("1")
-    with open(SEED_FILE, "r") as f:
-        current = int(f.read().strip())
-
-    next_id = current + 1
-    with open(SEED_FILE, "w") as f:
-        f.write(str(next_id))
-
-    return f"job_{str(current).zfill(4)}"
-
-def flatten_directory(root_path):
-    index = 0
-    mapping = {}
-
-    for root, dirs, files in os.walk(root_path):
-        for file in files:
-            ext = os.path.splitext(file)[1].lower()
-            src = os.path.join(root, file)
-            short_name = f"file_{index}{ext}"
-            dst = os.path.join(root_path, short_name)
-            try:
-                if not os.path.exists(dst):
-                    shutil.copy2(src, dst)
-                    rel_src = os.path.relpath(src, root_path)
-                    mapping[short_name] = rel_src.replace("\\", "/")
-                    index += 1
-            except Exception:
-                pass
-
-    map_path = os.path.join(root_path, "flatten_map.json")
-    with open(map_path, "w", encoding="utf-8") as f:
-        json.dump(mapping, f, ensure_ascii=False, indent=2)
-
-def save_and_unzip(file_storage):
-    job_id = get_next_job_id()
-    job_path = os.path.join(UPLOAD_DIR, job_id)
-    zip_path = os.path.join(job_path, "input.zip")
-
-    os.makedirs(job_path, exist_ok=True)
-    file_storage.save(zip_path)
-
-    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        zip_ref.extractall(job_path)
-
-    subitems = os.listdir(job_path)
-    if len(subitems) == 1:
-        subdir = os.path.join(job_path, subitems[0])
-        if os.path.isdir(subdir):
-            print("[자동 진입] →", subdir)
-            job_path = subdir
-
-    return job_path
+from .file_finder import SOURCE_EXTENSIONS, is_ignored_dir
+
+import shared_path  # noqa: F401
+from common.unzip import extract  # 해제 구현과 제한(ZIP_MAX_*)은 A/B 공용
+
+def unzip_to(zip_path, dest_dir, return_stats=False):
+    """
+    이미 디스크에 저장된 ZIP을 dest_dir에 한 번만 해제 (업로드를 다시 쓰지 않는다).
+    분석 대상(소스 확장자 + .gitignore)만 풀고, 무시 디렉토리는 건너뛴다.
+    dest_dir이 이미 있으면 비우고 새로 만든다. 반환: 분석 루트(단일 상위 폴더면 그 안)
+    return_stats=True면 (루트, 해제 통계)
+    """
+    if os.path.exists(dest_dir):
+        shutil.rmtree(dest_dir, ignore_errors=True)
+    os.makedirs(dest_dir, exist_ok=True)
+    root, stats = extract(zip_path, dest_dir, keep=is_scan_target)
+    print(f"[압축 해제] {stats['extracted']}개 {stats['extracted_bytes']} bytes, "
+          f"건너뜀 {stats['skipped']}개 {stats['skipped_bytes']} bytes")
+    return (root, stats) if return_stats else root
+
+def is_scan_target(rel_path):
+    parts = rel_path.split("/")
+    if any(is_ignored_dir(p, "/".join(parts[:i + 1])) for i, p in enumerate(parts[:-1])):
+        return False
+    name = parts[-1]
+    return name == ".gitignore" or os.path.splitext(name)[1].lower() in SOURCE_EXTENSIONS
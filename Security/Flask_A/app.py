@@ -1,14 +1,30 @@
-from flask import Flask, request, jsonify, Response
+from flask import Flask, request, jsonify, Response, send_file, url_for, stream_with_context, g
 from flask_cors import CORS
 import os
+import re
 import uuid
 import json
+import time
+import zipfile
 
-from analysis.unzip import save_and_unzip
-from analysis.detector import analyze_project
+from analysis.unzip import unzip_to
+from analysis.detector import analyze_project, discover_files, iter_findings, SEMGREP_CONFIG, SEMGREP_RULESET_TAG
+from analysis.rules import resolve_ruleset, RulesetError
+from analysis.incremental import build_manifest, save_manifest, load_manifest, diff_manifests, carry_over
+from analysis.streaming import stream_format, ENCODERS, IssuesWriter, write_issues
+from analysis.issue import load_issues
 
 # B로 보내는 유틸
-from forwarder import send_to_flask_b
+from forwarder import send_to_flask_b, BackendBusy
+from balancer import POOL
+from jobs import JobStore, JobQueue, JobExists, DONE, FAILED, QUEUED, RUNNING, JOB_BUSY_WAIT
+from admission import EXTRACT, SEMGREP, STAGES, Saturated
+from janitor import Janitor, area, touch, UPLOADS_TTL, OUTPUTS_TTL, RULES_TTL
+from analysis.rules import RULES_DIR, MANIFEST as RULES_MANIFEST, load_manifest as load_rules_manifest
+from metrics import (
+    REGISTRY, CONTENT_TYPE as METRICS_CONTENT_TYPE, HTTP_REQUESTS, HTTP_SECONDS, HTTP_IN_FLIGHT, FINDINGS,
+    span, job_timeline, current_timeline, record_scan, record_extract, parse_server_timing,
+)
 
 app = Flask(__name__)
 CORS(app)
@@ -18,81 +34,550 @@ UPLOADS_DIR = os.path.join(BASE_DIR, "uploads")
 OUTPUTS_DIR = os.path.join(BASE_DIR, "outputs")
 os.makedirs(UPLOADS_DIR, exist_ok=True)
 os.makedirs(OUTPUTS_DIR, exist_ok=True)
+# 해제된 트리만 다른 곳(tmpfs 등)에 둘 때: {SCRATCH}/{job_id}/src. 비우면 uploads/{job_id}/src
+SCRATCH_DIR = os.environ.get("EXTRACT_SCRATCH_DIR", "")
+if SCRATCH_DIR:
+    os.makedirs(SCRATCH_DIR, exist_ok=True)
 
-@app.route("/analyze", methods=["POST"])
-def analyze():
-    if 'file' not in request.files:
-        return jsonify({"error": "No file uploaded"}), 400
+JOB_ID_RE = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
 
-    file = request.files['file']
-    if file.filename == '':
-        return jsonify({"error": "Empty filename"}), 400
+def _job_output_dir(job_id):
+    return os.path.join(OUTPUTS_DIR, job_id)
 
+def _extract_dir(job_id):
+    return os.path.join(SCRATCH_DIR or UPLOADS_DIR, job_id, "src")
+
+# B 응답에서 클라이언트까지 그대로 전달할 헤더 (증분 재사용 정보)
+PASSTHROUGH_HEADERS = ("X-Reused-Pieces", "X-Regenerated-Pieces")
+
+def _load_base(base_job_id):
+    """증분 기준 작업의 (매니페스트, issues). 둘 중 하나라도 없으면 None"""
+    base_dir = _job_output_dir(base_job_id)
+    manifest = load_manifest(base_dir)
+    touch(base_dir)  # 기준으로 쓰인 작업은 최근 사용으로 본다
+    if manifest is None:
+        return None
     try:
-        # === 0) job_id 생성 ===
-        job_id = request.form.get("job_id") or str(uuid.uuid4())
-        job_upload_dir = os.path.join(UPLOADS_DIR, job_id)
-        job_output_dir = os.path.join(OUTPUTS_DIR, job_id)
-        os.makedirs(job_upload_dir, exist_ok=True)
-        os.makedirs(job_output_dir, exist_ok=True)
-
-        # === 1) 업로드 ZIP을 먼저 저장 (B로 보낼 원본 보존) ===
-        zip_save_path = os.path.join(job_upload_dir, "source.zip")
-        file.save(zip_save_path)
-
-        # save_and_unzip에서 동일 파일 객체를 쓰길 원할 수 있으니 스트림 위치 초기화
+        return manifest, load_issues(os.path.join(base_dir, "issues.json"))
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _prepare_scan(job_id, zip_save_path, base_job_id=None, block=False):
+    """
+    압축 해제 → 대상 탐색 → 트리 매니페스트 → (base_job_id가 있으면) 증분 계획.
+    block: 압축 해제 자리가 날 때까지 기다린다 (백그라운드 작업). 아니면 가득 찼을 때 Saturated
+    반환 dict: output_dir, extracted_path, targets(스캔할 파일), discovery, carried(기준 작업에서 가져올 결과),
+    incremental(기록용, 없으면 None), extra_fields(B에 함께 보낼 폼 필드)
+    """
+    job_output_dir = _job_output_dir(job_id)
+    os.makedirs(job_output_dir, exist_ok=True)
+
+    # === 2) 압축 해제 (uploads/{job_id}/src 또는 EXTRACT_SCRATCH_DIR 에 한 번만) ===
+    # === 3) 상위 디렉토리 1개만 있으면 내부로 자동 진입 (unzip_to가 처리) ===
+    with EXTRACT.slot(block), span("extract"):
+        extracted_path, extract_stats = unzip_to(zip_save_path, _extract_dir(job_id), return_stats=True)
+    record_extract(extract_stats)
+    print("[압축 해제 위치]", extracted_path)
+    # 나중에 B 전송만 다시 할 때(report=defer) 해제 루트를 찾을 수 있게 함께 남긴다
+    extract_stats["root"] = extracted_path
+    with open(os.path.join(job_output_dir, "extract_stats.json"), "w", encoding="utf-8") as f:
+        json.dump(extract_stats, f, ensure_ascii=False, indent=2)
+
+    # === 4) 대상 탐색 + 트리 매니페스트 (다음 증분 작업의 기준) ===
+    with span("discover"):
+        all_files, discovery = discover_files(extracted_path)
+    with span("manifest"):
         try:
-            file.stream.seek(0)
-        except Exception:
-            pass
-
-        # === 2) 압축 해제 ===
-        extracted_path = save_and_unzip(file)
-        print("[압축 해제 위치]", extracted_path)
-        print("[압축 해제 후 내용]", os.listdir(extracted_path))
-
-        # === 3) 상위 디렉토리 1개만 있으면 내부로 자동 진입 ===
-        subitems = os.listdir(extracted_path)
-        if len(subitems) == 1:
-            subdir = os.path.join(extracted_path, subitems[0])
-            if os.path.isdir(subdir):
-                print("[자동 진입] →", subdir)
-                extracted_path = subdir
-
-        # === 4) 정적 분석 수행 ===
-        formatted = analyze_project(extracted_path)
-
-        # === 5) issues.json 저장 (outputs/{job_id}/issues.json) ===
-        issues_path = os.path.join(job_output_dir, "issues.json")
-        with open(issues_path, "w", encoding="utf-8") as f:
-            json.dump(formatted, f, ensure_ascii=False, indent=2)
-
-        # === 6) 즉시 Flask B로 전송 → B의 응답 그대로 리턴 ===
-        # 기본은 PDF 바이너리, 만약 B가 JSON으로 응답하도록 구성되면 JSON도 그대로 전달됨.
-        body, content_type, filename = send_to_flask_b(
+            ruleset = resolve_ruleset(SEMGREP_CONFIG)["id"] or f"{SEMGREP_CONFIG}:{SEMGREP_RULESET_TAG}"
+        except RulesetError:
+            ruleset = None  # 분석 단계에서 같은 오류가 다시 보고된다
+        manifest = build_manifest(extracted_path, all_files, ruleset)
+        save_manifest(job_output_dir, manifest)
+
+    scan = {
+        "output_dir": job_output_dir,
+        "extracted_path": extracted_path,
+        "targets": all_files,
+        "discovery": discovery,
+        "manifest": manifest,
+        "carried": None,
+        "incremental": None,
+        "extra_fields": None,
+    }
+
+    # === 4-1) 증분: 기준 작업 대비 바뀐 파일만 스캔 ===
+    base = _load_base(base_job_id) if base_job_id else None
+    if base is not None:
+        base_manifest, base_issues = base
+        changed, removed, unchanged = diff_manifests(base_manifest, manifest)
+        scan["targets"] = [p for p in all_files
+                           if os.path.relpath(p, extracted_path).replace("\\", "/") in changed]
+        scan["carried"] = (base_issues, unchanged)
+        scan["incremental"] = {
+            "base_job_id": base_job_id,
+            "scanned": sorted(changed),
+            "removed": sorted(removed),
+            "reused": len(unchanged),
+        }
+        scan["extra_fields"] = {"base_job_id": base_job_id, "changed_paths": json.dumps(sorted(changed | removed))}
+        print(f"[증분] 기준 {base_job_id}: 변경 {len(changed)}개, 삭제 {len(removed)}개, 재사용 {len(unchanged)}개")
+    elif base_job_id:
+        scan["incremental"] = {"base_job_id": base_job_id, "error": "base job not found; full scan"}
+    return scan
+
+def _save_scan_stats(scan, scan_stats):
+    scan_stats["discovery"] = scan["discovery"]
+    if scan["incremental"] is not None:
+        with open(os.path.join(scan["output_dir"], "incremental.json"), "w", encoding="utf-8") as f:
+            json.dump(scan["incremental"], f, ensure_ascii=False, indent=2)
+    # 배치별 통계(파일 수/발견 수/소요 시간/실패)도 함께 남김
+    with open(os.path.join(scan["output_dir"], "semgrep_stats.json"), "w", encoding="utf-8") as f:
+        json.dump(scan_stats, f, ensure_ascii=False, indent=2)
+
+def _save_timings(job_id, timeline, b_server_timing=None, deferred=False):
+    """
+    outputs/{job_id}/timings.json: A 단계별 소요 시간 + B가 Server-Timing으로 알려준 단계.
+    deferred=True(report=defer의 B 전송)면 스트리밍 때 남긴 기록은 두고 "report" 아래에 덧붙인다
+    """
+    timings = {"a": timeline.as_dict(), "b": parse_server_timing(b_server_timing) if b_server_timing else None}
+    if deferred:
+        timings = dict(_load_timings(job_id) or {}, report=timings)
+    try:
+        with open(os.path.join(_job_output_dir(job_id), "timings.json"), "w", encoding="utf-8") as f:
+            json.dump(timings, f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        print(f"[메트릭] timings.json 저장 실패 {job_id} → {e}")
+    return timings
+
+def _load_timings(job_id):
+    try:
+        with open(os.path.join(_job_output_dir(job_id), "timings.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _server_timing(timeline, b_server_timing):
+    """A 단계 + B 단계("b." 접두사)를 합친 Server-Timing 헤더 값"""
+    entries = [timeline.server_timing()]
+    entries.extend(f"b.{e.strip()}" for e in (b_server_timing or "").split(",") if e.strip())
+    return ", ".join(e for e in entries if e)
+
+def _forward(job_id, zip_save_path, issues_path, extracted_path, accept, stream_body, extra_fields, timings=False,
+             busy_wait=None):
+    # === 6) Flask B로 전송 → B의 응답 그대로 리턴 ===
+    # 기본은 PDF 바이너리, 만약 B가 JSON으로 응답하도록 구성되면 JSON도 그대로 전달됨.
+    # FLASK_B_HANDOFF=shared 면 ZIP 대신 해제된 트리 경로만 넘긴다 (같은 호스트 배포용)
+    # timings=True면 B도 JSON 응답에 단계별 소요 시간을 넣는다
+    if timings:
+        extra_fields = {**(extra_fields or {}), "timings": "1"}
+    with span("forward"):
+        return send_to_flask_b(
             job_id=job_id,
             source_zip_path=zip_save_path,     # A가 받은 업로드 ZIP
             issues_json_path=issues_path,      # A가 만든 issues.json
-            # flask_b_base_url 미지정 시 환경변수 FLASK_B_BASE_URL 또는 http://127.0.0.1:5001
-            accept=request.headers.get("Accept", "application/pdf"),
+            extracted_path=extracted_path,     # A가 해제한 트리 (shared 모드)
+            # flask_b_base_url 미지정 시 FLASK_B_BASE_URLS 중 가장 한가한 B (기본 FLASK_B_BASE_URL 하나)
+            accept=accept,
+            stream_body=stream_body,
+            extra_fields=extra_fields,
+            busy_wait=busy_wait,               # B가 바쁨(429/503 + Retry-After)일 때 기다릴 총 시간
         )
 
-        # 콘텐츠 타입 보고 그대로 내려보냄
-        resp = Response(body, mimetype=content_type if content_type else None)
-        if filename:
-            resp.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+def run_pipeline(job_id, zip_save_path, accept, stream_body=True, base_job_id=None, forward_only=False,
+                 timings=False, background=False):
+    """
+    저장된 업로드 ZIP → 압축 해제 → 정적 분석 → B 전송 → (body, content_type, filename)
+    /analyze(동기)와 백그라운드 작업자가 함께 쓴다.
+    stream_body=True면 body는 B 응답을 청크로 흘려보내는 이터러블 (forwarder.StreamedBody)
+    base_job_id: 이전 작업의 매니페스트와 비교해 바뀐 파일만 스캔하고 B에도 바뀐 경로를 알린다
+    forward_only: 이미 스트리밍으로 분석을 마친 작업(report=defer) → 남아 있는 issues.json으로 B 전송만
+    timings: B의 JSON 응답에도 단계별 소요 시간을 넣게 한다 (A의 단계는 항상 timings.json에 남음)
+    background: 작업 큐에서 실행. 단계 자리가 날 때까지 기다리고 B의 바쁨 응답도 JOB_BUSY_WAIT까지 기다린다
+                (동기 요청은 바로 Saturated/BackendBusy → 429/503)
+    """
+    with job_timeline(job_id) as timeline:
+        result = _run_pipeline(job_id, zip_save_path, accept, stream_body, base_job_id, forward_only, timings,
+                               background)
+        # B는 보고서를 다 만든 뒤 응답하므로 여기까지가 작업 전체 (본문 전달만 남음)
+        _save_timings(job_id, timeline, getattr(result[0], "headers", {}).get("Server-Timing"), forward_only)
+        return result
+
+def _run_pipeline(job_id, zip_save_path, accept, stream_body, base_job_id, forward_only, timings, background):
+    busy_wait = JOB_BUSY_WAIT if background else None
+    if forward_only:
+        job_output_dir = _job_output_dir(job_id)
+        with open(os.path.join(job_output_dir, "extract_stats.json"), "r", encoding="utf-8") as f:
+            extracted_path = json.load(f)["root"]
+        extra_fields = None
+        if base_job_id:
+            try:
+                with open(os.path.join(job_output_dir, "incremental.json"), "r", encoding="utf-8") as f:
+                    incremental = json.load(f)
+            except (OSError, ValueError):
+                incremental = {}
+            if "scanned" in incremental:
+                changed = sorted(set(incremental["scanned"]) | set(incremental["removed"]))
+                extra_fields = {"base_job_id": base_job_id, "changed_paths": json.dumps(changed)}
+        return _forward(job_id, zip_save_path, os.path.join(job_output_dir, "issues.json"),
+                        extracted_path, accept, stream_body, extra_fields, timings, busy_wait)
+
+    scan = _prepare_scan(job_id, zip_save_path, base_job_id, block=background)
+
+    # === 4-2) 정적 분석 수행 ===
+    with SEMGREP.slot(background), span("scan"):
+        formatted, scan_stats = analyze_project(scan["extracted_path"], return_stats=True, files=scan["targets"])
+        if scan["carried"] is not None:
+            formatted = carry_over(formatted, *scan["carried"], scan["manifest"])
+    record_scan(scan_stats)
+    FINDINGS.inc(len(formatted))
+    _save_scan_stats(scan, scan_stats)
+
+    # === 5) issues.json 저장 (outputs/{job_id}/issues.json, compact) ===
+    issues_path = os.path.join(scan["output_dir"], "issues.json")
+    with span("write_issues"):
+        write_issues(issues_path, formatted)
+
+    return _forward(job_id, zip_save_path, issues_path, scan["extracted_path"], accept, stream_body,
+                    scan["extra_fields"], timings, busy_wait)
+
+def stream_findings(job_id, zip_save_path, fmt, base_job_id=None, report=None, timings=False):
+    """
+    B를 기다리지 않고 Semgrep 배치가 끝나는 대로 결과를 흘려보내는 응답 본문(제너레이터).
+    압축 해제/탐색은 먼저 끝내므로 잘못된 ZIP은 응답 시작 전에 예외로 드러난다.
+    issues.json은 같은 청크로 이어 쓰고, report(Accept 값)가 있으면 끝난 뒤 B 전송을 작업 큐에 넣는다.
+    timings=True면 마지막 요약에 단계별 소요 시간을 넣는다.
+    Semgrep 자리는 응답을 시작하기 전에 잡으므로(가득 차면 Saturated) 반환하는 release를
+    응답이 닫힐 때 불러야 한다 (제너레이터가 한 번도 돌지 않은 경우 대비, 여러 번 불려도 됨)
+    → (제너레이터, mimetype, release)
+    """
+    with job_timeline(job_id) as timeline:
+        scan = _prepare_scan(job_id, zip_save_path, base_job_id)
+        ticket = SEMGREP.acquire()
+    encoder = ENCODERS[fmt]()
+    issues_path = os.path.join(scan["output_dir"], "issues.json")
+
+    def generate():
+        try:
+            with JANITOR.pinned(job_id):
+                yield from _generate()
+        finally:
+            ticket.release()
+
+    def _generate():
+        started = time.monotonic()
+        scan_stats, error = {}, None
+        writer = IssuesWriter(issues_path)
+        yield encoder.start()
+        try:
+            if scan["carried"] is not None:
+                base_issues, unchanged = scan["carried"]
+                carried = [i for i in base_issues if i.path in unchanged]
+                if carried:
+                    writer.write(carried)
+                    yield encoder.chunk(carried)
+            # 제너레이터는 요청 컨텍스트 밖에서 돌 수 있으므로 Timeline을 직접 넘긴다
+            with span("scan", timeline):
+                for chunk in iter_findings(scan["extracted_path"], scan["targets"], scan_stats):
+                    writer.write(chunk)
+                    yield encoder.chunk(chunk)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            print(f"[스트리밍] 분석 중단 {job_id}: {error}")
+        finally:
+            # 클라이언트가 끊어도 그때까지의 결과는 issues.json으로 남는다
+            writer.close()
+        record_scan(scan_stats)
+        FINDINGS.inc(writer.count)
+        _save_scan_stats(scan, scan_stats)
+        saved = _save_timings(job_id, timeline)
+
+        summary = {
+            "job_id": job_id,
+            "findings": writer.count,
+            "files": scan_stats.get("total_files", 0),
+            "failed_batches": scan_stats.get("failed_batches", 0),
+            "wall_time": round(time.monotonic() - started, 3),
+        }
+        if timings:
+            summary["timings"] = saved
+        if error:
+            summary["error"] = error
+        elif report:
+            try:
+                JOBS.submit(job_id, zip_save_path, report, base_job_id, forward_only=True)
+                summary["report_status_url"] = url_for("job_status", job_id=job_id)
+            except JobExists as e:
+                summary["error"] = str(e)
+        yield encoder.end(summary)
+
+    return generate(), encoder.mimetype, ticket.release
+
+def _run_job(job_id, zip_save_path, accept, **options):
+    return run_pipeline(job_id, zip_save_path, accept, background=True, **options)
+
+# 비동기 작업 큐: outputs/jobs.sqlite에 영속화 → 재시작해도 queued 작업이 이어서 처리됨
+JOBS = JobQueue(JobStore(os.path.join(OUTPUTS_DIR, "jobs.sqlite")), _run_job, _job_output_dir)
+
+def _current_rules():
+    """정리하지 않을 룰 디렉토리 항목: 매니페스트와 현재 버전"""
+    manifest = load_rules_manifest()
+    return {RULES_MANIFEST, manifest["path"]} if manifest else {RULES_MANIFEST}
+
+# 작업 디렉토리 정리: 영역별 TTL + 전체 용량 상한(LRU). queued/running 작업과 처리 중인 요청은 제외
+JANITOR = Janitor(
+    [area("uploads", UPLOADS_DIR, UPLOADS_TTL), area("outputs", OUTPUTS_DIR, OUTPUTS_TTL)]
+    + ([area("scratch", SCRATCH_DIR, UPLOADS_TTL)] if SCRATCH_DIR else [])
+    + [area("rules", RULES_DIR, RULES_TTL, jobs=False, keep=_current_rules)],
+    pinned=JOBS.store.active_ids,
+)
+
+# 처리 대기/진행 중 작업 수, 마지막 정리 때의 작업 디렉토리 사용량
+REGISTRY.gauge("jobs_queued", "Jobs waiting for a worker", fn=lambda: JOBS.store.count(QUEUED))
+REGISTRY.gauge("jobs_running", "Jobs being processed", fn=lambda: JOBS.store.count(RUNNING))
+REGISTRY.gauge("workspace_bytes", "Bytes under the job directories at the last sweep",
+               fn=lambda: (JANITOR.last or {}).get("total_bytes", 0))
+
+def start_background():
+    """
+    작업자/정리/B 상태 확인 스레드 시작 (여러 번 불려도 한 번만). 앱을 만들 때 바로 시작하므로
+    재시작 직후 요청이 없어도 남은 queued 작업과 임대가 끝난 running 작업을 이어서 처리한다
+    """
+    JOBS.start()
+    JANITOR.start()
+    POOL.start()
+
+# python app.py(debug)의 리로더 감시 프로세스에서는 띄우지 않는다 (실제 서버 프로세스에서만)
+if __name__ != "__main__" or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+    start_background()
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.monotonic()
+    HTTP_IN_FLIGHT.inc()
+
+@app.after_request
+def _record_request(resp):
+    # 스트리밍 응답은 헤더를 보낼 때까지의 시간 (본문 전송 시간은 stage_seconds 참고)
+    endpoint = request.endpoint or "unknown"
+    HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=resp.status_code)
+    if "request_started" in g:
+        HTTP_SECONDS.observe(time.monotonic() - g.request_started, endpoint=endpoint)
+    return resp
+
+@app.teardown_request
+def _end_request(exc):
+    if "request_started" in g:
+        HTTP_IN_FLIGHT.dec()
+
+class UploadError(Exception):
+    pass
+
+def _busy(status, retry_after, message):
+    """과부하 응답 (429: 대기열 가득, 503: 대기 시간 초과 또는 B가 바쁨) + Retry-After"""
+    resp = jsonify({"error": message, "retry_after": retry_after})
+    resp.status_code = status
+    resp.headers["Retry-After"] = str(retry_after)
+    return resp
+
+def _save_upload():
+    """
+    업로드 검증 + uploads/{job_id}/source.zip 저장 → (job_id, zip_path)
+    """
+    if 'file' not in request.files:
+        raise UploadError("No file uploaded")
+
+    file = request.files['file']
+    if file.filename == '':
+        raise UploadError("Empty filename")
+
+    # === 0) job_id 생성 ===
+    job_id = request.form.get("job_id") or str(uuid.uuid4())
+    if not JOB_ID_RE.match(job_id) or job_id.strip(".") == "":
+        raise UploadError("Invalid job_id")
+    # 작업 큐에 있는 job_id면 업로드를 덮어쓰기 전에 거절 (409)
+    if JOBS.store.get(job_id) is not None:
+        raise JobExists(job_id)
+
+    job_upload_dir = os.path.join(UPLOADS_DIR, job_id)
+    os.makedirs(job_upload_dir, exist_ok=True)
+
+    # === 1) 업로드 ZIP을 먼저 저장 (B로 보낼 원본 보존) ===
+    zip_save_path = os.path.join(job_upload_dir, "source.zip")
+    file.save(zip_save_path)
+    return job_id, zip_save_path
+
+def _base_job_id(job_id):
+    """증분 기준 작업 id (선택). 형식이 잘못됐거나 자기 자신이면 UploadError"""
+    base_job_id = (request.form.get("base_job_id") or "").strip() or None
+    if base_job_id is None:
+        return None
+    if not JOB_ID_RE.match(base_job_id) or base_job_id.strip(".") == "" or base_job_id == job_id:
+        raise UploadError("Invalid base_job_id")
+    return base_job_id
+
+@app.route("/analyze", methods=["POST"])
+def analyze():
+    try:
+        # 대기열까지 가득 찬 단계가 있으면 업로드를 저장하기 전에 바로 거절
+        for limit in STAGES:
+            limit.check()
+        job_id, zip_save_path = _save_upload()
+        with JANITOR.pinned(job_id), job_timeline(job_id):
+            return _analyze(job_id, zip_save_path)
+
+    except Saturated as e:
+        return _busy(e.status, e.retry_after, str(e))
+    except BackendBusy as e:
+        return _busy(503, e.retry_after, str(e))
+    except UploadError as e:
+        return jsonify({"error": str(e)}), 400
+    except JobExists as e:
+        return jsonify({"error": str(e)}), 409
+    except zipfile.BadZipFile as e:
+        # 손상된 ZIP 또는 크기/압축률 제한 위반 (common.unzip.UnsafeZipError)
+        return jsonify({"error": f"Bad zip: {e}"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def _analyze(job_id, zip_save_path):
+    """/analyze 본문 (업로드 저장 후, 작업 디렉토리가 정리되지 않도록 pin된 상태에서 호출)"""
+    base_job_id = _base_job_id(job_id)
+    accept = request.headers.get("Accept", "application/pdf")
+    # timings=1: JSON 응답(또는 스트리밍 요약)에 단계별 소요 시간을 넣는다
+    timings = (request.form.get("timings") or "").lower() in ("1", "true", "yes")
+
+    # NDJSON/SARIF: 발견을 배치 단위로 바로 흘려보내고 B 전송은 건너뛰거나(report=skip) 작업 큐로 미룬다(defer)
+    fmt = stream_format(accept)
+    if fmt:
+        report = request.form.get("report", "skip")
+        if report not in ("skip", "defer"):
+            raise UploadError("Invalid report (skip | defer)")
+        report_accept = request.form.get("report_accept", "application/pdf") if report == "defer" else None
+        body, mimetype, release = stream_findings(job_id, zip_save_path, fmt, base_job_id, report_accept, timings)
+        resp = Response(stream_with_context(body), mimetype=mimetype)
+        resp.call_on_close(release)
+        resp.headers["X-Job-Id"] = job_id
+        resp.headers["X-Accel-Buffering"] = "no"  # 프록시가 모아서 보내지 않도록
+        return resp
+
+    body, content_type, filename = run_pipeline(job_id, zip_save_path, accept, base_job_id=base_job_id,
+                                                timings=timings)
+    timeline = current_timeline()
+    server_timing = _server_timing(timeline, body.headers.get("Server-Timing"))
+
+    if timings and "json" in (content_type or ""):
+        # JSON 보고서는 작으므로 모아서 A/B 단계별 소요 시간을 합쳐 넣는다
+        data = json.loads(b"".join(body))
+        data["timings"] = {"a": timeline.as_dict(), "b": data.get("timings")}
+        resp = jsonify(data)
+        resp.headers["Server-Timing"] = server_timing
+        return resp
+
+    # 콘텐츠 타입 보고 그대로 내려보냄 (B의 바디를 버퍼링 없이 청크 단위로 전달)
+    resp = Response(body, mimetype=content_type if content_type else None)
+    resp.headers["Server-Timing"] = server_timing
+    if body.content_length is not None:
+        resp.headers["Content-Length"] = str(body.content_length)
+    if filename:
+        resp.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    for name in PASSTHROUGH_HEADERS:
+        value = getattr(body, "headers", {}).get(name)
+        if value:
+            resp.headers[name] = value
+    return resp
+
+def _job_view(job):
+    view = {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "status_url": url_for("job_status", job_id=job["job_id"]),
+    }
+    if job["status"] == DONE:
+        view["report_url"] = url_for("job_report", job_id=job["job_id"])
+    if job["status"] == FAILED:
+        view["error"] = job["error"]
+    if job["status"] in (DONE, FAILED):
+        view["timings"] = _load_timings(job["job_id"])
+    return view
+
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    """
+    업로드만 저장하고 즉시 job_id 반환. 파이프라인은 백그라운드 작업자가 수행한다.
+    결과 형식은 제출 시 Accept 헤더(application/pdf | application/json)를 따른다.
+    """
+    try:
+        if JOBS.full():
+            return _busy(429, JOBS.retry_after(), "Job queue is full")
+        job_id, zip_save_path = _save_upload()
+        base_job_id = _base_job_id(job_id)
+
+        JOBS.submit(job_id, zip_save_path, request.headers.get("Accept", "application/pdf"), base_job_id)
+        resp = jsonify(_job_view(JOBS.store.get(job_id)))
+        resp.status_code = 202
+        resp.headers["Location"] = url_for("job_status", job_id=job_id)
         return resp
 
+    except UploadError as e:
+        return jsonify({"error": str(e)}), 400
+    except JobExists as e:
+        return jsonify({"error": str(e)}), 409
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = JOBS.store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job_id"}), 404
+    return jsonify(_job_view(job))
+
+@app.route("/jobs/<job_id>/report", methods=["GET"])
+def job_report(job_id):
+    job = JOBS.store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job_id"}), 404
+    if job["status"] == FAILED:
+        return jsonify(_job_view(job)), 500
+    if job["status"] != DONE:
+        # 아직 진행 중: 상태만 돌려주고 나중에 다시 조회하게 한다
+        resp = jsonify(_job_view(job))
+        resp.status_code = 202
+        resp.headers["Retry-After"] = "5"
+        return resp
+    if not os.path.exists(job["result_path"]):
+        # 보존 기간(JANITOR_OUTPUTS_TTL_HOURS)이 지나 정리된 보고서
+        return jsonify({"error": "Report expired", "job_id": job_id}), 410
+    touch(_job_output_dir(job_id))
+    return send_file(
+        job["result_path"],
+        mimetype=job["content_type"] or None,
+        as_attachment=bool(job["filename"]),
+        download_name=job["filename"] or os.path.basename(job["result_path"]),
+    )
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus 텍스트 형식 (단계별 히스토그램, Semgrep/B 전송 카운터, 작업 수)"""
+    return Response(REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
 
 @app.route("/health", methods=["GET"])
 def health():
-    return jsonify({"ok": True, "service": "Flask A"})
+    return jsonify({
+        "ok": True,
+        "service": "Flask A",
+        "disk": JANITOR.usage(),
+        "admission": {limit.stage: limit.snapshot() for limit in STAGES},
+        "jobs": {"queued": JOBS.store.count(QUEUED), "running": JOBS.store.count(RUNNING),
+                 "max_queued": JOBS.max_queued},
+        "backends": POOL.snapshot(),
+    })
 
 if __name__ == "__main__":
     os.makedirs("uploads", exist_ok=True)
     os.makedirs("outputs", exist_ok=True)
     app.run(debug=True, host="0.0.0.0", port=5000)
-
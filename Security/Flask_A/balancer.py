@@ -0,0 +1,199 @@
+# balancer.py
+import os
+import time
+import random
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+import requests
+
+from metrics import REGISTRY
+
+# B 서버 목록 (쉼표 구분). 없으면 FLASK_B_BASE_URL 하나만 쓴다
+_URLS = os.environ.get("FLASK_B_BASE_URLS") or os.environ.get("FLASK_B_BASE_URL", "http://127.0.0.1:5001")
+FLASK_B_BASE_URLS = [u.strip().rstrip("/") for u in _URLS.split(",") if u.strip()]
+# /health 확인 주기와 타임아웃(초). 주기가 0이면 확인하지 않고 전송 결과만으로 판단한다
+BALANCER_HEALTH_INTERVAL = float(os.environ.get("BALANCER_HEALTH_INTERVAL", "5"))
+BALANCER_HEALTH_TIMEOUT = float(os.environ.get("BALANCER_HEALTH_TIMEOUT", "2"))
+# 연속 실패가 이만큼 쌓이면 제외(eject). 제외된 B는 BALANCER_EJECT_SECONDS 동안 고르지 않고,
+# 그 뒤 /health가 성공하면 복귀한다
+BALANCER_EJECT_AFTER = int(os.environ.get("BALANCER_EJECT_AFTER", "2"))
+BALANCER_EJECT_SECONDS = float(os.environ.get("BALANCER_EJECT_SECONDS", "30"))
+# 증분 작업은 base_job_id를 처리한 B로 보낸다 (그 B에만 이전 조각이 있음). 기억할 작업 수
+BALANCER_AFFINITY_SIZE = 4096
+
+BACKEND_UP = REGISTRY.gauge("backend_up", "1 if the Flask B instance is in rotation", ("backend",))
+BACKEND_OUTSTANDING = REGISTRY.gauge("backend_outstanding", "Requests this A has in flight to each Flask B",
+                                     ("backend",))
+BACKEND_EJECTIONS = REGISTRY.counter("backend_ejections_total", "Flask B instances taken out of rotation",
+                                     ("backend",))
+BACKEND_FAILOVERS = REGISTRY.counter("backend_failovers_total", "Forward attempts moved to another Flask B",
+                                     ("reason",))
+
+class Backend:
+    """B 하나의 상태: A가 보낸 처리 중 요청 수(outstanding) + B가 /health로 알려준 부하"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.busy_until = 0.0
+        self.reported = None     # /health의 load: {"jobs", "waiting", "capacity"}
+        self.checked_at = None
+
+    def healthy(self, now):
+        """제외 시간이 지나면 다시 고를 수 있다. 실패 수는 남아 있으므로 한 번 더 실패하면 바로 다시 제외된다"""
+        return self.ejected_until <= now
+
+    def load(self):
+        """(처리 중 + 대기) / 용량. 다른 A가 보낸 요청도 반영되도록 B의 보고와 로컬 수 중 큰 쪽을 쓴다"""
+        report = self.reported or {}
+        jobs = max(self.outstanding, report.get("jobs") or 0)
+        return (jobs + (report.get("waiting") or 0)) / max(1, report.get("capacity") or 1)
+
+    def snapshot(self, now):
+        return {
+            "url": self.url,
+            "ejected": bool(self.ejected_until),
+            "outstanding": self.outstanding,
+            "failures": self.failures,
+            "busy_for": round(max(0.0, self.busy_until - now), 1),
+            "load": round(self.load(), 3),
+            "reported": self.reported,
+        }
+
+class BackendPool:
+    """
+    여러 B 중 가장 한가한 곳을 고른다. 실패가 이어지는 B는 잠시 제외하고, /health가 다시 성공하면 복귀시킨다.
+    모두 제외/바쁨이어도 하나는 고른다 (요청 자체를 버리지 않음)
+    """
+
+    def __init__(self, urls: Iterable[str], health_interval: float = BALANCER_HEALTH_INTERVAL):
+        self.backends = [Backend(u.rstrip("/")) for u in urls]
+        if not self.backends:
+            raise ValueError("BackendPool needs at least one Flask B URL")
+        self.health_interval = health_interval
+        self._owners = OrderedDict()
+        self._lock = threading.Lock()
+        self._started = False
+        for b in self.backends:
+            BACKEND_UP.set(1, backend=b.url)
+            BACKEND_OUTSTANDING.set(0, backend=b.url)
+
+    def _score(self, b, now):
+        return (not b.healthy(now), b.busy_until > now, b.load(), b.outstanding, random.random())
+
+    def acquire(self, exclude: Iterable[Backend] = (), prefer: Optional[str] = None) -> Backend:
+        """
+        보낼 B를 골라 outstanding을 올린다 (끝나면 release). exclude: 이번 전송에서 이미 실패한 B
+        prefer: 가능하면 이 URL (한가하고 정상일 때만)
+        """
+        self.start()
+        exclude = set(exclude)
+        now = time.monotonic()
+        with self._lock:
+            candidates = [b for b in self.backends if b not in exclude] or self.backends
+            chosen = min(candidates, key=lambda b: self._score(b, now))
+            if prefer:
+                owner = next((b for b in candidates if b.url == prefer), None)
+                if owner is not None and owner.healthy(now) and owner.busy_until <= now and owner.load() < 1:
+                    chosen = owner
+            chosen.outstanding += 1
+            BACKEND_OUTSTANDING.set(chosen.outstanding, backend=chosen.url)
+            return chosen
+
+    def release(self, b: Backend):
+        with self._lock:
+            b.outstanding = max(0, b.outstanding - 1)
+            BACKEND_OUTSTANDING.set(b.outstanding, backend=b.url)
+
+    def succeeded(self, b: Backend, job_id: Optional[str] = None):
+        with self._lock:
+            b.failures = 0
+            if job_id:
+                self._owners[job_id] = b.url
+                self._owners.move_to_end(job_id)
+                while len(self._owners) > BALANCER_AFFINITY_SIZE:
+                    self._owners.popitem(last=False)
+        self._reinstate(b)
+
+    def failed(self, b: Backend, reason: str):
+        """연결 실패/게이트웨이 오류. 연속 BALANCER_EJECT_AFTER번이면 제외"""
+        with self._lock:
+            b.failures += 1
+            eject = b.failures >= BALANCER_EJECT_AFTER and b.ejected_until <= time.monotonic()
+            if eject:
+                b.ejected_until = time.monotonic() + BALANCER_EJECT_SECONDS
+        if eject:
+            print(f"[분산] {b.url} 제외 ({reason}, 연속 실패 {b.failures}회) → {BALANCER_EJECT_SECONDS:.0f}s 뒤 재확인")
+            BACKEND_UP.set(0, backend=b.url)
+            BACKEND_EJECTIONS.inc(backend=b.url)
+
+    def busy(self, b: Backend, seconds: float):
+        """B가 429/503 + Retry-After로 답함 → 그 시간 동안은 다른 B를 먼저 고른다"""
+        with self._lock:
+            b.busy_until = max(b.busy_until, time.monotonic() + seconds)
+
+    def busy_for(self) -> float:
+        """모든 정상 B가 바쁠 때 가장 먼저 풀리는 B까지 남은 시간(초). 한가한 B가 있으면 0"""
+        now = time.monotonic()
+        with self._lock:
+            healthy = [b for b in self.backends if b.healthy(now)] or self.backends
+            return max(0.0, min(b.busy_until for b in healthy) - now)
+
+    def owner(self, job_id: Optional[str]) -> Optional[str]:
+        """job_id를 처리한 B의 URL (기억하고 있으면)"""
+        if not job_id:
+            return None
+        with self._lock:
+            return self._owners.get(job_id)
+
+    def _reinstate(self, b):
+        with self._lock:
+            was_ejected = bool(b.ejected_until)
+            b.failures = 0
+            b.ejected_until = 0.0
+        if was_ejected:
+            print(f"[분산] {b.url} 복귀")
+            BACKEND_UP.set(1, backend=b.url)
+
+    def check(self, b: Backend):
+        """/health 한 번: 성공하면 부하 보고를 갱신하고 (제외돼 있었다면) 복귀, 실패하면 failed()"""
+        try:
+            resp = requests.get(f"{b.url}/health", timeout=BALANCER_HEALTH_TIMEOUT)
+            resp.raise_for_status()
+            load = resp.json().get("load")
+        except Exception as e:
+            self.failed(b, f"health: {type(e).__name__}")
+            return
+        with self._lock:
+            b.reported = load
+            b.checked_at = time.time()
+        self._reinstate(b)
+
+    def start(self):
+        """여러 번 불려도 한 번만 시작. 주기가 0이면 시작하지 않는다"""
+        with self._lock:
+            if self._started or not self.health_interval:
+                return
+            self._started = True
+        threading.Thread(target=self._loop, name="balancer-health", daemon=True).start()
+
+    def _loop(self):
+        while True:
+            now = time.monotonic()
+            for b in self.backends:
+                # 제외된 B는 제외 시간이 끝난 뒤에만 다시 확인한다
+                if b.healthy(now):
+                    self.check(b)
+            time.sleep(self.health_interval)
+
+    def snapshot(self) -> List[dict]:
+        now = time.monotonic()
+        with self._lock:
+            return [b.snapshot(now) for b in self.backends]
+
+# A 전체가 공유하는 기본 풀 (FLASK_B_BASE_URLS)
+POOL = BackendPool(FLASK_B_BASE_URLS)
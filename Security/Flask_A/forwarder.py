@@ -1,20 +1,126 @@
 # forwarder.py
 import os
+import math
 import time
+import random
 import re
 import urllib.parse
 import requests
-from typing import Optional, Tuple
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from contextlib import ExitStack
+from typing import Callable, Iterator, Optional, Tuple, Union
+
+from metrics import FORWARD_RESPONSES, FORWARD_RETRIES
+from balancer import POOL, BackendPool, BACKEND_FAILOVERS
 
 # B 서버 기본 주소: 환경변수 FLASK_B_BASE_URL로 덮어쓸 수 있음
+# (여러 B는 FLASK_B_BASE_URLS → balancer.POOL이 가장 한가한 B를 고른다)
 DEFAULT_FLASK_B_BASE = os.environ.get("FLASK_B_BASE_URL", "http://127.0.0.1:5001")
 
 # Flask B의 수신 엔드포인트 (B의 app.py에서 /deep-analyze 사용 중)
 RECEIVE_ENDPOINT = "/deep-analyze"
 
+# A→B 전달 방식
+#   multipart: source.zip + issues.json 업로드 (기본, 원격 B)
+#   shared:    같은 호스트/공유 볼륨일 때 A가 해제한 트리와 issues.json 경로만 전달
+#              (B의 SHARED_WORKSPACE_ROOT 안에 있어야 함)
+HANDOFF_MODE = os.environ.get("FLASK_B_HANDOFF", "multipart").lower()
+
+# 연결 풀 크기(동시 전송 수), 재시도 백오프(초), 스트리밍 청크 크기
+FORWARD_POOL_SIZE = int(os.environ.get("FORWARD_POOL_SIZE", "8"))
+FORWARD_CONNECT_TIMEOUT = 10
+FORWARD_BACKOFF_BASE = 0.5
+FORWARD_BACKOFF_MAX = 8.0
+STREAM_CHUNK = 64 * 1024
+
+# B가 요청을 처리하지 않았다고 볼 수 있는 응답만 재시도한다 (게이트웨이가 B에 못 닿음/일시적 불가).
+# 504는 B가 아직 처리 중일 수 있으므로 읽기 타임아웃처럼 재시도하지 않는다
+RETRYABLE_STATUS = (502, 503)
+# B가 Retry-After와 함께 돌려주는 "지금은 바쁨" 응답 (admission 제한)
+BUSY_STATUS = (429, 503)
+# 바쁨 응답에 따라 기다릴 수 있는 총 시간(초). 넘으면 BackendBusy로 호출자에게 알린다
+FORWARD_BUSY_WAIT = float(os.environ.get("FORWARD_BUSY_WAIT", "30"))
+
+# 모듈 공용 세션: keep-alive로 B와의 TCP 연결을 재사용
+_SESSION = requests.Session()
+_SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=FORWARD_POOL_SIZE, max_retries=0))
+_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=FORWARD_POOL_SIZE, max_retries=0))
+
 class ForwardError(Exception):
     pass
 
+class BackendBusy(ForwardError):
+    """B가 계속 바쁨(429/503 + Retry-After) → 호출자도 retry_after초 뒤 재시도를 권한다"""
+
+    def __init__(self, message: str, status: int, retry_after: int):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+class StreamedBody:
+    """
+    B의 응답 바디를 청크 단위로 흘려보내는 이터러블. 다 읽거나 close()하면 연결을 풀에 돌려준다.
+    content_length: B가 알려준 길이 (모르면 None), headers: B의 응답 헤더
+    on_close: 처음 close()될 때 한 번 부른다 (B별 처리 중 요청 수 반납)
+    """
+
+    def __init__(self, resp: requests.Response, chunk_size: int = STREAM_CHUNK,
+                 on_close: Optional[Callable[[], None]] = None):
+        self._resp = resp
+        self._chunk_size = chunk_size
+        self._on_close = on_close
+        length = resp.headers.get("Content-Length")
+        encoded = resp.headers.get("Content-Encoding")
+        self.headers = resp.headers
+        self.content_length = int(length) if length and length.isdigit() and not encoded else None
+
+    def __iter__(self) -> Iterator[bytes]:
+        try:
+            for chunk in self._resp.iter_content(chunk_size=self._chunk_size):
+                if chunk:
+                    yield chunk
+        finally:
+            self.close()
+
+    def close(self):
+        self._resp.close()
+        on_close, self._on_close = self._on_close, None
+        if on_close is not None:
+            on_close()
+
+def _connect_failed(err: Exception) -> bool:
+    """연결 단계에서 실패(거부, 이름 해석 실패, 연결 타임아웃) → 요청 바디가 B에 가지 않았다"""
+    if isinstance(err, requests.exceptions.ConnectTimeout):
+        return True
+    if not isinstance(err, requests.exceptions.ConnectionError):
+        return False
+    reason = err.args[0] if err.args else None
+    reason = getattr(reason, "reason", reason)  # urllib3 MaxRetryError → 실제 원인
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+def _is_retryable(err: Exception) -> bool:
+    """
+    POST라서 B가 작업을 시작했을 수 있는 실패(읽기 타임아웃, 보낸 뒤 끊긴 연결, 500/504 등)는 재시도하지 않는다.
+    연결 단계 실패와 502/503만 재시도.
+    """
+    if isinstance(err, requests.exceptions.ConnectionError):
+        return _connect_failed(err)
+    if isinstance(err, requests.exceptions.HTTPError) and err.response is not None:
+        return err.response.status_code in RETRYABLE_STATUS
+    return False
+
+def _backoff(attempt: int) -> float:
+    """지터를 섞은 지수 백오프"""
+    return min(FORWARD_BACKOFF_MAX, FORWARD_BACKOFF_BASE * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
+def _retry_after(resp: requests.Response) -> Optional[float]:
+    """Retry-After 헤더(초). 없거나 HTTP 날짜 형식 등 해석할 수 없으면 None"""
+    try:
+        return max(0.0, float(resp.headers.get("Retry-After")))
+    except (TypeError, ValueError):
+        return None
+
 def _exists_or_raise(path: str, kind: str):
     if not os.path.exists(path):
         raise ForwardError(f"{kind} not found: {path}")
@@ -48,43 +154,115 @@ def send_to_flask_b(
     issues_json_path: str,
     flask_b_base_url: Optional[str] = None,
     timeout_sec: int = 600,
-    retries: int = 1,
+    retries: int = 2,
     accept: str = "application/pdf",
-) -> Tuple[bytes, str, Optional[str]]:
+    extracted_path: Optional[str] = None,
+    handoff: Optional[str] = None,
+    stream_body: bool = False,
+    extra_fields: Optional[dict] = None,
+    busy_wait: Optional[float] = None,
+    pool: Optional[BackendPool] = None,
+) -> Tuple[Union[bytes, StreamedBody], str, Optional[str]]:
     """
     Flask B의 /deep-analyze 로 멀티파트 업로드 → 응답 바디/콘텐츠타입/파일명 추출.
-    반환: (body_bytes, content_type, filename_or_none)
+    handoff="shared"(또는 FLASK_B_HANDOFF=shared)이고 extracted_path가 있으면
+    파일을 올리지 않고 경로만 넘긴다.
+    stream_body=True면 바디를 메모리에 모으지 않고 StreamedBody로 돌려준다.
+    extra_fields: 함께 보낼 폼 필드 (예: 증분 작업의 base_job_id, changed_paths)
+    busy_wait: B의 429/503 + Retry-After를 따라 기다릴 총 시간 (기본 FORWARD_BUSY_WAIT).
+               일반 재시도 횟수(retries)와 따로 센다. 넘으면 BackendBusy
+    pool: 보낼 B 목록 (기본 balancer.POOL). flask_b_base_url을 주면 그 B 하나로만 보낸다.
+          연결 실패/502/503은 다른 B로 바로 넘기고, 바쁜 B는 Retry-After 동안 피한다.
+          base_job_id가 있으면 그 작업을 처리한 B를 우선한다 (이전 조각 재사용)
+    반환: (body_bytes | StreamedBody, content_type, filename_or_none)
     """
-    base = (flask_b_base_url or DEFAULT_FLASK_B_BASE).rstrip("/")
-    url = f"{base}{RECEIVE_ENDPOINT}"
+    busy_wait = FORWARD_BUSY_WAIT if busy_wait is None else busy_wait
+    if flask_b_base_url:
+        pool = BackendPool([flask_b_base_url], health_interval=0)
+    pool = pool or POOL
+    prefer = pool.owner((extra_fields or {}).get("base_job_id"))
 
-    _exists_or_raise(source_zip_path, "source_zip")
+    shared = (handoff or HANDOFF_MODE) == "shared" and extracted_path is not None
+    if shared:
+        _exists_or_raise(extracted_path, "extracted_path")
+    else:
+        _exists_or_raise(source_zip_path, "source_zip")
     _exists_or_raise(issues_json_path, "issues_json")
 
     headers = {"Accept": accept}
 
     last_err = None
-    for attempt in range(retries + 1):
+    attempt = busy_attempt = busy_hops = 0
+    busy_waited = 0.0
+    failed = []
+    while attempt <= retries:
+        backend = pool.acquire(exclude=failed, prefer=prefer)
+        url = f"{backend.url}{RECEIVE_ENDPOINT}"
+        handed_off = False
         try:
-            with open(source_zip_path, "rb") as f_zip, open(issues_json_path, "rb") as f_json:
-                files = {
-                    "source_zip": ("source.zip", f_zip, "application/zip"),
-                    "json_file":  ("issues.json", f_json, "application/json"),
-                }
-                data = {"job_id": job_id}
-
-                resp = requests.post(
+            with ExitStack() as stack:
+                data = {"job_id": job_id, **(extra_fields or {})}
+                files = None
+                if shared:
+                    data.update({
+                        "handoff": "shared",
+                        "workspace_path": os.path.abspath(extracted_path),
+                        "issues_path": os.path.abspath(issues_json_path),
+                    })
+                else:
+                    f_zip = stack.enter_context(open(source_zip_path, "rb"))
+                    f_json = stack.enter_context(open(issues_json_path, "rb"))
+                    files = {
+                        "source_zip": ("source.zip", f_zip, "application/zip"),
+                        "json_file":  ("issues.json", f_json, "application/json"),
+                    }
+
+                resp = _SESSION.post(
                     url,
                     data=data,
                     files=files,
                     headers=headers,
-                    timeout=timeout_sec,
+                    timeout=(FORWARD_CONNECT_TIMEOUT, timeout_sec),
                     stream=True,
                 )
-                resp.raise_for_status()
+                FORWARD_RESPONSES.inc(status=resp.status_code)
+                if resp.status_code in BUSY_STATUS:
+                    delay = _retry_after(resp)
+                    if delay is not None or resp.status_code == 429:
+                        resp.close()
+                        # Retry-After: 0이어도 최소 백오프만큼은 피한다 (같은 B에 곧바로 다시 올리지 않도록)
+                        pool.busy(backend, max(delay or 0.0, _backoff(busy_attempt)))
+                        busy_attempt += 1
+                        busy_hops += 1
+                        # 한가한 B가 남아 있으면 기다리지 않고 그쪽으로. 한 바퀴(B 수만큼) 넘기면 기다린다
+                        delay = pool.busy_for()
+                        if not delay and busy_hops < len(pool.backends):
+                            print(f"[B 전송 분산] {backend.url} 바쁨(HTTP {resp.status_code}) → 다른 B로")
+                            BACKEND_FAILOVERS.inc(reason="busy")
+                            continue
+                        busy_hops = 0
+                        delay = delay or _backoff(busy_attempt)
+                        if busy_waited + delay > busy_wait:
+                            raise BackendBusy(f"Flask B is busy (HTTP {resp.status_code})",
+                                              resp.status_code, max(1, math.ceil(delay)))
+                        print(f"[B 전송 대기] B가 바쁨(HTTP {resp.status_code}) → {delay:.1f}s 후 재시도")
+                        time.sleep(delay)
+                        busy_waited += delay
+                        continue
+                try:
+                    resp.raise_for_status()
+                except requests.exceptions.HTTPError:
+                    resp.close()
+                    raise
 
+                pool.succeeded(backend, job_id)
                 content_type = resp.headers.get("Content-Type", "") or ""
-                body = resp.content
+                if stream_body:
+                    body = StreamedBody(resp, on_close=lambda: pool.release(backend))
+                    handed_off = True
+                else:
+                    with resp:
+                        body = resp.content
 
                 # 파일명 파싱 (PDF일 때 다운로드 이름으로 활용)
                 cd = resp.headers.get("Content-Disposition", "") or ""
@@ -92,11 +270,28 @@ def send_to_flask_b(
 
                 return body, content_type, filename
 
+        except BackendBusy:
+            raise
         except Exception as e:
             last_err = e
-            if attempt < retries:
-                time.sleep(1.0)
+            if attempt < retries and _is_retryable(e):
+                pool.failed(backend, type(e).__name__)
+                failed.append(backend)
+                FORWARD_RETRIES.inc()
+                attempt += 1
+                # 아직 시도하지 않은 B가 있으면 바로 넘긴다. 모두 실패했으면 백오프 후 처음부터
+                if len(set(failed)) < len(pool.backends):
+                    print(f"[B 전송 분산] {backend.url} 실패({type(e).__name__}) → 다른 B로")
+                    BACKEND_FAILOVERS.inc(reason="error")
+                    continue
+                failed.clear()
+                delay = _backoff(attempt - 1)
+                print(f"[B 전송 재시도] {type(e).__name__}: {e} → {delay:.1f}s 후 재시도")
+                time.sleep(delay)
                 continue
             break
+        finally:
+            if not handed_off:
+                pool.release(backend)
 
     raise ForwardError(f"Failed to obtain response from Flask B: {last_err}")
@@ -0,0 +1,9 @@
+# janitor.py
+# 정리 구현은 common/janitor.py. 여기서는 A 영역들의 보존 시간만 정한다
+import shared_path  # noqa: F401
+from common.janitor import Janitor, area, hours, touch  # noqa: F401
+
+# 영역별 보존 시간
+UPLOADS_TTL = hours("JANITOR_UPLOADS_TTL_HOURS", "24")     # 업로드 ZIP + 해제된 트리
+OUTPUTS_TTL = hours("JANITOR_OUTPUTS_TTL_HOURS", "168")    # issues.json, 매니페스트, 보고서
+RULES_TTL = hours("JANITOR_RULES_TTL_HOURS", "720")        # 현재 버전이 아닌 룰 팩
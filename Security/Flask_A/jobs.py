@@ -0,0 +1,259 @@
+# jobs.py
+import os
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+import traceback
+from typing import Callable, Iterable, List, Optional, Tuple, Union
+
+# 백그라운드 파이프라인 작업자 수
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+# 대기(queued) 작업 수 상한. 넘으면 POST /jobs가 429 (0 = 제한 없음)
+JOB_MAX_QUEUED = int(os.environ.get("JOB_MAX_QUEUED", "64"))
+# 백그라운드 작업이 B의 바쁨 응답(429/503 + Retry-After)을 따라 기다릴 총 시간(초)
+JOB_BUSY_WAIT = float(os.environ.get("JOB_BUSY_WAIT", "600"))
+# running 작업의 임대 시간(초). 작업자가 살아 있는 동안 1/3 주기로 갱신하고, 갱신이 끊긴(프로세스가 죽은)
+# 작업만 다시 queued로 돌린다 → 같은 DB를 쓰는 A 프로세스가 여럿이어도 남의 작업을 두 번 돌리지 않는다
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", "60"))
+
+# 상태: queued → running → done | failed
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+class JobExists(Exception):
+    """같은 job_id의 작업이 이미 있음 (409)"""
+
+    def __init__(self, job_id: str):
+        super().__init__(f"Job {job_id} already exists")
+        self.job_id = job_id
+
+class JobStore:
+    """
+    작업 큐/상태 저장소 (SQLite). 프로세스가 재시작돼도 queued 작업이 남는다.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " job_id TEXT PRIMARY KEY, status TEXT NOT NULL,"
+                " zip_path TEXT NOT NULL, accept TEXT NOT NULL,"
+                " created_at REAL NOT NULL, started_at REAL, finished_at REAL,"
+                " result_path TEXT, content_type TEXT, filename TEXT, error TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+            # 이전 버전에서 만든 DB에는 없는 열
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            for name, decl in (("base_job_id", "TEXT"), ("forward_only", "INTEGER NOT NULL DEFAULT 0"),
+                               ("owner", "TEXT"), ("lease_until", "REAL")):
+                if name not in columns:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {decl}")
+
+    def create(self, job_id: str, zip_path: str, accept: str, base_job_id: Optional[str] = None,
+               forward_only: bool = False):
+        """같은 job_id가 이미 있으면 JobExists (진행 중인 작업을 덮어쓰지 않는다)"""
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT INTO jobs (job_id, status, zip_path, accept, created_at, base_job_id,"
+                    " forward_only) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, QUEUED, zip_path, accept, time.time(), base_job_id, int(forward_only)),
+                )
+        except sqlite3.IntegrityError:
+            raise JobExists(job_id) from None
+
+    def claim(self, owner: str, lease: float = JOB_LEASE_SECONDS) -> Optional[sqlite3.Row]:
+        """가장 오래된 queued 작업 하나를 owner의 running으로 바꾸고 반환 (lease초 동안 유효, renew로 연장)"""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, owner = ?, lease_until = ?"
+                " WHERE job_id = ? AND status = ?",
+                (RUNNING, now, owner, now + lease, row["job_id"], QUEUED),
+            )
+            # 다른 프로세스가 먼저 가져갔으면 이번 차례는 건너뛴다
+            return row if cur.rowcount == 1 else None
+
+    def finish(self, job_id: str, owner: str, result_path: str, content_type: str, filename: Optional[str]) -> bool:
+        """owner가 임대 중인 running 작업만 done으로. 임대를 잃었으면(만료 후 재등록) False"""
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, result_path = ?, content_type = ?,"
+                " filename = ? WHERE job_id = ? AND owner = ? AND status = ?",
+                (DONE, time.time(), result_path, content_type, filename, job_id, owner, RUNNING),
+            )
+            return cur.rowcount == 1
+
+    def fail(self, job_id: str, owner: str, error: str) -> bool:
+        """owner가 임대 중인 running 작업만 failed로. 임대를 잃었으면 False"""
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE job_id = ? AND owner = ? AND status = ?",
+                (FAILED, time.time(), error, job_id, owner, RUNNING),
+            )
+            return cur.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def renew(self, owner: str, lease: float = JOB_LEASE_SECONDS) -> int:
+        """owner가 돌리고 있는 running 작업의 임대를 연장"""
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE owner = ? AND status = ?",
+                (time.time() + lease, owner, RUNNING),
+            )
+            return cur.rowcount
+
+    def requeue_expired(self) -> int:
+        """임대가 끝난 running 작업(돌리던 프로세스가 죽음)을 다시 queued로. 임대가 없는 예전 행도 포함"""
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, owner = NULL, lease_until = NULL"
+                " WHERE status = ? AND (lease_until IS NULL OR lease_until < ?)",
+                (QUEUED, RUNNING, time.time()),
+            )
+            return cur.rowcount
+
+    def active_ids(self) -> List[str]:
+        """queued/running 작업 id (정리 대상에서 제외)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchall()
+        return [row["job_id"] for row in rows]
+
+    def count(self, status: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+
+    def recent_duration(self, n: int = 20) -> Optional[float]:
+        """최근 완료된 작업 n개의 평균 처리 시간(초). 없으면 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT AVG(finished_at - started_at) FROM (SELECT started_at, finished_at FROM jobs"
+                " WHERE status = ? AND started_at IS NOT NULL ORDER BY finished_at DESC LIMIT ?)",
+                (DONE, n),
+            ).fetchone()
+        return row[0]
+
+# runner(job_id, zip_path, accept, base_job_id=..., forward_only=...) → (body, content_type, filename). body는 bytes 또는 청크 이터러블
+Runner = Callable[..., Tuple[Union[bytes, Iterable[bytes]], str, Optional[str]]]
+
+class JobQueue:
+    """
+    JobStore를 소비하는 로컬 작업자 스레드 풀. 결과는 result_dir(job_id)/report.* 로 저장한다.
+    """
+
+    def __init__(self, store: JobStore, runner: Runner, result_dir: Callable[[str], str],
+                 workers: int = JOB_WORKERS, max_queued: int = JOB_MAX_QUEUED):
+        self.store = store
+        self.runner = runner
+        self.result_dir = result_dir
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        # 이 프로세스의 작업자 식별자 (임대 소유자)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease = JOB_LEASE_SECONDS
+        self._wakeup = threading.Condition()
+        self._started = False
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """여러 번 불려도 한 번만 시작"""
+        with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+            self._requeue()
+            for i in range(self.workers):
+                threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True).start()
+            threading.Thread(target=self._heartbeat, name="job-lease", daemon=True).start()
+
+    def _requeue(self):
+        requeued = self.store.requeue_expired()
+        if requeued:
+            print(f"[작업 큐] 임대가 끝난(중단된) 작업 {requeued}개 재등록")
+            with self._wakeup:
+                self._wakeup.notify_all()
+
+    def _heartbeat(self):
+        """내 running 작업의 임대 연장 + 다른 프로세스가 남긴 만료 작업 회수"""
+        while True:
+            time.sleep(self.lease / 3)
+            try:
+                self.store.renew(self.owner, self.lease)
+                self._requeue()
+            except Exception as e:
+                print(f"[작업 큐] 임대 갱신 실패 → {e}")
+
+    def full(self) -> bool:
+        return bool(self.max_queued) and self.store.count(QUEUED) >= self.max_queued
+
+    def retry_after(self) -> int:
+        """대기 중인 작업이 모두 작업자에게 넘어갈 때까지의 예상 시간(초)"""
+        duration = self.store.recent_duration() or 30.0
+        return max(1, int(duration * (self.store.count(QUEUED) + 1) / self.workers))
+
+    def submit(self, job_id: str, zip_path: str, accept: str, base_job_id: Optional[str] = None,
+               forward_only: bool = False):
+        """forward_only: 분석은 이미 끝났고(스트리밍 응답) B 전송만 남은 작업. 같은 job_id가 있으면 JobExists"""
+        self.store.create(job_id, zip_path, accept, base_job_id, forward_only)
+        with self._wakeup:
+            self._wakeup.notify()
+
+    def _loop(self):
+        while True:
+            row = self.store.claim(self.owner, self.lease)
+            if row is None:
+                with self._wakeup:
+                    self._wakeup.wait(timeout=5.0)
+                continue
+            self._run(row)
+
+    def _run(self, row):
+        job_id = row["job_id"]
+        print(f"[작업 시작] {job_id}")
+        try:
+            body, content_type, filename = self.runner(
+                job_id, row["zip_path"], row["accept"],
+                base_job_id=row["base_job_id"], forward_only=bool(row["forward_only"]),
+            )
+            ext = "pdf" if "pdf" in (content_type or "") else "json"
+            out_dir = self.result_dir(job_id)
+            os.makedirs(out_dir, exist_ok=True)
+            result_path = os.path.join(out_dir, f"report.{ext}")
+            with open(result_path, "wb") as f:
+                if isinstance(body, (bytes, bytearray)):
+                    f.write(body)
+                else:
+                    # 스트리밍 바디는 청크 단위로 디스크에 기록
+                    for chunk in body:
+                        f.write(chunk)
+            if self.store.finish(job_id, self.owner, result_path, content_type, filename):
+                print(f"[작업 완료] {job_id}")
+            else:
+                self._lost(job_id)
+        except Exception as e:
+            traceback.print_exc()
+            if self.store.fail(job_id, self.owner, str(e)):
+                print(f"[작업 실패] {job_id}: {e}")
+            else:
+                self._lost(job_id)
+
+    def _lost(self, job_id):
+        # 임대가 끝나 다른 작업자가 다시 가져간 작업 → 그쪽 결과/상태를 덮어쓰지 않는다
+        print(f"[작업 임대 상실] {job_id}: 다른 작업자가 다시 가져감 → 이 작업자의 결과는 기록하지 않음")
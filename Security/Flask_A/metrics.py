@@ -0,0 +1,27 @@
+# metrics.py
+# 레지스트리, span, 공용 메트릭은 common/metrics.py. 여기서는 A의 메트릭 접두사와 A 전용 메트릭만 정한다
+import shared_path  # noqa: F401
+from common.metrics import (  # noqa: F401  (A 모듈들은 계속 metrics에서 import한다)
+    CONTENT_TYPE, REGISTRY, HTTP_REQUESTS, HTTP_SECONDS, HTTP_IN_FLIGHT,
+    record_extract, parse_server_timing, current_timeline, job_timeline, span,
+)
+
+REGISTRY.configure("flask_a")
+
+SEMGREP_BATCH_SECONDS = REGISTRY.histogram("semgrep_batch_seconds", "Semgrep invocation wall time", ("label",))
+SEMGREP_BATCHES = REGISTRY.counter("semgrep_batches_total", "Semgrep invocations by outcome", ("outcome",))
+SEMGREP_FILES = REGISTRY.counter("semgrep_files_total", "Files handed to Semgrep or served from cache",
+                                 ("source",))
+FINDINGS = REGISTRY.counter("findings_total", "Findings written to issues.json (cached and carried over included)")
+FORWARD_RESPONSES = REGISTRY.counter("forward_responses_total", "Flask B responses by status", ("status",))
+FORWARD_RETRIES = REGISTRY.counter("forward_retries_total", "Retried requests to Flask B")
+
+def record_scan(scan_stats):
+    """detector가 채운 스캔 통계(배치별 소요 시간, 캐시 적중) → 히스토그램/카운터"""
+    for batch in scan_stats.get("batches") or []:
+        SEMGREP_BATCH_SECONDS.observe(batch["wall_time"], label=batch["label"])
+        SEMGREP_BATCHES.inc(outcome="failed" if batch["failed"] else "ok")
+        SEMGREP_FILES.inc(batch["files"], source="semgrep")
+    cache = scan_stats.get("cache") or {}
+    if cache.get("hits"):
+        SEMGREP_FILES.inc(cache["hits"], source="cache")
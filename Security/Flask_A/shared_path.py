@@ -0,0 +1,9 @@
+# shared_path.py
+# 서비스는 자기 폴더(Flask_A/)에서 실행되므로, A/B 공용 패키지(Security/common)를 import할 수 있게
+# Security/를 sys.path에 넣는다. common을 쓰는 모듈은 이 모듈을 먼저 import한다
+import os
+import sys
+
+SECURITY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SECURITY_DIR not in sys.path:
+    sys.path.append(SECURITY_DIR)
@@ -0,0 +1,182 @@
+# BackendPool(가장 한가한 B 고르기, 제외/복귀, 바쁨 창, 증분 작업 affinity)과 forwarder의 재전송 루프를 확인한다
+import os
+import sys
+import time
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import balancer  # noqa: E402
+import forwarder  # noqa: E402
+from balancer import BackendPool  # noqa: E402
+
+def make_pool(*urls):
+    return BackendPool(urls or ("http://b1", "http://b2"), health_interval=0)
+
+@pytest.mark.parametrize("state, expected", [
+    # (b1 상태, b2 상태) → 골라야 할 B
+    (({}, {}), None),
+    (({"outstanding": 2}, {}), "http://b2"),
+    (({"reported": {"jobs": 3, "capacity": 4}}, {"reported": {"jobs": 1, "capacity": 4}}), "http://b2"),
+    (({"reported": {"jobs": 1, "waiting": 4, "capacity": 4}}, {"reported": {"jobs": 2, "capacity": 4}}), "http://b2"),
+    (({"busy": True}, {"outstanding": 5}), "http://b2"),
+    (({"ejected": True}, {"busy": True}), "http://b2"),
+])
+def test_acquire_scores_backends(state, expected):
+    pool = make_pool()
+    now = time.monotonic()
+    for b, s in zip(pool.backends, state):
+        b.outstanding = s.get("outstanding", 0)
+        b.reported = s.get("reported")
+        if s.get("busy"):
+            b.busy_until = now + 60
+        if s.get("ejected"):
+            b.ejected_until = now + 60
+    chosen = pool.acquire()
+    if expected is not None:
+        assert chosen.url == expected
+    assert chosen.outstanding == state[pool.backends.index(chosen)].get("outstanding", 0) + 1
+    pool.release(chosen)
+
+def test_acquire_exclude_and_prefer():
+    pool = make_pool("http://b1", "http://b2", "http://b3")
+    b1, b2, b3 = pool.backends
+    b1.outstanding, b2.outstanding, b3.outstanding = 0, 1, 1
+
+    assert pool.acquire(exclude=[b1]).url in ("http://b2", "http://b3")
+    # 모두 제외되면 그래도 하나는 고른다
+    assert pool.acquire(exclude=pool.backends) in pool.backends
+    # prefer는 한가하고(부하 < 1) 정상일 때만. 더 한가한 b1이 있어도 b3로
+    for b in pool.backends:
+        b.outstanding = 0
+    b1.reported, b3.reported = None, {"jobs": 1, "capacity": 4}
+    assert pool.acquire(prefer="http://b3") is b3
+    b3.busy_until = time.monotonic() + 60
+    assert pool.acquire(prefer="http://b3") is not b3
+    b3.busy_until = 0
+    b3.reported = {"jobs": 4, "capacity": 4}
+    assert pool.acquire(prefer="http://b3") is not b3
+    # 제외된 B는 prefer 대상이 아니다
+    assert pool.acquire(exclude=[b3], prefer="http://b3") is not b3
+
+def test_busy_window_expires():
+    pool = make_pool("http://b1")
+    b1 = pool.backends[0]
+    pool.busy(b1, 0.05)
+    assert 0 < pool.busy_for() <= 0.05
+    time.sleep(0.06)
+    assert pool.busy_for() == 0
+    # 더 짧은 창으로 덮어쓰지 않는다
+    pool.busy(b1, 10)
+    pool.busy(b1, 0)
+    assert pool.busy_for() > 9
+
+def test_busy_for_is_zero_while_another_backend_is_free():
+    pool = make_pool()
+    pool.busy(pool.backends[0], 60)
+    assert pool.busy_for() == 0
+    pool.busy(pool.backends[1], 30)
+    assert 29 < pool.busy_for() <= 30
+
+def test_failures_eject_until_success(monkeypatch):
+    monkeypatch.setattr(balancer, "BALANCER_EJECT_AFTER", 2)
+    monkeypatch.setattr(balancer, "BALANCER_EJECT_SECONDS", 60)
+    pool = make_pool()
+    b1, b2 = pool.backends
+    b2.outstanding = 10
+
+    pool.failed(b1, "ConnectionError")
+    assert b1.healthy(time.monotonic())
+    pool.failed(b1, "ConnectionError")
+    assert not b1.healthy(time.monotonic())
+    assert balancer.BACKEND_UP.value(backend="http://b1") == 0
+    # 제외된 B보다는 붐비는 B로
+    assert pool.acquire() is b2
+
+    pool.succeeded(b1, "job-1")
+    assert b1.healthy(time.monotonic()) and b1.failures == 0
+    assert balancer.BACKEND_UP.value(backend="http://b1") == 1
+    assert pool.owner("job-1") == "http://b1"
+    assert pool.owner("job-2") is None and pool.owner(None) is None
+
+def test_health_check_updates_load_and_reinstates(monkeypatch):
+    pool = make_pool()
+    b1 = pool.backends[0]
+    b1.ejected_until = time.monotonic() + 60
+
+    class Resp:
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {"load": {"jobs": 1, "waiting": 0, "capacity": 4}}
+
+    monkeypatch.setattr(balancer.requests, "get", lambda url, timeout: Resp())
+    pool.check(b1)
+    assert b1.reported == {"jobs": 1, "waiting": 0, "capacity": 4}
+    assert b1.healthy(time.monotonic())
+
+    def down(url, timeout):
+        raise balancer.requests.ConnectionError("refused")
+
+    monkeypatch.setattr(balancer.requests, "get", down)
+    pool.check(b1)
+    assert b1.failures == 1
+
+# ---- forwarder: 바쁨 응답이 이어질 때 ----
+
+class BusyResponse:
+    def __init__(self, status, retry_after):
+        self.status_code = status
+        self.headers = {} if retry_after is None else {"Retry-After": retry_after}
+
+    def close(self):
+        pass
+
+class BusySession:
+    def __init__(self, status=503, retry_after="0"):
+        self.status, self.retry_after, self.posts = status, retry_after, []
+
+    def post(self, url, **kwargs):
+        self.posts.append(url)
+        return BusyResponse(self.status, self.retry_after)
+
+@pytest.fixture
+def upload(tmp_path):
+    zip_path, issues_path = tmp_path / "source.zip", tmp_path / "issues.json"
+    zip_path.write_bytes(b"PK")
+    issues_path.write_text("[]")
+    return str(zip_path), str(issues_path)
+
+@pytest.mark.parametrize("backends", [1, 3])
+@pytest.mark.parametrize("status, retry_after", [(503, "0"), (429, "0"), (429, None)])
+def test_busy_backends_end_in_backend_busy(monkeypatch, upload, backends, status, retry_after):
+    session = BusySession(status, retry_after)
+    slept = []
+    monkeypatch.setattr(forwarder, "_SESSION", session)
+    monkeypatch.setattr(forwarder.time, "sleep", slept.append)
+    pool = make_pool(*[f"http://b{i}" for i in range(backends)])
+
+    with pytest.raises(forwarder.BackendBusy):
+        forwarder.send_to_flask_b("job", *upload, pool=pool, busy_wait=2)
+
+    # 한 바퀴마다 기다리고, 기다린 시간이 busy_wait을 넘기 전에 멈춘다
+    assert slept and sum(slept) <= 2
+    assert len(session.posts) <= backends * (len(slept) + 1)
+    # 바쁨으로 끝난 전송은 outstanding을 남기지 않는다
+    assert all(b.outstanding == 0 for b in pool.backends)
+
+def test_busy_backend_fails_over_before_waiting(monkeypatch, upload):
+    session = BusySession(503, "0")
+    slept = []
+    monkeypatch.setattr(forwarder, "_SESSION", session)
+    monkeypatch.setattr(forwarder.time, "sleep", slept.append)
+    pool = make_pool()
+
+    with pytest.raises(forwarder.BackendBusy):
+        forwarder.send_to_flask_b("job", *upload, pool=pool, busy_wait=0)
+    # 두 B를 한 번씩 시도한 뒤, 기다릴 수 없으므로 바로 BackendBusy
+    assert sorted(session.posts) == ["http://b1/deep-analyze", "http://b2/deep-analyze"]
+    assert slept == []
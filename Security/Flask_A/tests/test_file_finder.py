@@ -0,0 +1,144 @@
+# .gitignore 규칙(부정, 고정 경로, 디렉토리 전용, '**', 하위 .gitignore 범위)과 압축/바이너리 판정을 확인한다
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from analysis import file_finder  # noqa: E402
+from analysis.file_finder import gitignored, parse_gitignore, scan_source_files, sniff_file  # noqa: E402
+
+def rules_for(tmp_path, text, base=""):
+    path = tmp_path / ".gitignore"
+    path.write_text(text)
+    return parse_gitignore(str(path), base)
+
+@pytest.mark.parametrize("text, rel_path, is_dir, expected", [
+    # 이름 패턴은 어느 깊이에도
+    ("*.log", "app.log", False, True),
+    ("*.log", "a/b/app.log", False, True),
+    ("*.log", "a/app.log.py", False, False),
+    # '*'는 '/'를 넘지 않는다
+    ("a/*.py", "a/b/c.py", False, False),
+    ("a/*.py", "a/c.py", False, True),
+    # '/'로 시작하면 .gitignore 위치에 고정
+    ("/build.py", "build.py", False, True),
+    ("/build.py", "src/build.py", False, False),
+    # 중간에 '/'가 있어도 고정
+    ("doc/frotz", "doc/frotz", True, True),
+    ("doc/frotz", "a/doc/frotz", True, False),
+    # '/'로 끝나면 디렉토리에만
+    ("gen/", "gen", True, True),
+    ("gen/", "gen", False, False),
+    ("gen/", "src/gen", True, True),
+    # '**'
+    ("**/fixtures", "fixtures", True, True),
+    ("**/fixtures", "a/b/fixtures", True, True),
+    ("a/**/b.py", "a/b.py", False, True),
+    ("a/**/b.py", "a/x/y/b.py", False, True),
+    ("a/**/b.py", "c/a/x/b.py", False, False),
+    ("out/**", "out/x/y.py", False, True),
+    ("out/**", "out", True, False),
+    # 문자 클래스와 '?'
+    ("file[0-9].py", "file3.py", False, True),
+    ("file[!0-9].py", "file3.py", False, False),
+    ("file?.py", "file10.py", False, False),
+    # 주석, 빈 줄, 이스케이프
+    ("# comment\n\n\\#keep.py", "#keep.py", False, True),
+])
+def test_gitignore_patterns(tmp_path, text, rel_path, is_dir, expected):
+    assert gitignored(rules_for(tmp_path, text), rel_path, is_dir) is expected
+
+def test_negation_last_match_wins(tmp_path):
+    rules = rules_for(tmp_path, "*.py\n!keep.py\n")
+    assert gitignored(rules, "drop.py", False)
+    assert not gitignored(rules, "keep.py", False)
+    assert not gitignored(rules, "src/keep.py", False)
+
+    rules = rules_for(tmp_path, "!keep.py\n*.py\n")
+    assert gitignored(rules, "keep.py", False)
+
+def test_nested_gitignore_rules_are_scoped_to_their_directory(tmp_path):
+    rules = rules_for(tmp_path, "*.py\n/top.py\n", base="sub")
+    assert gitignored(rules, "sub/a.py", False)
+    assert gitignored(rules, "sub/deep/a.py", False)
+    assert gitignored(rules, "sub/top.py", False)
+    assert not gitignored(rules, "sub/deep/top.js", False)
+    # 형제 디렉토리나 이름이 같은 접두사(subway)에는 적용되지 않는다
+    assert not gitignored(rules, "a.py", False)
+    assert not gitignored(rules, "subway/a.py", False)
+
+def write(root, rel, content="x = 1\n"):
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(content, bytes):
+        path.write_bytes(content)
+    else:
+        path.write_text(content)
+
+def scanned(root):
+    files, stats = scan_source_files(str(root))
+    paths = sorted(os.path.relpath(p, root).replace(os.sep, "/") for ps in files.values() for p in ps)
+    return paths, stats
+
+def test_scan_applies_nested_gitignores(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_finder, "SCAN_GITIGNORE", True)
+    write(tmp_path, ".gitignore", "/gen/\n*.tmp.py\n!important.tmp.py\n")
+    write(tmp_path, "app.py")
+    write(tmp_path, "gen/out.py")
+    write(tmp_path, "lib/gen/util.py")          # '/gen/'은 루트 gen만
+    write(tmp_path, "scratch.tmp.py")
+    write(tmp_path, "important.tmp.py")
+    write(tmp_path, "pkg/.gitignore", "local.py\n")
+    write(tmp_path, "pkg/local.py")
+    write(tmp_path, "pkg/inner/local.py")
+    write(tmp_path, "other/local.py")            # pkg/.gitignore 범위 밖
+    write(tmp_path, "node_modules/dep.js")
+
+    paths, stats = scanned(tmp_path)
+    assert paths == ["app.py", "important.tmp.py", "lib/gen/util.py", "other/local.py"]
+    assert stats["pruned_dirs"] == 2
+    assert stats["skipped"]["gitignore"]["files"] == 3
+
+def test_scan_can_disable_gitignore(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_finder, "SCAN_GITIGNORE", False)
+    write(tmp_path, ".gitignore", "*.py\n")
+    write(tmp_path, "app.py")
+    assert scanned(tmp_path)[0] == ["app.py"]
+
+@pytest.mark.parametrize("name, content, expected", [
+    ("app.js", "var a = 1;\n" * 1000, None),
+    ("app.js", "var a=1;" * 1000, "minified"),        # 줄이 매우 긴 큰 파일
+    ("small.js", "var a=1;" * 100, None),             # 스니프 블록의 절반도 안 되면 판정하지 않는다
+    ("lib.min.js", "var a = 1;\n", "minified"),
+    ("lib-min.css.js", "var a = 1;\n", None),
+    ("app.bundle.js", "var a = 1;\n", "minified"),
+    ("data.json", b"{\"a\": 1}\0\0", "binary"),
+])
+def test_sniff_file(tmp_path, monkeypatch, name, content, expected):
+    monkeypatch.setattr(file_finder, "SCAN_SKIP_MINIFIED", True)
+    write(tmp_path, name, content)
+    assert sniff_file(str(tmp_path / name), name) == expected
+
+def test_sniff_keeps_minified_when_disabled_but_not_binary(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_finder, "SCAN_SKIP_MINIFIED", False)
+    write(tmp_path, "lib.min.js", "var a=1;" * 1000)
+    write(tmp_path, "blob.js", b"\0" * 10)
+    assert sniff_file(str(tmp_path / "lib.min.js"), "lib.min.js") is None
+    assert sniff_file(str(tmp_path / "blob.js"), "blob.js") == "binary"
+
+def test_scan_reports_skip_reasons(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_finder, "SCAN_SKIP_MINIFIED", True)
+    write(tmp_path, "app.js", "var a = 1;\n")
+    write(tmp_path, "vendor.min.js", "var a=1;")
+    write(tmp_path, "blob.js", b"\0" * 10)
+    write(tmp_path, "big.js", "var a = 1;\n" * 200)
+
+    files, stats = scan_source_files(str(tmp_path), max_file_bytes=1024)
+    assert [os.path.basename(p) for p in files["js"]] == ["app.js"]
+    assert {reason: b["files"] for reason, b in stats["skipped"].items()} == {
+        "binary": 1, "minified": 1, "too_large": 1,
+    }
+    assert stats["languages"] == {"javascript": 1}
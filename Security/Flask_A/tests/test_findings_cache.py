@@ -0,0 +1,93 @@
+# Semgrep 결과 캐시: 룰셋/semgrep 버전/내용/확장자가 바뀌면 적중하지 않고, 크기 상한을 넘으면 LRU로 지우는지 확인한다
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from analysis import findings_cache  # noqa: E402
+from analysis.detector import _lookup_cache  # noqa: E402
+from analysis.findings_cache import FindingsCache, file_digest, make_key  # noqa: E402
+from analysis.rules import ruleset_hash  # noqa: E402
+
+ISSUES = [{"check_id": "python.eval", "start": {"line": 1}, "extra": {"severity": "ERROR"}}]
+
+@pytest.fixture
+def cache(tmp_path):
+    return FindingsCache(str(tmp_path / "findings.sqlite"), max_bytes=1 << 20)
+
+def test_key_depends_on_every_part():
+    base = make_key("abc", "src/app.py", "local:1111", "1.50.0")
+    assert make_key("abc", "other/dir/app.PY", "local:1111", "1.50.0") == base
+    assert make_key("abd", "src/app.py", "local:1111", "1.50.0") != base
+    assert make_key("abc", "src/app.js", "local:1111", "1.50.0") != base
+    assert make_key("abc", "src/app.py", "local:2222", "1.50.0") != base
+    assert make_key("abc", "src/app.py", "local:1111", "1.51.0") != base
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return str(path)
+
+def test_changed_ruleset_or_semgrep_version_misses(tmp_path, cache):
+    source = write(tmp_path / "project" / "app.py", "eval(x)\n")
+    rules = tmp_path / "rules"
+    write(rules / "python.yml", "rules: []\n")
+    ruleset = f"local:{ruleset_hash(str(rules))}"
+
+    hits, misses, keys = _lookup_cache(cache, [source], ruleset, "1.50.0")
+    assert hits == {} and misses == [source]
+    cache.put_many([(keys[source], ISSUES)])
+    assert _lookup_cache(cache, [source], ruleset, "1.50.0")[0] == {source: ISSUES}
+
+    # semgrep 업그레이드
+    assert _lookup_cache(cache, [source], ruleset, "1.51.0")[1] == [source]
+    # 룰 파일 내용이 바뀌면 룰셋 해시(캐시 키)도 바뀐다
+    write(rules / "python.yml", "rules: [{id: new}]\n")
+    changed = f"local:{ruleset_hash(str(rules))}"
+    assert changed != ruleset
+    assert _lookup_cache(cache, [source], changed, "1.50.0")[1] == [source]
+    # 룰 파일이 추가돼도
+    write(rules / "extra" / "js.yaml", "rules: []\n")
+    assert f"local:{ruleset_hash(str(rules))}" != changed
+    # 파일 내용이 바뀌어도
+    write(tmp_path / "project" / "app.py", "eval(y)\n")
+    assert _lookup_cache(cache, [source], ruleset, "1.50.0")[1] == [source]
+    assert cache.stats()["hits"] == 1
+
+def test_same_content_at_another_path_hits(tmp_path, cache):
+    first = write(tmp_path / "a" / "app.py", "eval(x)\n")
+    second = write(tmp_path / "b" / "copy.py", "eval(x)\n")
+    cache.put_many([(make_key(file_digest(first), first, "r", "v"), ISSUES)])
+    assert _lookup_cache(cache, [second], "r", "v")[0] == {second: ISSUES}
+
+def test_size_cap_evicts_least_recently_used(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(findings_cache.time, "time", lambda: now[0])
+    one = len('[{"check_id":"python.eval","start":{"line":1},"extra":{"severity":"ERROR"}}]')
+    cache = FindingsCache(str(tmp_path / "findings.sqlite"), max_bytes=3 * one)
+
+    for key in ("a", "b", "c"):
+        cache.put_many([(key, ISSUES)])
+        now[0] += 1
+    assert cache.stats()["bytes"] == 3 * one and cache.stats()["evictions"] == 0
+
+    # 'a'를 최근에 읽었으므로 'b'가 먼저 빠진다
+    assert cache.get_many(["a"]) == {"a": ISSUES}
+    now[0] += 1
+    cache.put_many([("d", ISSUES)])
+    assert set(cache.get_many(["a", "b", "c", "d"])) == {"a", "c", "d"}
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["bytes"] <= stats["max_bytes"]
+
+    # 한 번에 여러 항목이 넘치면 그만큼 지운다
+    now[0] += 1
+    cache.put_many([("e", ISSUES), ("f", ISSUES)])
+    assert cache.stats()["entries"] == 3 and cache.stats()["evictions"] == 3
+
+def test_cache_disabled_without_semgrep_version(monkeypatch):
+    monkeypatch.setattr(findings_cache, "semgrep_version", lambda: None)
+    monkeypatch.setattr(findings_cache, "_cache", None)
+    assert findings_cache.get_cache() is None
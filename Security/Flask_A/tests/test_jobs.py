@@ -0,0 +1,100 @@
+# 작업 임대(claim/renew/requeue_expired)와, 임대를 잃은 작업자가 남의 작업 상태를 덮어쓰지 않는지 확인한다
+import os
+import sys
+import time
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from jobs import JobStore, JobQueue, JobExists, QUEUED, RUNNING, DONE, FAILED  # noqa: E402
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite"))
+
+def expire(store, job_id):
+    with store._conn:
+        store._conn.execute("UPDATE jobs SET lease_until = ? WHERE job_id = ?", (time.time() - 1, job_id))
+
+def test_claim_is_exclusive_and_in_order(store):
+    store.create("j1", "a.zip", "application/pdf")
+    store.create("j2", "b.zip", "application/pdf")
+    with pytest.raises(JobExists):
+        store.create("j1", "c.zip", "application/pdf")
+
+    assert store.claim("w1")["job_id"] == "j1"
+    assert store.claim("w2")["job_id"] == "j2"
+    assert store.claim("w3") is None
+    assert store.get("j1")["owner"] == "w1" and store.get("j1")["status"] == RUNNING
+
+def test_requeue_only_expired_leases(store):
+    store.create("j1", "a.zip", "application/pdf")
+    store.create("j2", "b.zip", "application/pdf")
+    store.claim("w1", lease=60)
+    store.claim("w2", lease=60)
+    expire(store, "j1")
+
+    assert store.requeue_expired() == 1
+    assert store.get("j1")["status"] == QUEUED and store.get("j1")["owner"] is None
+    assert store.get("j2")["status"] == RUNNING
+    assert store.renew("w2", 60) == 1 and store.renew("w1", 60) == 0
+
+def test_finish_and_fail_require_the_lease(store):
+    store.create("j1", "a.zip", "application/pdf")
+    store.claim("w1")
+    expire(store, "j1")
+    store.requeue_expired()
+    store.claim("w2")
+
+    # 임대를 잃은 w1은 w2가 돌리는 작업을 끝내거나 실패로 바꾸지 못한다
+    assert not store.finish("j1", "w1", "/old/report.pdf", "application/pdf", None)
+    assert not store.fail("j1", "w1", "late failure")
+    job = store.get("j1")
+    assert job["status"] == RUNNING and job["owner"] == "w2" and job["error"] is None
+
+    assert store.finish("j1", "w2", "/new/report.pdf", "application/pdf", "report.pdf")
+    assert store.get("j1")["status"] == DONE
+    # 이미 끝난 작업은 다시 바꾸지 않는다
+    assert not store.fail("j1", "w2", "too late")
+    assert store.get("j1")["result_path"] == "/new/report.pdf"
+
+@pytest.mark.parametrize("outcome", ["done", "failed"])
+def test_queue_does_not_record_results_after_losing_the_lease(store, tmp_path, outcome, capsys):
+    store.create("j1", "a.zip", "application/pdf")
+
+    def runner(job_id, zip_path, accept, **kwargs):
+        # 실행 중 임대가 만료되어 다른 작업자가 다시 가져감
+        expire(store, job_id)
+        store.requeue_expired()
+        store.claim("other")
+        if outcome == "failed":
+            raise RuntimeError("boom")
+        return b"%PDF", "application/pdf", "report.pdf"
+
+    queue = JobQueue(store, runner, lambda job_id: str(tmp_path / job_id))
+    queue._run(store.claim(queue.owner))
+
+    job = store.get("j1")
+    assert job["status"] == RUNNING and job["owner"] == "other"
+    assert "[작업 임대 상실] j1" in capsys.readouterr().out
+
+@pytest.mark.parametrize("outcome, status", [("done", DONE), ("failed", FAILED)])
+def test_queue_records_results_while_holding_the_lease(store, tmp_path, outcome, status):
+    store.create("j1", "a.zip", "application/pdf")
+
+    def runner(job_id, zip_path, accept, **kwargs):
+        if outcome == "failed":
+            raise RuntimeError("boom")
+        return iter([b"%PDF", b"-1.7"]), "application/pdf", "report.pdf"
+
+    queue = JobQueue(store, runner, lambda job_id: str(tmp_path / job_id))
+    queue._run(store.claim(queue.owner))
+
+    job = store.get("j1")
+    assert job["status"] == status
+    if status == DONE:
+        assert open(job["result_path"], "rb").read() == b"%PDF-1.7"
+    else:
+        assert job["error"] == "boom"
@@ -0,0 +1,79 @@
+# LineIndex가 예전 텍스트 모드 readlines()와 같은 줄을 돌려주는지(줄바꿈 종류, 끝 줄바꿈, 빈 파일, 범위 밖) 확인한다
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from analysis import formatter  # noqa: E402
+from analysis.formatter import LineIndex, get_line_content  # noqa: E402
+
+CASES = {
+    "lf": b"a = 1\nb = 2\nc = 3\n",
+    "crlf": b"a = 1\r\nb = 2\r\nc = 3\r\n",
+    "lone_cr": b"a = 1\rb = 2\rc = 3",
+    "mixed": b"a = 1\r\nb = 2\rc = 3\n\r\nd = 4",
+    "no_trailing_newline": b"a = 1\nb = 2",
+    "blank_lines": b"\n\n  x = 1  \n\n",
+    "cr_then_lf_pair": b"a\r\r\nb\n\rc",
+    "single_newline": b"\n",
+    "empty": b"",
+}
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_lines_match_text_mode_readlines(tmp_path, name):
+    data = CASES[name]
+    path = tmp_path / "src.py"
+    path.write_bytes(data)
+    # 예전 구현: 텍스트 모드(universal newlines) readlines()
+    with open(path, "r", encoding="utf-8") as f:
+        expected = f.readlines()
+
+    with LineIndex(str(path)) as index:
+        assert len(index) == len(expected)
+        assert [index.line(n) for n in range(1, len(index) + 1)] == [line.strip() for line in expected]
+
+@pytest.mark.parametrize("line_number", [0, -1, 4, 100])
+def test_out_of_range_lines_are_empty(tmp_path, line_number):
+    path = tmp_path / "src.py"
+    path.write_bytes(CASES["lf"])
+    with LineIndex(str(path)) as index:
+        assert index.line(line_number) == ""
+    assert get_line_content(str(path), line_number) == ""
+
+def test_empty_file_has_no_lines(tmp_path):
+    path = tmp_path / "empty.py"
+    path.write_bytes(b"")
+    with LineIndex(str(path)) as index:
+        assert len(index) == 0 and index.line(1) == ""
+
+def test_non_utf8_line_falls_back_to_latin1(tmp_path):
+    path = tmp_path / "latin.py"
+    path.write_bytes("ok = 1\nname = 'caf\xe9'\n".encode("latin-1"))
+    assert get_line_content(str(path), 1) == "ok = 1"
+    assert get_line_content(str(path), 2) == "name = 'caf\xe9'"
+
+def test_missing_file_is_empty(tmp_path):
+    assert get_line_content(str(tmp_path / "missing.py"), 1) == ""
+
+def test_file_is_closed_when_mmap_fails(tmp_path, monkeypatch):
+    path = tmp_path / "src.py"
+    path.write_bytes(CASES["lf"])
+    opened = []
+    real_open = open
+
+    def tracking_open(*args, **kwargs):
+        f = real_open(*args, **kwargs)
+        opened.append(f)
+        return f
+
+    def broken_mmap(*args, **kwargs):
+        raise OSError("mmap failed")
+
+    monkeypatch.setattr(formatter, "open", tracking_open, raising=False)
+    monkeypatch.setattr(formatter.mmap, "mmap", broken_mmap)
+    with pytest.raises(OSError, match="mmap failed"):
+        LineIndex(str(path))
+    assert opened and all(f.closed for f in opened)
@@ -0,0 +1,111 @@
+# 공용 ZIP 해제(common/unzip.py): 상위 폴더 벗기기, 경로 조작 거부, 파일/전체/압축률 제한을 확인한다
+import os
+import sys
+import zipfile
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import shared_path  # noqa: E402,F401
+from common import unzip  # noqa: E402
+from common.unzip import UnsafeZipError, extract, safe_name, top_level_dir  # noqa: E402
+
+def make_zip(tmp_path, entries, compression=zipfile.ZIP_DEFLATED):
+    path = tmp_path / "src.zip"
+    with zipfile.ZipFile(path, "w", compression) as zf:
+        for name, data in entries.items():
+            zf.writestr(zipfile.ZipInfo(name), data, compress_type=compression)
+    return str(path)
+
+def listing(root):
+    out = []
+    for dirpath, _, files in os.walk(root):
+        out.extend(os.path.relpath(os.path.join(dirpath, f), root).replace(os.sep, "/") for f in files)
+    return sorted(out)
+
+@pytest.mark.parametrize("name, expected", [
+    ("a/b.py", "a/b.py"),
+    ("./a//b.py", "a/b.py"),
+    ("a\\b.py", "a/b.py"),
+    ("/etc/passwd", None),
+    ("\\evil.py", None),
+    ("C:/evil.py", None),
+    ("c:evil.py", None),
+    ("../evil.py", None),
+    ("a/../../evil.py", None),
+    ("a/..", None),
+    ("", None),
+    ("./", None),
+])
+def test_safe_name(name, expected):
+    assert safe_name(name) == expected
+
+@pytest.mark.parametrize("names, expected", [
+    (["top/a.py", "top/b/c.py"], "top"),
+    (["a.py"], None),
+    (["top/a.py", "other/b.py"], None),
+    (["top/a.py", "b.py"], None),
+    (["src", "src/a.py"], "src"),
+])
+def test_top_level_dir(names, expected):
+    assert top_level_dir(names) == expected
+
+@pytest.mark.parametrize("strip_top", [False, True])
+def test_extract_scopes_paths_under_the_top_dir(tmp_path, strip_top):
+    zip_path = make_zip(tmp_path, {"proj/app.py": "a", "proj/lib/util.py": "b", "proj/README.md": "c"})
+    dest = tmp_path / "out"
+    seen = []
+
+    def keep(rel):
+        seen.append(rel)
+        return rel.endswith(".py")
+
+    root, stats = extract(zip_path, str(dest), keep=keep, strip_top=strip_top)
+
+    assert sorted(seen) == ["README.md", "app.py", "lib/util.py"]
+    assert root == str(dest if strip_top else dest / "proj")
+    assert listing(root) == ["app.py", "lib/util.py"]
+    assert stats["extracted"] == 2 and stats["skipped"] == 1
+
+@pytest.mark.parametrize("strip_top", [False, True])
+def test_extract_file_named_like_the_top_dir(tmp_path, strip_top):
+    # 폴더와 같은 이름의 파일은 함께 풀 수 없으므로 건너뛰고 나머지는 그대로 푼다
+    zip_path = make_zip(tmp_path, {"src": "file", "src/a.py": "a"})
+    root, stats = extract(zip_path, str(tmp_path / "out"), strip_top=strip_top)
+    assert listing(root) == ["a.py"]
+    assert stats["extracted"] == 1 and stats["skipped"] == 1
+
+def test_extract_skips_unsafe_entries(tmp_path):
+    zip_path = make_zip(tmp_path, {"../evil.py": "x", "/abs.py": "x", "ok.py": "y"})
+    dest = tmp_path / "out"
+    root, stats = extract(zip_path, str(dest))
+    assert stats["unsafe"] == 2 and stats["extracted"] == 1
+    assert listing(tmp_path) == ["out/ok.py", "src.zip"]
+
+def test_extract_skips_files_over_the_per_file_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(unzip, "ZIP_MAX_FILE_BYTES", 10)
+    zip_path = make_zip(tmp_path, {"big.py": "x" * 11, "small.py": "x" * 10})
+    root, stats = extract(zip_path, str(tmp_path / "out"))
+    assert listing(root) == ["small.py"]
+    assert stats["too_large"] == 1 and stats["skipped_bytes"] == 11
+
+def test_extract_stops_at_the_total_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(unzip, "ZIP_MAX_TOTAL_BYTES", 25)
+    zip_path = make_zip(tmp_path, {"a.py": "x" * 10, "b.py": "x" * 10, "c.py": "x" * 10})
+    with pytest.raises(UnsafeZipError, match="total extraction limit"):
+        extract(zip_path, str(tmp_path / "out"))
+
+def test_extract_rejects_high_compression_ratio(tmp_path, monkeypatch):
+    monkeypatch.setattr(unzip, "RATIO_CHECK_MIN_BYTES", 1024)
+    monkeypatch.setattr(unzip, "ZIP_MAX_RATIO", 10)
+    zip_path = make_zip(tmp_path, {"bomb.py": "\0" * 100_000})
+    with pytest.raises(UnsafeZipError, match="compression ratio"):
+        extract(zip_path, str(tmp_path / "out"))
+
+    # 압축하지 않은 같은 크기 파일과 비율 확인 대상보다 작은 파일은 통과
+    stored = make_zip(tmp_path, {"plain.py": "\0" * 100_000}, compression=zipfile.ZIP_STORED)
+    assert extract(stored, str(tmp_path / "stored"))[1]["extracted"] == 1
+    small = make_zip(tmp_path, {"small.py": "\0" * 1000})
+    assert extract(small, str(tmp_path / "small"))[1]["extracted"] == 1
@@ -0,0 +1,10 @@
+# admission.py
+# 제한 구현은 common/admission.py. 여기서는 B의 단계와 기본값만 정한다
+import shared_path  # noqa: F401
+from common.admission import Saturated, stage_limit  # noqa: F401
+
+# 동시에 압축을 풀 요청 수 / LLM 조각을 만들 요청 수(요청 하나가 LLM_CONCURRENCY개 호출을 쓴다) / PDF를 만들 요청 수
+EXTRACT = stage_limit('extract', 4, 16)
+LLM = stage_limit('llm', 4, 16)
+PDF = stage_limit('pdf', 2, 16)
+STAGES = (EXTRACT, LLM, PDF)
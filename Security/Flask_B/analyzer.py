@@ -1,25 +1,32 @@
 import os
 import json
+import hashlib
 import shutil
-import uuid, markdown
+import uuid
 from datetime import datetime, timezone
-from xhtml2pdf import pisa
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from llm_utils import generate_llm_md
+from llm_utils import (
+    generate_llm_md, generate_llm_md_batch, estimate_tokens, get_limiter, LLMStats, Budget, BudgetExhausted,
+    LLM_CONCURRENCY, LLM_PACK_MAX_TOKENS, LLM_PACK_MAX_FILES, LLM_DEADLINE_SECONDS,
+    LLM_TOKEN_BUDGET,
+)
+from llm_cache import get_cache as get_llm_cache
+from context import build_prompts, stitch_parts, CONTEXT_MODE
+from pdf_render import render_report
+from dedup import dedupe, render_notes, unexplain, DEDUP_ENABLED
+from priority import file_risk, top_issue, issue_severity, issue_confidence
+from issues import group_issues
+from metrics import span
 
 def load_and_group_issues(json_path):
-    json_path = Path(json_path)
+    """issues.json(JSON 배열) 또는 NDJSON → {path: [발견]}. 원소 하나씩 읽으며 모은다"""
     with open(json_path, 'r', encoding='utf-8') as f:
-        issues_data = json.load(f)
-    
-    grouped = defaultdict(list)
-    for issue in issues_data:
-        fp = issue.get('path')
-        if fp:
-            grouped[fp].append(issue)
-    
-    return dict(grouped)
+        return group_issues(f)
+
+def _source_path(extracted_root, file_path):
+    rel = Path(str(file_path).replace('\\', '/').lstrip('/'))
+    return Path(extracted_root) / rel
 
 def save_grouped_issues(files_dir, grouped_issues, extracted_root):
     
@@ -36,69 +43,338 @@ def save_grouped_issues(files_dir, grouped_issues, extracted_root):
         with open(save_path, 'w', encoding='utf-8') as f:
             json.dump(issues, f, ensure_ascii=False, indent=2)
     
-        rel = Path(str(file_path).replace('\\', '/').lstrip('/'))
-        src = extracted_root / rel
+        src = _source_path(extracted_root, file_path)
         dst = folder_path / filename
 
         if src.exists():
                 shutil.copy2(src, dst)
 
-def save_piece_markdowns(files_dir, markdown_dir):
-    files_dir = Path(files_dir)
+def _run_concurrently(fn, items, concurrency):
+    """
+    items 순서대로 fn 결과(실패 시 예외 객체)를 돌려준다
+    """
+    def _safe(item):
+        try:
+            return fn(item)
+        except Exception as e:
+            return e
+
+    if concurrency <= 1:
+        return [_safe(item) for item in items]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(_safe, items))
+
+def build_file_items(grouped_issues, extracted_root):
+    """
+    그룹화된 이슈 + 해제된 트리 → 이름순 [(name, 원본 경로, load)].
+    load()는 (issue_text, code_text)를 돌려주며, files/ 디렉토리를 거치지 않고 원본을 바로 읽는다
+    """
+    def _loader(file_path, issues):
+        def load():
+            src = _source_path(extracted_root, file_path)
+            if not src.is_file():
+                raise FileNotFoundError('missing source file')
+            return json.dumps(issues, ensure_ascii=False, indent=2), src.read_text(encoding='utf-8')
+        return load
+
+    items = sorted(
+        (os.path.basename(file_path), file_path, issues) for file_path, issues in grouped_issues.items()
+    )
+    return [(name, file_path, _loader(file_path, issues)) for name, file_path, issues in items]
+
+def split_reusable(grouped_issues, base_pieces, changed_paths, dedup=None):
+    """
+    증분 작업: 기준 작업의 조각 중 바뀌지 않은 파일 것을 재사용.
+    changed_paths: A가 보낸 변경/삭제 경로 (None이면 모두 바뀐 것으로 본다)
+    본문이 "다른 곳에서 설명됨"으로 넘긴 발견이 있으면, 그 설명을 가진 조각도 재사용될 때만 재사용한다
+    (설명한 파일이 바뀌거나 삭제됐으면 새로 생성). 안내(notes)는 병합 후 dedup.relink로 다시 만든다
+    → (새로 생성할 grouped, 재사용할 조각 목록)
+    """
+    if not base_pieces or changed_paths is None:
+        return grouped_issues, []
+    dedup = DEDUP_ENABLED if dedup is None else dedup
+    changed = set(changed_paths)
+    by_path = {p['path']: p for p in base_pieces}
+    candidates = {path: by_path[path] for path in grouped_issues if path not in changed and path in by_path}
+    if dedup:
+        # 발견 기록이 없는 예전 조각은 안내가 없을 때만
+        candidates = {path: p for path, p in candidates.items() if 'findings' in p or not p.get('notes')}
+        while True:
+            stale = [path for path, p in candidates.items()
+                     if any(not r['explained'] and r.get('see') not in candidates for r in p.get('findings') or ())]
+            if not stale:
+                break
+            for path in stale:
+                del candidates[path]
+    else:
+        # dedup을 끄면 새 조각은 모든 발견을 직접 설명하므로, 다른 곳을 가리키는 조각은 쓰지 않는다
+        candidates = {path: p for path, p in candidates.items() if not p.get('notes')}
+    reused = [candidates[path] for path in grouped_issues if path in candidates]
+    reused_paths = set(candidates)
+    todo = {path: issues for path, issues in grouped_issues.items() if path not in reused_paths}
+    return todo, reused
+
+def merge_pieces(*groups):
+    """조각 목록들 → 보고서 순서(이름, 경로)로 정렬"""
+    return sorted((p for group in groups for p in group), key=lambda p: (p['name'], str(p['path'])))
+
+def _dir_loader(sub):
+    """files/<name>/ 디렉토리(save_grouped_issues 결과)에서 읽는 load()"""
+    def load():
+        print("[SUB]", sub)
+        try:
+            issue_file = next(sub.glob('issues_*.json'))
+            print("[ISSUE]", issue_file)
+        except StopIteration:
+            raise FileNotFoundError('missing issues_*.json')
+
+        try:
+            code_file = next(
+                p for p in sub.iterdir()
+                if p.is_file() and p.suffix.lower() != '.json'
+            )
+            print("[CODE]", code_file)
+        except StopIteration:
+            raise FileNotFoundError('missing source file')
+
+        return issue_file.read_text(encoding='utf-8'), code_file.read_text(encoding='utf-8')
+    return load
+
+def _piece_writer(markdown_dir):
     markdown_dir = Path(markdown_dir)
-    
+    markdown_dir.mkdir(parents=True, exist_ok=True)
+
+    def write(name, md):
+        piece_path = markdown_dir / f'{name}.md'
+        piece_path.write_text(md, encoding='utf-8')
+        return str(piece_path)
+    return write
+
+def piece_markdown(piece):
+    """조각 dict → 보고서에 들어갈 Markdown (LLM 본문 + 중복 위치 안내)"""
+    if piece.get('notes'):
+        return f"{piece['body']}\n\n{piece['notes']}"
+    return piece['body']
+
+def save_pieces(path, pieces):
+    """작업의 조각 전체를 한 파일로 저장 (다음 증분 작업이 재사용)"""
+    path = Path(path)
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_text(json.dumps({'pieces': pieces}, ensure_ascii=False), encoding='utf-8')
+    os.replace(tmp, path)
+
+def load_pieces(path):
+    """save_pieces로 저장한 조각 목록. 없거나 읽을 수 없으면 None"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)['pieces']
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _pack_anchor(name, max_files):
+    """이 파일 앞에서는 항상 묶음을 새로 시작한다 (이름 해시로 정해지므로 크기가 바뀌어도 같은 자리)"""
+    every = max(2, max_files // 2)
+    return int(hashlib.sha1(name.encode('utf-8')).hexdigest()[:8], 16) % every == 0
+
+def _pack_work(work, budget, max_files, keys=None):
+    """
+    work 인덱스를 요청 단위로 묶는다. 프롬프트가 하나인 작은 파일만 같은 디렉토리(keys의 상위 경로) 안에서
+    이름순으로 채워 넣는다. 묶음 경계는 디렉토리와 이름 해시로 정한 기준 파일(_pack_anchor)에서도 끊으므로,
+    파일 하나가 추가/삭제되거나 크기가 바뀌어도 경계는 그 디렉토리의 다음 기준 파일까지만 움직이고
+    다른 묶음의 프롬프트(= 캐시 키)는 그대로다
+    """
+    by_dir = {}
+    for index, (name, _) in enumerate(work):
+        key = str(keys[index]).replace('\\', '/') if keys is not None else ''
+        by_dir.setdefault(os.path.dirname(key), []).append(index)
+
+    units = []
+    for indices in by_dir.values():
+        current, used = [], 0
+        for index in indices:
+            name, prompts = work[index]
+            size = sum(estimate_tokens(t) for t in prompts[0]) if len(prompts) == 1 else None
+            if size is None or size > budget // 2:
+                units.append([index])
+                continue
+            if current and (used + size > budget or len(current) >= max_files or _pack_anchor(name, max_files)):
+                units.append(current)
+                current, used = [], 0
+            current.append(index)
+            used += size
+        if current:
+            units.append(current)
+    return units
+
+def _generate_pieces(items, concurrency=None, client=None, limiter=None, use_cache=True, context_mode=None,
+                     write_piece=None, pack_tokens=None, dedup=None, budget=None):
+    """
+    items: 이름순 [(name, key, load)] (key: 원본 경로 등 조각 식별자)
+    write_piece(name, md): 조각을 디스크에도 남길 때 (경로 반환)
+    pack_tokens: 작은 파일 여러 개를 한 요청에 묶는 토큰 예산 (기본 LLM_PACK_MAX_TOKENS, 0이면 끔)
+    dedup: 파일 간 동일 발견을 한 번만 설명 (기본 LLM_DEDUP, dedup.py 참고)
+    budget: 작업 예산 (기본 LLM_DEADLINE_SECONDS/LLM_TOKEN_BUDGET). LLM 요청은 위험도가 높은 파일부터 시작하고,
+            예산이 다하면 남은 파일은 meta['omitted']에 위험도순으로 남긴다
+    → (meta, pieces)  pieces: 이름순 [{'name', 'path', 'body', 'notes'[, 'findings']}] (piece_markdown 참고).
+      findings: dedup을 켰을 때 발견 기록 (dedup.relink로 안내를 다시 만들 때)
+    """
+    concurrency = max(1, concurrency or LLM_CONCURRENCY)
+    pack_tokens = LLM_PACK_MAX_TOKENS if pack_tokens is None else pack_tokens
+    dedup = DEDUP_ENABLED if dedup is None else dedup
+    context_mode = context_mode or CONTEXT_MODE
+    if limiter is None:
+        limiter = get_limiter()
+    if budget is None and (LLM_DEADLINE_SECONDS or LLM_TOKEN_BUDGET):
+        budget = Budget(LLM_DEADLINE_SECONDS, LLM_TOKEN_BUDGET)
+    stats = LLMStats()
+    cache = get_llm_cache() if use_cache else None
+
     job_id = str(uuid.uuid4())
     started_at = datetime.now(timezone.utc).isoformat()
 
     processed_total = success_count = skipped_count = failure_count = 0
-    failed_items = []
-    piece_paths = []
+    failed = []
+    omitted = {}   # loaded 인덱스 → 예산 때문에 설명하지 못한 발견
+    pieces = []
+    piece_refs = []
+    work = []
+    work_keys = []  # work 인덱스 → 원본 경로 (묶음을 디렉토리 단위로 나눌 때)
+    tokens_full = tokens_sent = split_files = 0
 
-    for sub in sorted((d for d in files_dir.glob('*') if d.is_dir()), key=lambda p: p.name):
-        print("[SUB]", sub)
-        processed_total += 1
-        try:
+    loaded = []  # (name, key, issues, issue_text, code_text)
+    with span('load_sources'):
+        for name, key, load in items:
+            processed_total += 1
             try:
-                issue_file = next(sub.glob('issues_*.json'))
-                print("[ISSUE]", issue_file)
-            except StopIteration:
-                raise FileNotFoundError('missing issues_*.json')
+                issue_text, code_text = load()
 
-            try:
-                code_file = next(
-                    p for p in sub.iterdir()
-                    if p.is_file() and p.suffix.lower() != '.json'
-                )
-                print("[CODE]", code_file)
-            except StopIteration:
-                raise FileNotFoundError('missing source file')
+                try:
+                    parsed = json.loads(issue_text)
+                except Exception:
+                    raise ValueError('invalid issues JSON')
 
-            issue_text = issue_file.read_text(encoding='utf-8')
-            code_text  = code_file.read_text(encoding='utf-8')
+                if isinstance(parsed, list) and len(parsed) == 0:
+                    skipped_count += 1
+                    continue
 
-            try:
-                parsed = json.loads(issue_text)
-            except Exception:
-                raise ValueError('invalid issues JSON')
+                loaded.append((name, key, parsed if isinstance(parsed, list) else [], issue_text, code_text))
 
-            if isinstance(parsed, list) and len(parsed) == 0:
-                skipped_count += 1
-                continue
+            except Exception as e:
+                failure_count += 1
+                failed.append((name, f"{name}: {type(e).__name__} - {e}"))
 
-            md = generate_llm_md(issue_text, code_text)
-            piece_path = markdown_dir / f'{sub.name}.md'
-            piece_path.write_text(md, encoding='utf-8')
+    with span('prompts'):
+        # 동일 발견(룰 + 정규화한 코드 줄 + 주변 코드)은 처음 나온 곳에서만 LLM에 보낸다
+        plans = dedup_stats = None
+        if dedup:
+            plans, dedup_stats = dedupe([(issues, code_text) for _, _, issues, _, code_text in loaded])
 
-            piece_paths.append(str(piece_path))
-            success_count += 1
+        direct = {}    # loaded 인덱스 → LLM 없이 만든 조각 (모든 발견이 다른 곳에서 설명됨)
+        work_of = {}   # loaded 인덱스 → work 인덱스
+        work_risk = []  # work 인덱스 → 파일 위험도 (dedup 전 발견 기준)
+        for index, (name, key, issues, issue_text, code_text) in enumerate(loaded):
+            risk = file_risk(issues)
+            if plans is not None and len(plans[index]['issues']) < len(issues):
+                issues = plans[index]['issues']
+                if not issues:
+                    direct[index] = '_All findings in this file are identical to findings explained elsewhere._'
+                    continue
+                issue_text = json.dumps(issues, ensure_ascii=False, indent=2)
 
-        except Exception as e:
-            failure_count += 1
-            failed_items.append(f"{sub.name}: {type(e).__name__} - {e}")
+            prompts, usage = build_prompts(issues, issue_text, code_text, mode=context_mode)
+            tokens_full += usage['tokens_full']
+            tokens_sent += usage['tokens_sent']
+            split_files += usage['parts'] > 1
+            work_of[index] = len(work)
+            work.append((name, prompts))
+            work_keys.append(key)
+            work_risk.append(risk)
+
+    def _generate(item):
+        _, prompts = item
+        return stitch_parts([
+            generate_llm_md(issue_text, code_text, client=client, limiter=limiter, stats=stats, cache=cache,
+                            budget=budget)
+            for issue_text, code_text in prompts
+        ])
+
+    def _generate_unit(unit):
+        """unit: work 인덱스 목록 → {인덱스: md}. 묶음에서 빠진 파일은 결과에 없다"""
+        if len(unit) == 1:
+            return {unit[0]: _generate(work[unit[0]])}
+        # 섹션 ID는 묶음 안의 순번 (전체 work 인덱스를 쓰면 앞쪽 파일 하나만 바뀌어도 뒤 묶음의 캐시 키가 모두 바뀜)
+        entries = [(f'F{n}', work[i][0], *work[i][1][0]) for n, i in enumerate(unit)]
+        mds = generate_llm_md_batch(entries, client=client, limiter=limiter, stats=stats, cache=cache, budget=budget)
+        return {i: mds[f'F{n}'] for n, i in enumerate(unit) if f'F{n}' in mds}
+
+    units = (_pack_work(work, pack_tokens, LLM_PACK_MAX_FILES, work_keys) if pack_tokens > 0
+             else [[i] for i in range(len(work))])
+    # 묶음은 이름순으로 만들고(캐시 키 유지) 시작 순서만 위험도가 높은 묶음부터
+    units.sort(key=lambda unit: max(work_risk[i] for i in unit), reverse=True)
+    outcomes, fallback = {}, []
+    with span('llm'):
+        for unit, result in zip(units, _run_concurrently(_generate_unit, units, concurrency)):
+            if isinstance(result, BudgetExhausted) or (isinstance(result, Exception) and len(unit) == 1):
+                outcomes.update((i, result) for i in unit)
+            elif isinstance(result, Exception):
+                print(f"[LLM 묶음] 요청 실패 → {len(unit)}개 파일 단건 재시도 ({type(result).__name__}: {result})")
+                fallback.extend(unit)
+            else:
+                outcomes.update(result)
+                fallback.extend(i for i in unit if i not in result)
+
+        # 묶음 응답에서 파싱하지 못한 파일은 단건 요청으로 다시 만든다
+        if fallback:
+            print(f"[LLM 묶음] 파싱 실패 {len(fallback)}개 파일 단건 재시도")
+            fallback.sort(key=lambda i: work_risk[i], reverse=True)
+            retried = _run_concurrently(_generate, [work[i] for i in fallback], concurrency)
+            outcomes.update(zip(fallback, retried))
+
+    # 카운터/조각 저장은 결과를 모은 뒤 메인 스레드에서만 한다
+    # 대표 파일이 실패하거나 예산으로 빠지면 그 파일에 기대던 다른 파일의 중복 발견도 설명되지 않은 것이다
+    lost = {i: outcomes[w] for i, w in work_of.items() if isinstance(outcomes[w], Exception)}
+    for index, (name, key, issues, _, _) in enumerate(loaded):
+        moved = unexplain(plans[index], lost) if plans is not None else {}
+        for owner, covered in moved.items():
+            if isinstance(lost[owner], BudgetExhausted):
+                omitted.setdefault(index, []).extend(covered)
+        broken = sorted(loaded[owner][0] for owner in moved if not isinstance(lost[owner], BudgetExhausted))
+
+        if index in direct:
+            if sum(len(covered) for covered in moved.values()) == len(plans[index]['covered']):
+                # 설명을 맡은 파일이 모두 빠졌다 → 조각 없이 생략/실패로만 남긴다
+                if broken:
+                    failure_count += 1
+                    failed.append((name, f"{name}: duplicates of findings in failed file(s) {', '.join(broken)}"))
+                continue
+            outcome = direct[index] if not moved else (
+                '_Findings in this file are identical to findings elsewhere; see the notes below._')
+        else:
+            outcome = outcomes[work_of[index]]
+            if isinstance(outcome, BudgetExhausted):
+                omitted.setdefault(index, []).extend(plans[index]['issues'] if plans is not None else issues)
+                continue
+            if isinstance(outcome, Exception):
+                failure_count += 1
+                failed.append((name, f"{name}: {type(outcome).__name__} - {outcome}"))
+                continue
+        piece = {
+            'name': name,
+            'path': key,
+            'body': outcome,
+            'notes': render_notes(plans[index]) if plans is not None else '',
+        }
+        if plans is not None:
+            piece['findings'] = plans[index]['records']
+        pieces.append(piece)
+        piece_refs.append(write_piece(name, piece_markdown(piece)) if write_piece else name)
+        success_count += 1
 
     finished_at = datetime.now(timezone.utc).isoformat()
+    if omitted:
+        print(f"[LLM 예산] {budget.reason} → {len(omitted)}개 파일 생략 (부분 보고서)")
 
-    return {
+    meta = {
         'job_id': job_id,
         'started_at': started_at,
         'finished_at': finished_at,
@@ -106,26 +382,132 @@ def save_piece_markdowns(files_dir, markdown_dir):
         'success_count': success_count,
         'skipped_count': skipped_count,
         'failure_count': failure_count,
-        'failed_items': failed_items,
-        'pieces': piece_paths,
+        'failed_items': [msg for _, msg in sorted(failed, key=lambda t: t[0])],
+        'pieces': piece_refs,
+        'concurrency': concurrency,
+        'llm': stats.as_dict(),
+        'llm_cache': stats.cache_summary() if cache is not None else {'bypassed': True},
+        'context': {
+            'mode': context_mode,
+            'tokens_full': tokens_full,
+            'tokens_sent': tokens_sent,
+            'tokens_saved': tokens_full - tokens_sent,
+            'split_files': split_files,
+        },
+        'packing': {
+            'max_tokens': pack_tokens,
+            'packs': sum(1 for u in units if len(u) > 1),
+            'packed_files': sum(len(u) for u in units if len(u) > 1),
+            'fallback_files': len(fallback),
+        },
+        'dedup': dedup_stats if dedup_stats is not None else {'enabled': False},
+        'budget': budget.as_dict() if budget is not None else None,
+        'partial': bool(omitted),
+        'omitted': _omitted_items([(loaded[i][0], loaded[i][1], found) for i, found in omitted.items()]),
     }
+    return meta, pieces
+
+def _omitted_items(entries):
+    """entries: [(name, key, 설명하지 못한 발견)] → 위험도 높은 순 [{'name', 'path', 'findings', 'severity', 'confidence'}]"""
+    items = []
+    for name, key, issues in sorted(entries, key=lambda e: (tuple(-r for r in file_risk(e[2])), e[0])):
+        top = top_issue(issues) or {}
+        items.append({
+            'name': name,
+            'path': str(key),
+            'findings': len(issues),
+            'severity': issue_severity(top) or None,
+            'confidence': issue_confidence(top) or None,
+        })
+    return items
 
+def omitted_markdown(meta):
+    """부분 보고서의 마지막 섹션: 예산 때문에 설명하지 못한 파일 목록 (없으면 None)"""
+    omitted = meta.get('omitted') or []
+    if not omitted:
+        return None
+    budget = meta.get('budget') or {}
+    limits = []
+    if budget.get('deadline_seconds'):
+        limits.append(f"deadline {budget['deadline_seconds']:g}s")
+    if budget.get('token_budget'):
+        limits.append(f"token budget {budget['token_budget']}")
+    lines = [
+        f"_The LLM budget for this job ran out ({budget.get('exhausted')}; {', '.join(limits)}). "
+        f"Files were explained highest risk first; findings in the {len(omitted)} file(s) below were not explained. "
+        "Re-run the job with a larger budget to cover them._",
+        '',
+        '| File | Findings | Top severity | Confidence |',
+        '|---|---|---|---|',
+    ]
+    for item in omitted:
+        lines.append(f"| `{item['path']}` | {item['findings']} | {item['severity'] or '-'} | "
+                     f"{item['confidence'] or '-'} |")
+    return '\n'.join(lines)
+
+def generate_piece_markdowns(grouped_issues, extracted_root, markdown_dir=None, **options):
+    """
+    메모리 파이프라인: 그룹화된 이슈 + 해제된 트리 → LLM → (meta, pieces).
+    markdown_dir를 주면 조각을 디버그용으로 디스크에도 남긴다 (다시 읽지는 않음).
+    options는 save_piece_markdowns와 같다
+    """
+    write_piece = _piece_writer(markdown_dir) if markdown_dir is not None else None
+    return _generate_pieces(build_file_items(grouped_issues, extracted_root), write_piece=write_piece, **options)
+
+def save_piece_markdowns(files_dir, markdown_dir, concurrency=None, client=None, limiter=None,
+                         use_cache=True, context_mode=None, pack_tokens=None, dedup=None, budget=None):
+    """
+    디스크 파이프라인: files/<name>/ (save_grouped_issues 결과) → markdowns/<name>.md
+    concurrency: 동시에 진행할 LLM 요청 수 (기본 LLM_CONCURRENCY)
+    client: generate_llm_md에 넘길 클라이언트 (테스트용 스텁 가능)
+    limiter: 분당 요청/토큰 예산 (기본 프로세스 공용 LLM_RPM/LLM_TPM 리미터)
+    use_cache: False면 LLM 응답 캐시를 건너뛰고 항상 새로 생성 (결과도 저장하지 않음)
+    context_mode: full | window | auto (기본 LLM_CONTEXT_MODE, context.build_prompts 참고)
+    pack_tokens: 작은 파일을 한 요청에 묶는 토큰 예산 (기본 LLM_PACK_MAX_TOKENS, 0이면 파일당 한 요청)
+    dedup: 파일 간 동일 발견을 한 번만 설명하고 나머지 위치는 "also occurs in"으로 표시 (기본 LLM_DEDUP)
+    budget: 작업 예산 llm_utils.Budget (기본 LLM_DEADLINE_SECONDS/LLM_TOKEN_BUDGET, 둘 다 0이면 없음)
+    """
+    files_dir = Path(files_dir)
+    items = [
+        (sub.name, sub.name, _dir_loader(sub))
+        for sub in sorted((d for d in files_dir.glob('*') if d.is_dir()), key=lambda p: p.name)
+    ]
+    meta, _ = _generate_pieces(
+        items, concurrency=concurrency, client=client, limiter=limiter, use_cache=use_cache,
+        context_mode=context_mode, write_piece=_piece_writer(markdown_dir), pack_tokens=pack_tokens,
+        dedup=dedup, budget=budget,
+    )
+    return meta
 
-def merge_markdowns_to_pdf(markdown_dir, output_dir, meta):
+
+OMITTED_SECTION = 'Not analyzed (budget)'
+
+def merge_markdowns_to_pdf(markdown_dir, output_dir, meta, sections=None):
+    """
+    조각 Markdown → {job_id}.md(병합본) + {job_id}.pdf + {job_id}.json.
+    sections([(name, markdown)])를 주면 markdown_dir를 읽지 않고 그대로 쓴다 (메모리 파이프라인).
+    PDF는 pdf_render.render_report가 파일별 섹션(캐시)을 병렬 렌더링해 목차와 함께 합친다
+    """
     markdown_dir = Path(markdown_dir)
     output_dir = Path(output_dir)
     
     job_id = meta['job_id']
 
-    pieces = sorted(markdown_dir.glob('*.md'))
+    if sections is None:
+        pieces = sorted(markdown_dir.glob('*.md'))
+        sections = [(p.stem, p.read_text(encoding='utf-8')) for p in pieces]
+    # 예산이 다한 부분 보고서: 빠진 파일 목록을 마지막 섹션으로
+    omitted_md = omitted_markdown(meta)
+    if omitted_md is not None:
+        sections = list(sections) + [(OMITTED_SECTION, omitted_md)]
 
     merged_lines = ['# Security Audit Report', '']
-    if not pieces:
+    if not sections:
         merged_lines.append('_No content_.')
     else:
-        for p in pieces:
-            merged_lines.append(f'---\n\n## File: `{p.stem}`\n')
-            merged_lines.append(p.read_text(encoding='utf-8'))
+        for name, body in sections:
+            merged_lines.append(f'---\n\n## File: `{name}`\n')
+            merged_lines.append(body)
             merged_lines.append('')
 
     merged_md = '\n'.join(merged_lines).strip()
@@ -133,23 +515,10 @@ def merge_markdowns_to_pdf(markdown_dir, output_dir, meta):
     md_path = output_dir / f'{job_id}.md'
     md_path.write_text(merged_md, encoding="utf-8")
 
-    html_body = markdown.markdown(merged_md, extensions=['fenced_code', 'tables'])
-
-    full_html = (
-        "<!doctype html>"
-        '<meta charset="utf-8">'
-        "<title>Security Audit Report</title>"
-        '<body style="max-width:900px;margin:40px auto;font-family:Arial, sans-serif; line-height:1.6;">'
-        f"{html_body}</body>"
-    )
-
     pdf_path = output_dir / f'{job_id}.pdf'
-    with open(pdf_path, "wb") as f:
-        result = pisa.CreatePDF(src=full_html, dest=f, encoding="utf-8")
-
-    if result.err:
-        raise RuntimeError("PDF 생성 중 오류가 발생했습니다.")
+    meta['pdf'] = render_report(sections, merged_md, pdf_path)
 
     (output_dir / f"{job_id}.json").write_text(
         json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8"
-    )
\ No newline at end of file
+    )
+    return pdf_path
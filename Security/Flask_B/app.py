@@ -1,22 +1,86 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, g
 from flask_cors import CORS
 from pathlib import Path
 from unzipper import extract_zip
 from analyzer import (
     load_and_group_issues,
     save_grouped_issues,
-    save_piece_markdowns,
+    generate_piece_markdowns,
     merge_markdowns_to_pdf,
+    piece_markdown,
+    save_pieces,
+    load_pieces,
+    split_reusable,
+    merge_pieces,
 )
 from utils import make_dirs
-import zipfile, json, uuid, shutil, traceback
+from janitor import Janitor, area, touch, RECEIVED_TTL, WORKSPACE_TTL, OUTPUT_TTL, PDF_SECTIONS_TTL
+from pdf_render import SECTION_CACHE_DIR, sections_in_use
+from dedup import relink
+from metrics import (
+    REGISTRY, CONTENT_TYPE as METRICS_CONTENT_TYPE, HTTP_REQUESTS, HTTP_SECONDS, HTTP_IN_FLIGHT,
+    span, job_timeline, record_extract,
+)
+from admission import EXTRACT, LLM, PDF, STAGES, Saturated
+from llm_utils import Budget, LLM_DEADLINE_SECONDS, LLM_TOKEN_BUDGET
+import zipfile, json, uuid, shutil, traceback, os, re, time
+from contextlib import contextmanager
 
 app = Flask(__name__)
 CORS(app)
 
 BASE_DIR = Path(__file__).resolve().parent
 # make_dirs는 상위 기본 디렉토리들을 만들어 준다고 가정 (received/extracted/files/markdowns/output)
-DIRS = make_dirs(BASE_DIR)
+# EXTRACT_SCRATCH_DIR을 주면 해제된 트리(extracted)만 그 아래에 둔다
+DIRS = make_dirs(BASE_DIR, os.environ.get('EXTRACT_SCRATCH_DIR') or None)
+
+# 작업 디렉토리 정리: 영역별 TTL + 전체 용량 상한(LRU). 처리 중인 요청의 job_id는 제외
+JANITOR = Janitor([
+    area('received', str(DIRS['received']), RECEIVED_TTL),
+    area('extracted', str(DIRS['extracted']), WORKSPACE_TTL),
+    area('files', str(DIRS['files']), WORKSPACE_TTL),
+    area('markdowns', str(DIRS['markdowns']), WORKSPACE_TTL),
+    area('output', str(DIRS['output']), OUTPUT_TTL),
+    area('pdf_sections', str(SECTION_CACHE_DIR), PDF_SECTIONS_TTL, jobs=False, keep=sections_in_use),
+])
+
+REGISTRY.gauge('workspace_bytes', 'Bytes under the job directories at the last sweep',
+               fn=lambda: (JANITOR.last or {}).get('total_bytes', 0))
+JOBS_RUNNING = REGISTRY.gauge('jobs_running', 'In-flight /deep-analyze requests')
+
+@contextmanager
+def _running():
+    JOBS_RUNNING.inc()
+    try:
+        yield
+    finally:
+        JOBS_RUNNING.dec()
+
+@app.before_request
+def _start_janitor():
+    JANITOR.start()
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.monotonic()
+    HTTP_IN_FLIGHT.inc()
+
+@app.after_request
+def _record_request(resp):
+    endpoint = request.endpoint or 'unknown'
+    HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=resp.status_code)
+    if 'request_started' in g:
+        HTTP_SECONDS.observe(time.monotonic() - g.request_started, endpoint=endpoint)
+    return resp
+
+@app.teardown_request
+def _end_request(exc):
+    if 'request_started' in g:
+        HTTP_IN_FLIGHT.dec()
+
+# 1이면 files/(이슈 JSON + 원본 사본)와 markdowns/(조각)를 디버그용으로 남긴다.
+# 파이프라인은 항상 메모리에서 흐르고 이 파일들을 다시 읽지 않는다
+DEBUG_ARTIFACTS = os.environ.get('B_DEBUG_ARTIFACTS', '0').lower() in ('1', 'true', 'yes')
 
 def _job_dirs(job_id: str) -> dict:
     """요청별 job_id 하위 디렉토리 생성(있으면 초기화)"""
@@ -31,85 +95,254 @@ def _job_dirs(job_id: str) -> dict:
         "output":     _p(DIRS["output"]),
     }
 
-    # received/extracted/files/markdowns는 싹 비우고 다시 생성
+    # received/extracted/files/markdowns는 싹 비우고 다시 생성 (files/markdowns는 디버그 모드에서만)
     for k in ["received", "extracted", "files", "markdowns"]:
         p = paths[k]
         if p.exists():
             shutil.rmtree(p, ignore_errors=True)
-        p.mkdir(parents=True, exist_ok=True)
+        if k in ("received", "extracted") or DEBUG_ARTIFACTS:
+            p.mkdir(parents=True, exist_ok=True)
 
     # output은 결과물 위치: 폴더만 보장 (덮어쓰기 허용)
     paths["output"].mkdir(parents=True, exist_ok=True)
     return paths
 
+# shared 전달 모드에서 A가 넘긴 경로가 반드시 이 안에 있어야 한다 (os.pathsep로 여러 개 지정)
+SHARED_WORKSPACE_ROOTS = [
+    Path(p).resolve() for p in os.environ.get('SHARED_WORKSPACE_ROOT', '').split(os.pathsep) if p.strip()
+]
+
+JOB_ID_RE = re.compile(r'^[A-Za-z0-9_.-]{1,64}$')
+PIECES_FILE = 'pieces.json'
+
+def _base_pieces(base_job_id):
+    """증분 기준 작업의 조각 목록. 형식이 잘못됐거나 없으면 None"""
+    if not base_job_id or not JOB_ID_RE.match(base_job_id) or base_job_id.strip('.') == '':
+        return None
+    touch(DIRS['output'] / base_job_id)  # 기준으로 쓰인 작업은 최근 사용으로 본다
+    return load_pieces(DIRS['output'] / base_job_id / PIECES_FILE)
+
+def _changed_paths(raw):
+    """A가 보낸 변경 경로 JSON 목록. 없거나 잘못되면 None (= 전부 새로 생성)"""
+    try:
+        paths = json.loads(raw) if raw else None
+    except ValueError:
+        return None
+    return paths if isinstance(paths, list) else None
+
+def _shared_path(raw):
+    """A가 넘긴 경로 검증: 허용 루트 밖이거나 존재하지 않으면 None"""
+    if not raw or not SHARED_WORKSPACE_ROOTS:
+        return None
+    p = Path(raw).resolve()
+    for root in SHARED_WORKSPACE_ROOTS:
+        if p == root or root in p.parents:
+            return p if p.exists() else None
+    return None
+
+def _busy(e: Saturated):
+    """과부하 응답 (429: 대기열 가득, 503: 대기 시간 초과) + Retry-After. A의 forwarder가 이 시간만큼 기다렸다 다시 보낸다"""
+    resp = jsonify({'error': str(e), 'stage': e.stage, 'retry_after': e.retry_after})
+    resp.status_code = e.status
+    resp.headers['Retry-After'] = str(e.retry_after)
+    return resp
+
+def _budget():
+    """
+    폼 deadline_seconds / token_budget (없으면 LLM_DEADLINE_SECONDS / LLM_TOKEN_BUDGET) → Budget 또는 None.
+    마감은 요청을 받은 시점부터 센다. 잘못된 값이면 ValueError
+    """
+    seconds = float(request.form.get('deadline_seconds') or LLM_DEADLINE_SECONDS)
+    tokens = int(request.form.get('token_budget') or LLM_TOKEN_BUDGET)
+    if seconds < 0 or tokens < 0:
+        raise ValueError('negative budget')
+    return Budget(seconds, tokens) if seconds or tokens else None
+
 @app.route('/deep-analyze', methods=['POST'])
 def deep_analyze():
-    if 'json_file' not in request.files or 'source_zip' not in request.files:
-        return jsonify({'error': 'Missing files'}), 400
+    # 대기열까지 가득 찬 단계가 있으면 업로드를 저장하기 전에 바로 거절
+    try:
+        for limit in STAGES:
+            limit.check()
+    except Saturated as e:
+        return _busy(e)
+
+    # handoff=shared: A가 이미 해제한 트리를 그대로 읽는다 (ZIP 재업로드/재해제 없음)
+    shared = (request.form.get('handoff') or '').lower() == 'shared'
 
-    json_file  = request.files['json_file']
-    source_zip = request.files['source_zip']
-    if not json_file.filename or not source_zip.filename:
-        return jsonify({'error': 'Empty files'}), 400
+    if shared:
+        if not SHARED_WORKSPACE_ROOTS:
+            return jsonify({'error': 'Shared handoff is not enabled (SHARED_WORKSPACE_ROOT)'}), 400
+        workspace = _shared_path(request.form.get('workspace_path'))
+        if workspace is None or not workspace.is_dir():
+            return jsonify({'error': 'Invalid workspace_path'}), 400
+        shared_json = _shared_path(request.form.get('issues_path'))
+        if shared_json is None and 'json_file' not in request.files:
+            return jsonify({'error': 'Missing issues'}), 400
+    else:
+        if 'json_file' not in request.files or 'source_zip' not in request.files:
+            return jsonify({'error': 'Missing files'}), 400
 
-    # A가 넘겨주는 job_id를 우선 사용, 없으면 생성
+        json_file  = request.files['json_file']
+        source_zip = request.files['source_zip']
+        if not json_file.filename or not source_zip.filename:
+            return jsonify({'error': 'Empty files'}), 400
+
+    try:
+        budget = _budget()
+    except ValueError:
+        return jsonify({'error': 'Invalid deadline_seconds or token_budget'}), 400
+
+    # A가 넘겨주는 job_id를 우선 사용, 없으면 생성. 작업 디렉토리 이름이 되므로 base_job_id와 같은 형식만 허용
     job_id = (request.form.get("job_id") or "").strip() or uuid.uuid4().hex
-    J = _job_dirs(job_id)
+    if not JOB_ID_RE.match(job_id) or job_id.strip('.') == '':
+        return jsonify({'error': 'Invalid job_id'}), 400
+    # timings=1: JSON 응답에 단계별 소요 시간을 넣는다 (Server-Timing 헤더는 항상)
+    want_timings = (request.form.get('timings') or '').lower() in ('1', 'true', 'yes')
+    with JANITOR.pinned(job_id), job_timeline(job_id) as timeline, _running():
+        J = _job_dirs(job_id)
 
-    json_path = J['received'] / 'issues.json'
-    zip_path  = J['received'] / 'source.zip'
+        json_path = J['received'] / 'issues.json'
+        zip_path  = J['received'] / 'source.zip'
+        extracted_root = J['extracted']
 
-    json_file.save(str(json_path))
-    source_zip.save(str(zip_path))
+        with span('receive'):
+            if shared:
+                extracted_root = workspace
+                if shared_json is not None:
+                    json_path = shared_json
+                else:
+                    request.files['json_file'].save(str(json_path))
+            else:
+                json_file.save(str(json_path))
+                source_zip.save(str(zip_path))
 
-    try:
-        # 1) 압축 해제
-        extract_zip(zip_path, J['extracted'])
-
-        # 2) 이슈 로드/그룹화 → 원본 파일 매핑
-        grouped = load_and_group_issues(json_path)
-        save_grouped_issues(J['files'], grouped, J['extracted'])
-
-        # 3) LLM 생성 마크다운 조각 → 저장
-        meta = save_piece_markdowns(J['files'], J['markdowns'])
-        # meta 예시: {'job_id': ..., 'processed_total': ..., 'success_count': ..., 'skipped_count': ...}
-
-        # 4) 마크다운 병합 → PDF 생성
-        #   - merge_markdowns_to_pdf가 PDF 경로를 반환하도록 구현되어 있다면 그대로 사용
-        #   - 반환값이 없다면 관례적으로 output/{job_id}.pdf 사용
-        pdf_path = merge_markdowns_to_pdf(J['markdowns'], J['output'], meta)
-        if pdf_path is None:
-            # 함수가 경로를 반환하지 않는 구현인 경우를 대비
-            cand = J['output'] / f"{meta.get('job_id', job_id)}.pdf"
-            if not cand.exists():
-                return jsonify({'error': 'PDF not generated'}), 500
-            pdf_path = cand
-
-        # 5) 응답: Accept에 따라 PDF 또는 JSON
-        accept = (request.headers.get('Accept') or '').lower()
-        if 'application/pdf' in accept:
-            return send_file(
-                str(pdf_path),
-                mimetype='application/pdf',
-                as_attachment=True,
-                download_name=f"{job_id}.pdf"
-            )
-
-        return jsonify({
-            'message': 'ok',
-            'job_id': job_id,
-            'total': len(grouped),
-            'processed_total': meta.get('processed_total'),
-            'success_count': meta.get('success_count'),
-            'skipped_count': meta.get('skipped_count'),
-            'pdf_path': str(pdf_path),
-        }), 200
-
-    except (zipfile.BadZipFile, json.JSONDecodeError):
-        return jsonify({'error': 'Bad request: invalid zip or json'}), 400
-    except Exception as e:
-        traceback.print_exc()
-        return jsonify({'error': 'Internal error', 'detail': str(e)}), 500
+        try:
+            # 1) 이슈 로드/그룹화
+            with span('group'):
+                grouped = load_and_group_issues(json_path)
+
+            # 증분: base_job_id의 조각 중 changed_paths에 없는 파일 것은 그대로 재사용
+            base_job_id = (request.form.get('base_job_id') or '').strip() or None
+            base_pieces = _base_pieces(base_job_id)
+            todo, reused = split_reusable(grouped, base_pieces, _changed_paths(request.form.get('changed_paths')))
+
+            # 2) 압축 해제: 새로 생성할 파일만 (shared 모드는 A의 트리를 그대로 사용)
+            extract_stats = None
+            if not shared:
+                with EXTRACT.slot(), span('extract'):
+                    extract_stats = extract_zip(zip_path, extracted_root, wanted=todo.keys())
+                record_extract(extract_stats)
+
+            # 원본 파일 매핑 (디버그 모드에서만 files/에 사본을 남김)
+            if DEBUG_ARTIFACTS:
+                save_grouped_issues(J['files'], todo, extracted_root)
+
+            # 3) 해제된 트리에서 바로 읽어 LLM 마크다운 조각 생성 (메모리)
+            # bypass_cache=1 이면 LLM 응답 캐시를 쓰지 않고 새로 생성
+            bypass_cache = (request.form.get('bypass_cache') or '').lower() in ('1', 'true', 'yes')
+            with LLM.slot():
+                meta, generated = generate_piece_markdowns(
+                    todo, extracted_root,
+                    markdown_dir=J['markdowns'] if DEBUG_ARTIFACTS else None,
+                    use_cache=not bypass_cache,
+                    budget=budget,                 # 예산이 다하면 위험도 낮은 파일부터 빠진다 (부분 보고서)
+                )
+            # meta 예시: {'job_id': ..., 'processed_total': ..., 'success_count': ..., 'skipped_count': ...}
+            # 중복 안내는 이번 파일 구성 기준으로 다시 만든다 (재사용 조각이 바뀌거나 삭제된 파일을 가리키지 않도록)
+            pieces = relink(merge_pieces(generated, reused))
+            save_pieces(J['output'] / PIECES_FILE, pieces)
+            meta['incremental'] = {
+                'base_job_id': base_job_id,
+                'base_found': base_pieces is not None,
+                'reused': sorted(p['path'] for p in reused),
+                'regenerated': sorted(p['path'] for p in generated),
+            }
+
+            # 4) 마크다운 병합 → PDF 생성 (섹션 캐시 덕분에 바뀐 섹션만 다시 렌더링)
+            #   - merge_markdowns_to_pdf가 PDF 경로를 반환하도록 구현되어 있다면 그대로 사용
+            #   - 반환값이 없다면 관례적으로 output/{job_id}.pdf 사용
+            sections = [(p['name'], piece_markdown(p)) for p in pieces]
+            with PDF.slot(), span('pdf'):
+                pdf_path = merge_markdowns_to_pdf(J['markdowns'], J['output'], meta, sections=sections)
+            if pdf_path is None:
+                # 함수가 경로를 반환하지 않는 구현인 경우를 대비
+                cand = J['output'] / f"{meta.get('job_id', job_id)}.pdf"
+                if not cand.exists():
+                    return jsonify({'error': 'PDF not generated'}), 500
+                pdf_path = cand
+
+            # 5) 응답: Accept에 따라 PDF 또는 JSON
+            accept = (request.headers.get('Accept') or '').lower()
+            if 'application/pdf' in accept:
+                resp = send_file(
+                    str(pdf_path),
+                    mimetype='application/pdf',
+                    as_attachment=True,
+                    download_name=f"{job_id}.pdf"
+                )
+                # PDF 응답에도 증분 재사용 여부를 남긴다 (상세 목록은 JSON 응답/{job_id}.json)
+                resp.headers['X-Reused-Pieces'] = str(len(reused))
+                resp.headers['X-Regenerated-Pieces'] = str(len(generated))
+                if meta.get('partial'):
+                    resp.headers['X-Omitted-Files'] = str(len(meta['omitted']))
+                resp.headers['Server-Timing'] = timeline.server_timing()
+                return resp
+
+            body = {
+                'message': 'ok',
+                'job_id': job_id,
+                'total': len(grouped),
+                'processed_total': meta.get('processed_total'),
+                'success_count': meta.get('success_count'),
+                'skipped_count': meta.get('skipped_count'),
+                'llm_cache': meta.get('llm_cache'),
+                'context': meta.get('context'),
+                'packing': meta.get('packing'),
+                'dedup': meta.get('dedup'),
+                'incremental': meta.get('incremental'),
+                'budget': meta.get('budget'),
+                'partial': meta.get('partial'),
+                'omitted': meta.get('omitted'),
+                'pdf': meta.get('pdf'),
+                'extract': extract_stats,
+                'pdf_path': str(pdf_path),
+            }
+            if want_timings:
+                body['timings'] = timeline.as_dict()
+            resp = jsonify(body)
+            resp.headers['Server-Timing'] = timeline.server_timing()
+            return resp, 200
+
+        except Saturated as e:
+            return _busy(e)
+        except (zipfile.BadZipFile, json.JSONDecodeError):
+            return jsonify({'error': 'Bad request: invalid zip or json'}), 400
+        except Exception as e:
+            traceback.print_exc()
+            return jsonify({'error': 'Internal error', 'detail': str(e)}), 500
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus 텍스트 형식 (단계별 히스토그램, LLM 지연/토큰, PDF 렌더링 시간)"""
+    return Response(REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/health', methods=['GET'])
+def health():
+    # admission: 단계별 점유/대기 수
+    # load: A의 balancer가 여러 B 중 고를 때 쓰는 요약 (처리 중 요청 수, 대기 수, LLM 단계 용량)
+    admission = {limit.stage: limit.snapshot() for limit in STAGES}
+    return jsonify({
+        'ok': True,
+        'service': 'Flask B',
+        'disk': JANITOR.usage(),
+        'admission': admission,
+        'load': {
+            'jobs': JOBS_RUNNING.value(),
+            'waiting': sum(a['waiting'] for a in admission.values()),
+            'capacity': LLM.limit,
+        },
+    })
 
 if __name__ == '__main__':
     # 기본 포트 5001 (A에서 이 포트/엔드포인트로 쏘게 하면 됩니다)
@@ -0,0 +1,155 @@
+import os
+import re
+import json
+from llm_utils import estimate_tokens
+
+# full: 파일 전체를 프롬프트에 넣음(기존 동작)
+# window: 발견 위치 주변 줄만 잘라서 넣음
+# auto: 파일이 LLM_CONTEXT_FULL_MAX_TOKENS 이하면 full, 넘으면 window
+CONTEXT_MODE = os.environ.get('LLM_CONTEXT_MODE', 'full').lower()
+CONTEXT_LINES = int(os.environ.get('LLM_CONTEXT_LINES', '20'))
+CONTEXT_FULL_MAX_TOKENS = int(os.environ.get('LLM_CONTEXT_FULL_MAX_TOKENS', '4000'))
+# 프롬프트 하나에 넣을 코드 토큰 상한. 넘으면 여러 프롬프트로 나눈다
+CONTEXT_MAX_TOKENS = int(os.environ.get('LLM_CONTEXT_MAX_TOKENS', '6000'))
+HEADER_LOOKBACK = 300
+
+# 함수/클래스 선언부 (Python, JS/TS, Go, Rust, Kotlin, Ruby, PHP, Swift ...)
+_KEYWORD_HEADER = re.compile(
+    r'^\s*(?:(?:public|private|protected|internal|static|final|abstract|override|async|export|'
+    r'default|suspend|inline|open|pub(?:\([^)]*\))?|unsafe)\s+)*'
+    r'(?:def|class|function|func|fn|fun|sub|interface|impl|module|struct|trait)\b'
+)
+# Java/C#/C/C++ 메서드 시그니처, JS 화살표 함수
+_SIGNATURE_HEADER = re.compile(
+    r'^\s*(?:[\w<>\[\],.*&:?]+\s+)+\**\w+\s*\([^;]*\)?\s*(?:throws\s+[\w.,\s]+)?\{?\s*$'
+    r'|^\s*(?:export\s+)?(?:const|let|var)\s+\w+\s*=\s*(?:async\s+)?(?:\([^)]*\)|\w+)\s*=>'
+)
+_NOT_HEADER = re.compile(r'^\s*(?:if|for|while|switch|catch|return|else|do|try|new|throw)\b')
+
+def _line_of(issue, key, default):
+    pos = issue.get(key)
+    if isinstance(pos, dict) and isinstance(pos.get('line'), int):
+        return pos['line']
+    return default
+
+def _indent(text):
+    return len(text) - len(text.lstrip())
+
+def find_enclosing_header(lines, line_no):
+    """
+    line_no(1-based)를 감싸는 함수/클래스 선언 줄 번호. 못 찾으면 None
+    """
+    if not 0 < line_no <= len(lines):
+        return None
+    target_indent = _indent(lines[line_no - 1])
+    for n in range(line_no - 1, max(0, line_no - 1 - HEADER_LOOKBACK), -1):
+        text = lines[n - 1]
+        if not text.strip() or _NOT_HEADER.match(text):
+            continue
+        if _KEYWORD_HEADER.match(text) or _SIGNATURE_HEADER.match(text):
+            # 들여쓰기 기반 언어에서 옆 블록의 선언을 집지 않도록
+            if _indent(text) <= target_indent:
+                return n
+    return None
+
+def merge_ranges(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [tuple(r) for r in merged]
+
+def _issue_range(issue, total, radius):
+    start = _line_of(issue, 'start', 1)
+    end = max(start, _line_of(issue, 'end', start))
+    return max(1, start - radius), min(total, end + radius)
+
+def render_windows(lines, ranges, header_lines=()):
+    """
+    병합된 줄 범위를 줄 번호와 함께 출력. 범위 밖 선언부는 따로 붙이고 생략 구간은 표시
+    """
+    out = ['// excerpt: only lines around the findings are shown; "..." marks omitted lines']
+    shown = set()
+    for start, end in ranges:
+        shown.update(range(start, end + 1))
+    blocks = sorted(set(ranges) | {(h, h) for h in header_lines if h not in shown})
+    prev_end = 0
+    for start, end in merge_ranges(blocks):
+        if start > prev_end + 1:
+            out.append(f'... (lines {prev_end + 1}-{start - 1} omitted)')
+        for n in range(start, end + 1):
+            out.append(f'{n:>6}| {lines[n - 1]}')
+        prev_end = end
+    if prev_end < len(lines):
+        out.append(f'... (lines {prev_end + 1}-{len(lines)} omitted)')
+    return '\n'.join(out)
+
+def _windows_for(issues, lines, radius):
+    ranges, headers = [], set()
+    for issue in issues:
+        ranges.append(_issue_range(issue, len(lines), radius))
+        h = find_enclosing_header(lines, _line_of(issue, 'start', 1))
+        if h is not None:
+            headers.add(h)
+    return render_windows(lines, merge_ranges(ranges), sorted(headers))
+
+def _group_by_budget(ordered, lines, radius, max_tokens):
+    """
+    시작 줄 순으로 정렬된 이슈를 창 크기 합이 max_tokens를 넘지 않게 묶는다.
+    줄 길이 누적합으로 겹치는 창을 빼고 세므로 O(n)이다.
+    """
+    prefix = [0]
+    for text in lines:
+        prefix.append(prefix[-1] + len(text) + 9)  # 줄 번호 접두어 포함
+    budget_chars = max_tokens * 4
+
+    groups, current, used, covered_to = [], [], 0, 0
+    for issue in ordered:
+        start, end = _issue_range(issue, len(lines), radius)
+        added = prefix[end] - prefix[max(start, covered_to + 1) - 1] if end > covered_to else 0
+        if current and used + added > budget_chars:
+            groups.append(current)
+            current, used, covered_to = [], 0, 0
+            added = prefix[end] - prefix[start - 1]
+        current.append(issue)
+        used += added
+        covered_to = max(covered_to, end)
+    if current:
+        groups.append(current)
+    return groups
+
+def build_prompts(issues, issue_text, code_text, mode=None, radius=None, max_tokens=None):
+    """
+    (issues, 코드) → [(issue_json_text, code_text)] 프롬프트 목록과 토큰 통계.
+    window 모드에서 잘라낸 코드가 max_tokens를 넘으면 발견 위치 순서대로 묶어 여러 프롬프트로 나눈다.
+    """
+    mode = (mode or CONTEXT_MODE).lower()
+    radius = CONTEXT_LINES if radius is None else radius
+    max_tokens = max_tokens or CONTEXT_MAX_TOKENS
+    full_tokens = estimate_tokens(code_text)
+
+    if mode == 'auto':
+        mode = 'full' if full_tokens <= CONTEXT_FULL_MAX_TOKENS else 'window'
+    if mode != 'window' or not issues or not code_text:
+        return [(issue_text, code_text)], {'tokens_full': full_tokens, 'tokens_sent': full_tokens, 'parts': 1}
+
+    lines = code_text.splitlines()
+    ordered = sorted(issues, key=lambda i: (_line_of(i, 'start', 1), _line_of(i, 'end', 1)))
+
+    groups = _group_by_budget(ordered, lines, radius, max_tokens)
+
+    prompts = []
+    for group in groups:
+        group_issue_text = issue_text if len(groups) == 1 else json.dumps(group, ensure_ascii=False, indent=2)
+        prompts.append((group_issue_text, _windows_for(group, lines, radius)))
+
+    sent = sum(estimate_tokens(code) for _, code in prompts)
+    return prompts, {'tokens_full': full_tokens, 'tokens_sent': sent, 'parts': len(prompts)}
+
+def stitch_parts(parts):
+    """여러 프롬프트 응답을 한 파일의 Markdown으로 합친다"""
+    if len(parts) == 1:
+        return parts[0]
+    return '\n\n'.join(f'### Part {i}/{len(parts)}\n\n{md}' for i, md in enumerate(parts, 1))
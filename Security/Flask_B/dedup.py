@@ -0,0 +1,159 @@
+import os
+import re
+import hashlib
+
+# 같은 룰 + 같은 코드 줄 + 같은 주변 코드면 한 번만 설명하고 나머지 위치는 "also occurs in"으로 연결
+DEDUP_ENABLED = os.environ.get('LLM_DEDUP', '1') not in ('0', 'false', 'off')
+DEDUP_CONTEXT_LINES = int(os.environ.get('LLM_DEDUP_CONTEXT_LINES', '3'))
+# 한 발견 아래에 나열할 다른 위치 수 (넘으면 "… and N more")
+MAX_LISTED_LOCATIONS = 20
+
+_SPACE = re.compile(r'\s+')
+
+def normalize_snippet(text):
+    """공백 차이(들여쓰기, 줄바꿈, 탭)를 없앤 코드 조각"""
+    return _SPACE.sub(' ', text or '').strip()
+
+def _start_line(issue):
+    start = issue.get('start')
+    if isinstance(start, dict) and isinstance(start.get('line'), int):
+        return start['line']
+    return None
+
+def context_hash(lines, line_no, radius=None):
+    """line_no(1-based) 앞뒤 radius줄을 정규화해 해시. 줄 번호를 모르면 빈 문자열"""
+    radius = DEDUP_CONTEXT_LINES if radius is None else radius
+    if line_no is None or not 0 < line_no <= len(lines):
+        return ''
+    window = lines[max(0, line_no - 1 - radius):line_no + radius]
+    h = hashlib.sha1()
+    for text in window:
+        h.update(normalize_snippet(text).encode('utf-8'))
+        h.update(b'\n')
+    return h.hexdigest()
+
+def finding_fingerprint(issue, lines):
+    line_no = _start_line(issue)
+    snippet = issue.get('source_line')
+    if not snippet and line_no is not None and 0 < line_no <= len(lines):
+        snippet = lines[line_no - 1]
+    raw = '\0'.join((str(issue.get('check_id', '')), normalize_snippet(snippet), context_hash(lines, line_no)))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def location(issue):
+    line_no = _start_line(issue)
+    path = issue.get('path', '?')
+    return f'{path}:{line_no}' if line_no is not None else path
+
+def _record(issue, fp, explained):
+    """조각에 남기는 발견 기록 (증분 작업에서 코드 없이 안내를 다시 만들 때 쓴다)"""
+    line_no = _start_line(issue)
+    return {
+        'fp': fp,
+        'check_id': str(issue.get('check_id', '')),
+        'path': issue.get('path', '?'),
+        'start': {'line': line_no} if line_no is not None else {},
+        'explained': explained,
+    }
+
+def dedupe(files):
+    """
+    files: 보고서 순서대로 [(issues, code_text)]
+    → 파일별 {'issues': LLM에 보낼 대표 발견, 'also': [(대표 issue, [다른 위치])],
+              'covered': [(issue, 대표 위치, 대표 파일 인덱스)], 'records': [발견 기록 (_record)]}, 통계
+    처음 나온 위치가 대표가 되며, 같은 파일 안의 반복도 같은 방식으로 합친다
+    """
+    canonical = {}  # 지문 → (파일 인덱스, 대표 issue)
+    plans = [{'issues': [], 'also': {}, 'covered': [], 'records': []} for _ in files]
+    total = 0
+    for index, (issues, code_text) in enumerate(files):
+        lines = code_text.splitlines()
+        for issue in issues:
+            total += 1
+            fp = finding_fingerprint(issue, lines)
+            plans[index]['records'].append(_record(issue, fp, fp not in canonical))
+            if fp not in canonical:
+                canonical[fp] = (index, issue)
+                plans[index]['issues'].append(issue)
+                continue
+            owner, first = canonical[fp]
+            plans[owner]['also'].setdefault(id(first), (first, []))[1].append(location(issue))
+            plans[index]['covered'].append((issue, location(first), owner))
+
+    for plan in plans:
+        plan['also'] = list(plan['also'].values())
+    unique = sum(len(p['issues']) for p in plans)
+    stats = {
+        'findings': total,
+        'unique': unique,
+        'duplicates': total - unique,
+        'files_covered': sum(1 for p in plans if not p['issues'] and p['covered']),
+    }
+    return plans, stats
+
+def render_notes(plan):
+    """대표 발견의 다른 위치 / 다른 곳에서 설명된 발견 → 조각 끝에 붙일 Markdown (없으면 '')"""
+    out = []
+    if plan['also']:
+        out.append('### Also occurs in')
+        for issue, locations in plan['also']:
+            shown = ', '.join(f'`{loc}`' for loc in locations[:MAX_LISTED_LOCATIONS])
+            more = len(locations) - MAX_LISTED_LOCATIONS
+            if more > 0:
+                shown += f' … and {more} more'
+            out.append(f"- `{issue.get('check_id', '')}` at `{location(issue)}` — also in {shown}")
+        out.append('')
+    if plan['covered']:
+        out.append('### Explained elsewhere')
+        out.append('The following findings are identical to ones explained in another section of this report.')
+        for issue, first, *_ in plan['covered']:
+            see = f'see `{first}`' if first else 'not explained in this report'
+            out.append(f"- `{issue.get('check_id', '')}` at `{location(issue)}` — {see}")
+        out.append('')
+    return '\n'.join(out).strip()
+
+def unexplain(plan, lost):
+    """
+    대표 파일이 설명되지 못했을 때(lost: 실패/예산 초과한 파일 인덱스 → 결과) 그 파일에 기대던 발견을 되돌린다.
+    안내는 '설명 없음'으로 바꾸고 {대표 파일 인덱스: [issue]}를 반환한다
+    """
+    moved = {}
+    covered = []
+    for issue, first, owner in plan['covered']:
+        if owner in lost:
+            moved.setdefault(owner, []).append(issue)
+            first = None
+        covered.append((issue, first, owner))
+    plan['covered'] = covered
+    return moved
+
+def relink(pieces):
+    """
+    조각들(보고서 순서)의 발견 기록('findings')으로 중복 안내('notes')를 현재 파일 구성에 맞게 다시 만든다.
+    증분 작업에서 재사용한 조각의 안내가 바뀌거나 삭제된 파일을 가리키지 않도록 한다.
+    지문의 대표 = 그 발견을 본문에서 설명한 첫 조각. 설명되지 않은 기록에는 대표 경로('see')를 남긴다.
+    기록이 없는 조각(예전 형식, dedup 끔)은 그대로 둔다
+    """
+    canonical, occurrences = {}, {}
+    for piece in pieces:
+        for record in piece.get('findings') or ():
+            occurrences.setdefault(record['fp'], []).append(record)
+            if record['explained'] and record['fp'] not in canonical:
+                canonical[record['fp']] = record
+
+    for piece in pieces:
+        records = piece.get('findings')
+        if records is None:
+            continue
+        plan = {'also': [], 'covered': []}
+        for record in records:
+            first = canonical.get(record['fp'])
+            if first is record:
+                others = [location(o) for o in occurrences[record['fp']] if o is not record]
+                if others:
+                    plan['also'].append((record, others))
+            elif not record['explained']:
+                record['see'] = first['path'] if first else None
+                plan['covered'].append((record, location(first) if first else None))
+        piece['notes'] = render_notes(plan)
+    return pieces
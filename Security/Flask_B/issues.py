@@ -0,0 +1,50 @@
+import sys
+from collections import defaultdict
+
+import shared_path  # noqa: F401
+from common.issues import compact_metadata, iter_issue_dicts
+
+# A가 보내는 발견 목록 읽기. issues.json(JSON 배열)과 NDJSON(A의 Accept: application/x-ndjson 응답 그대로,
+# 마지막 summary 줄 포함)을 모두 받고, 전체를 한 번에 올리지 않고 원소 하나씩 읽으며 파일별로 모은다.
+# Semgrep 결과를 그대로 보낸 경우에도 extra는 보고서가 쓰는 필드만 남긴다 (common/issues.py의 METADATA_KEYS)
+
+def _position(pos):
+    if not isinstance(pos, dict):
+        return {}
+    return {k: pos[k] for k in ('line', 'col') if k in pos}
+
+def compact_issue(issue, metadata=None):
+    """
+    발견 dict에서 보고서가 쓰는 키만 (start/end의 offset, extra.lines/fingerprint/metavars 등은 버림).
+    metadata: 같은 룰끼리 공유할, 이미 줄인 metadata
+    """
+    extra = issue.get('extra') if isinstance(issue.get('extra'), dict) else {}
+    if metadata is None:
+        metadata = compact_metadata(extra.get('metadata'))
+    small = {'message': extra.get('message') or ''}
+    if extra.get('severity'):
+        small['severity'] = sys.intern(str(extra['severity']))
+    if metadata:
+        small['metadata'] = metadata
+    return {
+        'path': sys.intern(issue['path']),
+        'start': _position(issue.get('start')),
+        'end': _position(issue.get('end')),
+        'check_id': sys.intern(str(issue.get('check_id') or '')),
+        'extra': small,
+        'source_line': issue.get('source_line') or '',
+        'file_type': sys.intern(str(issue.get('file_type') or '')),
+    }
+
+def group_issues(f):
+    """스트림에서 읽으면서 {path: [발견]}으로 모은다. path가 없는 원소(NDJSON summary 줄 등)는 건너뛴다"""
+    grouped = defaultdict(list)
+    metadata_by_rule = {}
+    for issue in iter_issue_dicts(f):
+        if not issue.get('path') or not isinstance(issue['path'], str):
+            continue
+        check_id = issue.get('check_id')
+        if check_id not in metadata_by_rule:
+            metadata_by_rule[check_id] = compact_metadata((issue.get('extra') or {}).get('metadata'))
+        grouped[issue['path']].append(compact_issue(issue, metadata_by_rule[check_id]))
+    return dict(grouped)
@@ -0,0 +1,10 @@
+# janitor.py
+# 정리 구현은 common/janitor.py. 여기서는 B 영역들의 보존 시간만 정한다
+import shared_path  # noqa: F401
+from common.janitor import Janitor, area, hours, touch  # noqa: F401
+
+# 영역별 보존 시간
+RECEIVED_TTL = hours('JANITOR_RECEIVED_TTL_HOURS', '24')            # A가 보낸 ZIP/issues.json
+WORKSPACE_TTL = hours('JANITOR_WORKSPACE_TTL_HOURS', '24')          # 해제된 트리, 디버그 산출물
+OUTPUT_TTL = hours('JANITOR_OUTPUT_TTL_HOURS', '168')               # PDF, pieces.json (증분 기준)
+PDF_SECTIONS_TTL = hours('JANITOR_PDF_SECTIONS_TTL_HOURS', '720')   # 섹션 PDF 캐시
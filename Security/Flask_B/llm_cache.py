@@ -0,0 +1,117 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+
+# 캐시 포맷이 바뀌면 올려서 기존 항목을 무효화
+CACHE_SCHEMA = 1
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent / 'cache' / 'llm.sqlite'
+CACHE_PATH = Path(os.environ.get('LLM_CACHE_PATH', DEFAULT_CACHE_PATH))
+CACHE_MAX_BYTES = int(float(os.environ.get('LLM_CACHE_MAX_MB', '256')) * 1024 * 1024)
+CACHE_TTL_SEC = float(os.environ.get('LLM_CACHE_TTL_DAYS', '30')) * 86400
+CACHE_ENABLED = os.environ.get('LLM_CACHE', '1') not in ('0', 'false', 'off')
+
+def fingerprint(*parts):
+    """
+    프롬프트 구성요소(모델, max_tokens, system, 본문 등) → 캐시 키
+    """
+    h = hashlib.sha256(str(CACHE_SCHEMA).encode('utf-8'))
+    for part in parts:
+        data = str(part).encode('utf-8')
+        # 길이를 함께 넣어 경계가 모호한 조합끼리 충돌하지 않게 한다
+        h.update(len(data).to_bytes(8, 'big'))
+        h.update(data)
+    return h.hexdigest()
+
+class LLMCache:
+    """
+    프롬프트 지문 → LLM 응답 Markdown (SQLite).
+    TTL이 지난 항목은 조회 시 무시하고 저장 시 지운다. 총 크기가 max_bytes를 넘으면
+    마지막 접근이 오래된 항목부터 지운다(LRU).
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_BYTES, ttl_sec=CACHE_TTL_SEC):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.ttl_sec = ttl_sec
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                ' key TEXT PRIMARY KEY, body TEXT NOT NULL, size INTEGER NOT NULL,'
+                ' created REAL NOT NULL, last_access REAL NOT NULL)'
+            )
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access)'
+            )
+
+    def get(self, key):
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                'SELECT body, created FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            body, created = row
+            if self.ttl_sec and now - created > self.ttl_sec:
+                self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                return None
+            self._conn.execute('UPDATE responses SET last_access = ? WHERE key = ?', (now, key))
+            return body
+
+    def put(self, key, body):
+        now = time.time()
+        size = len(body.encode('utf-8'))
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (key, body, size, created, last_access)'
+                ' VALUES (?, ?, ?, ?, ?)',
+                (key, body, size, now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now):
+        if self.ttl_sec:
+            self._conn.execute('DELETE FROM responses WHERE created < ?', (now - self.ttl_sec,))
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess, freed, victims = total - self.max_bytes, 0, []
+        for key, size in self._conn.execute('SELECT key, size FROM responses ORDER BY last_access'):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany('DELETE FROM responses WHERE key = ?', victims)
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses'
+            ).fetchone()
+        return {'entries': entries, 'bytes': size, 'max_bytes': self.max_bytes}
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """
+    프로세스 공용 캐시. LLM_CACHE=0이거나 초기화에 실패하면 None
+    """
+    global _cache
+    if not CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = LLMCache()
+            except Exception as e:
+                print(f"[LLM 캐시] 초기화 실패 → {e}")
+                return None
+        return _cache
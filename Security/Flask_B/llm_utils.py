@@ -1,31 +1,315 @@
 import anthropic
 import os
+import re
+import time
+import random
+import threading
+from collections import deque
+from llm_cache import fingerprint
+from metrics import LLM_REQUEST_SECONDS, LLM_TOKENS, LLM_RETRIES, LLM_CACHE
 
 MODEL = 'claude-sonnet-4-20250514'
 MAX_TOKENS = 2048
 
-ANTHROPIC_API_KEY = os.environ['ANTHROPIC_API_KEY']
-CLIENT = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+# 동시 생성 수, 분당 요청/토큰 예산(0이면 제한 없음), 429/529 재시도 횟수
+LLM_CONCURRENCY = int(os.environ.get('LLM_CONCURRENCY', '1'))
+LLM_RPM = int(os.environ.get('LLM_RPM', '0'))
+LLM_TPM = int(os.environ.get('LLM_TPM', '0'))
+LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', '4'))
+LLM_BACKOFF_BASE = 2.0
+RETRYABLE_STATUS = (429, 529)
+
+# 작은 파일 여러 개를 한 요청에 묶는 예산(코드+이슈 추정 토큰, 0이면 묶지 않음)과 요청당 최대 파일 수
+LLM_PACK_MAX_TOKENS = int(os.environ.get('LLM_PACK_MAX_TOKENS', '0'))
+LLM_PACK_MAX_FILES = int(os.environ.get('LLM_PACK_MAX_FILES', '8'))
+LLM_PACK_MAX_OUTPUT_TOKENS = int(os.environ.get('LLM_PACK_MAX_OUTPUT_TOKENS', '8192'))
+# 작업 하나의 LLM 예산: 요청을 받은 뒤 새 LLM 요청을 시작할 수 있는 시간(초), 입력+출력 토큰 수 (0이면 제한 없음)
+LLM_DEADLINE_SECONDS = float(os.environ.get('LLM_DEADLINE_SECONDS', '0'))
+LLM_TOKEN_BUDGET = int(os.environ.get('LLM_TOKEN_BUDGET', '0'))
+REQUEST_TIMEOUT = 30
+
+# 첫 요청 때 만든다 (import만 할 때는 ANTHROPIC_API_KEY가 없어도 됨). 테스트에서는 스텁 객체로 바꿔 끼울 수 있다
+CLIENT = None
+_client_lock = threading.Lock()
+DEFAULT_BASE_URL = 'https://api.anthropic.com'
+
+def get_client():
+    """
+    공유 Anthropic 클라이언트. ANTHROPIC_BASE_URL이 있으면 SDK가 그 주소로 보낸다 (로컬 LLM 스텁 등).
+    재시도/백오프는 아래 _create_with_backoff가 담당하므로 SDK 자체 재시도는 끈다
+    """
+    global CLIENT
+    with _client_lock:
+        if CLIENT is None:
+            api_key = os.environ.get('ANTHROPIC_API_KEY')
+            if not api_key:
+                raise RuntimeError('ANTHROPIC_API_KEY is not set')
+            CLIENT = anthropic.Anthropic(api_key=api_key, max_retries=0)
+        return CLIENT
+
+def _endpoint(client):
+    """
+    캐시 키에 넣을 API 주소. 스텁/다른 엔드포인트의 응답이 실제 API 응답과 같은 키로 섞이지 않게 한다.
+    클라이언트를 아직 만들지 않았으면 SDK와 같은 규칙(ANTHROPIC_BASE_URL, 없으면 기본 주소)으로 정한다
+    """
+    client = client or CLIENT
+    if client is None:
+        return (os.environ.get('ANTHROPIC_BASE_URL') or DEFAULT_BASE_URL).rstrip('/')
+    url = getattr(client, 'base_url', None)
+    if url:
+        return str(url).rstrip('/')
+    return f'{type(client).__module__}.{type(client).__qualname__}'  # base_url이 없는 테스트용 스텁
 
 SYSTEM_DEFAULT = (
     'Act as a senior security auditor. Output pure Markdown with a final "Instructions" section. '
     'For each issue: summary, risk, vulnerable snippet, fixed snippet.'
 )
 
-def generate_llm_md(issue_json_text, code_text, system=SYSTEM_DEFAULT):
-    resp = CLIENT.messages.create(
+PACK_SYSTEM = SYSTEM_DEFAULT + (
+    ' Several files are given. Review each one separately and wrap each answer in its own section: '
+    'a line "<<<FILE id>>>", the Markdown for that file, then a line "<<<END id>>>".'
+)
+_PACK_SECTION = re.compile(r'^<<<FILE ([\w.-]+)>>>[ \t]*$(.*?)^<<<END \1>>>[ \t]*$', re.M | re.S)
+
+def estimate_tokens(text):
+    """대략적인 토큰 수 (문자 4개 ≈ 1토큰)"""
+    return len(text) // 4 + 1
+
+class RateLimiter:
+    """
+    최근 60초 창 기준 분당 요청 수(rpm)/토큰 수(tpm) 예산. 0이면 해당 항목은 제한 없음.
+    429/529를 받으면 pause()로 이 리미터를 쓰는 모든 작업자를 잠시 멈춘다.
+    """
+    WINDOW = 60.0
+
+    def __init__(self, rpm=0, tpm=0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._events = deque()  # (시각, 토큰, 요청 수)
+        self._requests = 0
+        self._tokens = 0
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _prune(self, now):
+        while self._events and now - self._events[0][0] >= self.WINDOW:
+            _, tokens, n = self._events.popleft()
+            self._tokens -= tokens
+            self._requests -= n
+
+    def acquire(self, tokens):
+        """예산이 날 때까지 대기한 뒤 요청 1건 + tokens를 기록"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._prune(now)
+                wait = self._paused_until - now
+                if wait <= 0:
+                    over_rpm = self.rpm and self._requests >= self.rpm
+                    # 창이 비어 있으면 예산보다 큰 요청도 한 건은 통과시킨다
+                    over_tpm = self.tpm and self._events and self._tokens + tokens > self.tpm
+                    if not over_rpm and not over_tpm:
+                        self._events.append((now, tokens, 1))
+                        self._requests += 1
+                        self._tokens += tokens
+                        return
+                    wait = self._events[0][0] + self.WINDOW - now
+            time.sleep(max(wait, 0.01))
+
+    def settle(self, estimated, actual):
+        """acquire()로 잡아 둔 토큰을 실제 사용량으로 보정 (실패한 요청은 actual=0)"""
+        with self._lock:
+            delta = actual - estimated
+            self._events.append((time.monotonic(), delta, 0))
+            self._tokens += delta
+
+    def pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+# 프로세스 공용 분당 예산. LLM 단계에 동시에 들어온 작업(admission.LLM)이 모두 이 예산을 나눠 쓴다
+_limiter = RateLimiter(LLM_RPM, LLM_TPM)
+
+def get_limiter():
+    return _limiter
+
+class LLMStats:
+    """작업 단위 LLM 호출 통계 (스레드 안전)"""
+
+    FIELDS = ('requests', 'retries', 'input_tokens', 'output_tokens', 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.FIELDS, 0)
+
+    def add(self, **counts):
+        with self._lock:
+            for k, v in counts.items():
+                self._counts[k] = self._counts.get(k, 0) + v
+
+    def as_dict(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def cache_summary(self):
+        counts = self.as_dict()
+        lookups = counts['cache_hits'] + counts['cache_misses']
+        return {
+            'hits': counts['cache_hits'],
+            'misses': counts['cache_misses'],
+            'hit_rate': round(counts['cache_hits'] / lookups, 4) if lookups else 0.0,
+        }
+
+class BudgetExhausted(Exception):
+    """작업 예산이 다해 LLM 요청을 시작하지 않음. 호출 측은 실패가 아니라 '빠진 파일'로 다룬다"""
+
+    def __init__(self, reason):
+        super().__init__(f'LLM budget exhausted ({reason})')
+        self.reason = reason
+
+class Budget:
+    """
+    작업 하나의 LLM 예산 (스레드 안전). seconds: 시작부터 새 요청을 시작할 수 있는 시간, tokens: 입력+출력 토큰.
+    요청마다 입력 추정치 + 출력 상한을 미리 잡아 두고 응답을 받으면 실제 사용량으로 정산하므로 토큰 예산을 넘지 않는다.
+    진행 중인 요청은 끝까지 기다리고, 캐시 적중은 예산을 쓰지 않는다
+    """
+
+    def __init__(self, seconds=None, tokens=None, started=None):
+        self.seconds = seconds or None
+        self.tokens = tokens or None
+        self.started = time.monotonic() if started is None else started
+        self.deadline = self.started + self.seconds if self.seconds else None
+        self.used = 0
+        self.reason = None
+        self._reserved = 0
+        self._lock = threading.Lock()
+
+    def _exhaust(self, reason):
+        if self.reason is None:
+            self.reason = reason
+        return BudgetExhausted(reason)
+
+    def reserve(self, tokens):
+        """새 요청 하나 분의 토큰을 잡는다. 마감이 지났거나 토큰이 모자라면 BudgetExhausted"""
+        with self._lock:
+            if self.deadline is not None and time.monotonic() >= self.deadline:
+                raise self._exhaust('deadline')
+            if self.tokens is not None and self.used + self._reserved + tokens > self.tokens:
+                raise self._exhaust('tokens')
+            self._reserved += tokens
+            return tokens
+
+    def settle(self, reserved, used):
+        with self._lock:
+            self._reserved -= reserved
+            self.used += used
+
+    def allows_wait(self, seconds):
+        """seconds만큼 기다린 뒤에도 마감 전인지 (재시도 대기 판단용)"""
+        return self.deadline is None or time.monotonic() + seconds < self.deadline
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'deadline_seconds': self.seconds,
+                'token_budget': self.tokens,
+                'tokens_used': self.used,
+                'elapsed': round(time.monotonic() - self.started, 3),
+                'exhausted': self.reason,
+            }
+
+def _retry_delay(error, attempt):
+    """Retry-After 헤더가 있으면 따르고, 없으면 지터를 섞은 지수 백오프"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return max(float(headers.get('retry-after')), 0.0)
+    except (TypeError, ValueError):
+        return LLM_BACKOFF_BASE * (2 ** attempt) * random.uniform(0.5, 1.0)
+
+def _create_with_backoff(client, limiter, stats, estimated, budget=None, **kwargs):
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        # 예산이 다했으면 BudgetExhausted (입력 추정 + 출력 상한을 잡아 두고 응답 후 정산)
+        held = estimated + kwargs.get('max_tokens', 0)
+        reserved = budget.reserve(held) if budget is not None else 0
+        # 분당 토큰 예산도 같은 방식: 출력 상한까지 잡아 두고 응답 후 정산
+        if limiter is not None:
+            limiter.acquire(held)
+        started = time.monotonic()
+        try:
+            resp = client.messages.create(**kwargs)
+        except Exception as e:
+            if budget is not None:
+                budget.settle(reserved, 0)
+            if limiter is not None:
+                limiter.settle(held, 0)
+            status = getattr(e, 'status_code', None)
+            retry = status in RETRYABLE_STATUS and attempt < LLM_MAX_RETRIES
+            LLM_REQUEST_SECONDS.observe(time.monotonic() - started, outcome='retry' if retry else 'error')
+            if not retry:
+                raise
+            delay = _retry_delay(e, attempt)
+            if budget is not None and not budget.allows_wait(delay):
+                raise budget._exhaust('deadline') from e
+            print(f"[LLM 재시도] status={status} attempt={attempt + 1} → {delay:.1f}s 대기")
+            LLM_RETRIES.inc(status=status)
+            if stats is not None:
+                stats.add(retries=1)
+            if limiter is not None:
+                limiter.pause(delay)
+            else:
+                time.sleep(delay)
+            continue
+
+        LLM_REQUEST_SECONDS.observe(time.monotonic() - started, outcome='ok')
+        usage = getattr(resp, 'usage', None)
+        in_tok = getattr(usage, 'input_tokens', 0) or 0
+        out_tok = getattr(usage, 'output_tokens', 0) or 0
+        LLM_TOKENS.inc(in_tok, direction='input')
+        LLM_TOKENS.inc(out_tok, direction='output')
+        if limiter is not None:
+            limiter.settle(held, in_tok + out_tok if usage is not None else held)
+        if stats is not None:
+            stats.add(requests=1, input_tokens=in_tok, output_tokens=out_tok)
+        if budget is not None:
+            budget.settle(reserved, in_tok + out_tok)
+        return resp
+
+def _complete(content, system, max_tokens, client, limiter, stats, cache, accept=None, budget=None):
+    """
+    캐시 조회 → (미스면) API 호출 → 응답 텍스트.
+    accept(md)가 False거나 max_tokens에서 잘린(stop_reason == 'max_tokens') 응답은 캐시에 저장하지 않는다.
+    budget이 다했으면 캐시 적중만 돌려주고 API는 부르지 않는다 (BudgetExhausted)
+    """
+    key = None
+    if cache is not None:
+        key = fingerprint(MODEL, max_tokens, system, content, _endpoint(client))
+        try:
+            cached = cache.get(key)
+        except Exception as e:
+            print(f"[LLM 캐시] 조회 실패 → {e}")
+            cached = None
+        LLM_CACHE.inc(result='hit' if cached is not None else 'miss')
+        if stats is not None:
+            stats.add(**{'cache_hits' if cached is not None else 'cache_misses': 1})
+        if cached is not None:
+            return cached
+
+    resp = _create_with_backoff(
+        client or get_client(),
+        limiter,
+        stats,
+        estimate_tokens(system) + estimate_tokens(content),
+        budget=budget,
         model=MODEL,
         system=system,
         messages=[{
             'role': 'user',
-            'content': (
-                '## JSON\n```json\n' + issue_json_text + '\n```\n\n'
-                '## Source Code\n```text\n' + code_text + '\n```\n'
-                '## Output Rules\nPure Markdown only; include "Instructions" at the end.'
-            ),
+            'content': content,
         }],
-        max_tokens=MAX_TOKENS,
-        timeout = 30
+        max_tokens=max_tokens,
+        # 출력 상한이 큰 묶음 요청은 그만큼 오래 걸린다
+        timeout=REQUEST_TIMEOUT * max(1, max_tokens // MAX_TOKENS),
     )
 
     parts = []
@@ -33,4 +317,69 @@ def generate_llm_md(issue_json_text, code_text, system=SYSTEM_DEFAULT):
         text = getattr(block, 'text', None)
         if isinstance(text, str):
             parts.append(text)
-    return "".join(parts).strip()
+    md = "".join(parts).strip()
+
+    truncated = getattr(resp, 'stop_reason', None) == 'max_tokens'
+    if truncated:
+        print(f"[LLM] 출력 상한({max_tokens} 토큰)에서 잘린 응답 → 캐시하지 않음")
+    if key is not None and md and not truncated and (accept is None or accept(md)):
+        try:
+            cache.put(key, md)
+        except Exception as e:
+            print(f"[LLM 캐시] 저장 실패 → {e}")
+    return md
+
+def generate_llm_md(issue_json_text, code_text, system=SYSTEM_DEFAULT, client=None, limiter=None, stats=None,
+                    cache=None, budget=None):
+    """
+    client: messages.create를 가진 객체 (기본 get_client(), 테스트 시 스텁으로 대체 가능)
+    limiter: RateLimiter (없으면 예산 제한 없이 호출, 보통 프로세스 공용 get_limiter())
+    stats: LLMStats (호출/재시도/토큰/캐시 적중 수 집계)
+    cache: llm_cache.LLMCache. 같은 (모델, max_tokens, system, 프롬프트, API 주소)면 저장된 응답을 재사용
+    budget: 작업 예산 (Budget). 다했으면 BudgetExhausted
+    """
+    content = (
+        '## JSON\n```json\n' + issue_json_text + '\n```\n\n'
+        '## Source Code\n```text\n' + code_text + '\n```\n'
+        '## Output Rules\nPure Markdown only; include "Instructions" at the end.'
+    )
+    return _complete(content, system, MAX_TOKENS, client, limiter, stats, cache, budget=budget)
+
+def split_pack_response(text, ids):
+    """
+    묶음 응답 → {id: markdown}. 구분선이 온전하고 내용이 있는 섹션만 돌려준다
+    """
+    wanted, found = set(ids), {}
+    for m in _PACK_SECTION.finditer(text):
+        section_id, md = m.group(1), m.group(2).strip()
+        if section_id in wanted and section_id not in found and md:
+            found[section_id] = md
+    return found
+
+def generate_llm_md_batch(entries, system=PACK_SYSTEM, client=None, limiter=None, stats=None, cache=None,
+                          budget=None):
+    """
+    entries: [(id, 파일 이름, issue_json_text, code_text)] → 한 요청으로 생성한 {id: markdown}.
+    파싱에 실패한(빠졌거나 잘린) 파일은 결과에 없으므로 호출 측에서 단건으로 다시 요청한다
+    """
+    ids = [entry[0] for entry in entries]
+    blocks = ['Review each file below separately.\n']
+    for section_id, name, issue_json_text, code_text in entries:
+        blocks.append(
+            f'# File {section_id}: {name}\n'
+            '## JSON\n```json\n' + issue_json_text + '\n```\n\n'
+            '## Source Code\n```text\n' + code_text + '\n```\n'
+        )
+    blocks.append(
+        '## Output Rules\nPure Markdown only; each file\'s section ends with its own "Instructions". '
+        'Write exactly one section per file, in this order: ' + ', '.join(ids) + '.\n'
+        'Format:\n<<<FILE id>>>\n...markdown...\n<<<END id>>>'
+    )
+    max_tokens = min(LLM_PACK_MAX_OUTPUT_TOKENS, MAX_TOKENS * len(entries))
+    md = _complete(
+        '\n'.join(blocks), system, max_tokens, client, limiter, stats, cache,
+        # 모든 파일이 온전히 파싱된 응답만 캐시 (부분 실패를 재사용하지 않도록)
+        accept=lambda text: len(split_pack_response(text, ids)) == len(ids),
+        budget=budget,
+    )
+    return split_pack_response(md, ids)
@@ -0,0 +1,16 @@
+# metrics.py
+# 레지스트리, span, 공용 메트릭은 common/metrics.py. 여기서는 B의 메트릭 접두사와 B 전용 메트릭만 정한다
+import shared_path  # noqa: F401
+from common.metrics import (  # noqa: F401  (B 모듈들은 계속 metrics에서 import한다)
+    CONTENT_TYPE, REGISTRY, HTTP_REQUESTS, HTTP_SECONDS, HTTP_IN_FLIGHT,
+    record_extract, job_timeline, span,
+)
+
+REGISTRY.configure('flask_b')
+
+LLM_REQUEST_SECONDS = REGISTRY.histogram('llm_request_seconds', 'Latency of one Messages API call', ('outcome',))
+LLM_TOKENS = REGISTRY.counter('llm_tokens_total', 'Tokens reported by the Messages API', ('direction',))
+LLM_RETRIES = REGISTRY.counter('llm_retries_total', 'Retried Messages API calls', ('status',))
+LLM_CACHE = REGISTRY.counter('llm_cache_lookups_total', 'LLM response cache lookups', ('result',))
+PDF_RENDER_SECONDS = REGISTRY.histogram('pdf_render_seconds', 'xhtml2pdf render time per document', ('kind',))
+PDF_SECTIONS = REGISTRY.counter('pdf_sections_total', 'Report sections by source', ('source',))
@@ -0,0 +1,283 @@
+import os
+import html
+import time
+import hashlib
+import threading
+import multiprocessing
+from pathlib import Path
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import markdown
+from xhtml2pdf import pisa
+
+from metrics import PDF_RENDER_SECONDS, PDF_SECTIONS
+
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:  # pypdf가 없으면 단일 렌더링으로만 동작
+    PdfReader = PdfWriter = None
+
+# HTML 템플릿/CSS가 바뀌면 올려서 캐시된 섹션을 무효화
+TEMPLATE_VERSION = 1
+REPORT_TITLE = 'Security Audit Report'
+
+# sections: 파일별 PDF 섹션을 병렬 렌더링 + 캐시 후 목차와 함께 병합
+# single: 전체 Markdown을 한 번에 렌더링 (기존 동작)
+PDF_RENDER_MODE = os.environ.get('PDF_RENDER_MODE', 'sections').lower()
+PDF_WORKERS = int(os.environ.get('PDF_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+DEFAULT_SECTION_CACHE = Path(__file__).resolve().parent / 'cache' / 'pdf_sections'
+SECTION_CACHE_DIR = Path(os.environ.get('PDF_SECTION_CACHE_DIR', DEFAULT_SECTION_CACHE))
+SECTION_CACHE_MAX_BYTES = int(float(os.environ.get('PDF_SECTION_CACHE_MAX_MB', '512')) * 1024 * 1024)
+
+def markdown_to_html(md):
+    return markdown.markdown(md, extensions=['fenced_code', 'tables'])
+
+def html_document(html_body):
+    return (
+        "<!doctype html>"
+        '<meta charset="utf-8">'
+        f"<title>{REPORT_TITLE}</title>"
+        '<body style="max-width:900px;margin:40px auto;font-family:Arial, sans-serif; line-height:1.6;">'
+        f"{html_body}</body>"
+    )
+
+def render_pdf(full_html, dest):
+    """
+    HTML → PDF 파일. 프로세스 풀에서 호출되므로 모듈 최상위 함수로 둔다.
+    임시 파일에 쓴 뒤 교체하므로 실패해도 반쯤 쓰인 캐시 파일이 남지 않는다. 실패 시 오류 메시지 반환
+    """
+    dest = Path(dest)
+    tmp = dest.with_name(f'{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    try:
+        with open(tmp, 'wb') as f:
+            result = pisa.CreatePDF(src=full_html, dest=f, encoding='utf-8')
+        if result.err:
+            return f'xhtml2pdf error count={result.err}'
+        os.replace(tmp, dest)
+        return None
+    except Exception as e:
+        return f'{type(e).__name__}: {e}'
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+def timed_render(full_html, dest):
+    """render_pdf + 소요 시간. 작업자 프로세스에서 잰 값을 부모 프로세스가 메트릭으로 남긴다"""
+    started = time.monotonic()
+    err = render_pdf(full_html, dest)
+    return err, time.monotonic() - started
+
+def _render_observed(kind, full_html, dest):
+    err, seconds = timed_render(full_html, dest)
+    PDF_RENDER_SECONDS.observe(seconds, kind=kind)
+    return err
+
+def section_markdown(name, body):
+    return f'## File: `{name}`\n\n{body}'
+
+def section_key(section_md):
+    h = hashlib.sha256(str(TEMPLATE_VERSION).encode('utf-8'))
+    h.update(b'\0')
+    h.update(section_md.encode('utf-8'))
+    return h.hexdigest()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool(workers):
+    """
+    작업 간에 재사용하는 렌더링 프로세스 풀.
+    스레드가 도는 서버 프로세스를 fork하지 않도록 spawn으로 띄운다
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+# 찾거나 렌더링한 뒤 아직 읽지 않은 섹션 {파일 이름: 쓰는 요청 수}. 캐시 정리와 janitor가 건너뛴다
+_in_use = {}
+_in_use_lock = threading.Lock()
+
+@contextmanager
+def _using(paths):
+    names = {p.name for p in paths}
+    with _in_use_lock:
+        for name in names:
+            _in_use[name] = _in_use.get(name, 0) + 1
+    try:
+        yield
+    finally:
+        with _in_use_lock:
+            for name in names:
+                _in_use[name] -= 1
+                if not _in_use[name]:
+                    del _in_use[name]
+
+def sections_in_use():
+    """다른 요청이 병합하려고 잡아 둔 섹션 파일 이름 (janitor의 keep)"""
+    with _in_use_lock:
+        return set(_in_use)
+
+def _prune_cache(cache_dir, max_bytes, keep=(), newer_than=None):
+    """
+    섹션 캐시가 max_bytes를 넘으면 마지막 사용(mtime)이 오래된 것부터 지운다.
+    keep(다른 요청이 잡아 둔 섹션)과 newer_than 이후에 쓰인 섹션(이 요청이 시작한 뒤 다른 요청/프로세스가 쓴 것)은
+    지우지 않는다 (용량에는 센다)
+    """
+    entries = []
+    for p in cache_dir.glob('*.pdf'):
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, p))
+    total = sum(size for _, size, _ in entries)
+    for mtime, size, p in sorted(entries):
+        if total <= max_bytes:
+            break
+        if p.name in keep or (newer_than is not None and mtime >= newer_than):
+            continue
+        try:
+            p.unlink()
+            total -= size
+        except OSError:
+            pass
+
+def render_sections(sections, cache_dir=None, workers=None):
+    """
+    [(name, markdown)] → 섹션별 PdfReader 목록과 통계.
+    캐시에 없는 섹션만 프로세스 풀에서 렌더링한다. 읽어 들인 뒤(PdfReader는 파일 전체를 메모리에 올린다)에만
+    캐시를 정리하고, 그때까지 이 요청의 섹션은 다른 요청의 정리에서 빠진다
+    """
+    cache_dir = Path(cache_dir or SECTION_CACHE_DIR)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    workers = max(1, workers or PDF_WORKERS)
+    started = time.time()
+
+    docs = [section_markdown(name, body) for name, body in sections]
+    paths = [cache_dir / f'{section_key(section_md)}.pdf' for section_md in docs]
+    with _using(paths):
+        readers, stats = _render_and_read(docs, paths, workers)
+    _prune_cache(cache_dir, SECTION_CACHE_MAX_BYTES, keep=sections_in_use(), newer_than=started)
+    return readers, stats
+
+def _render_and_read(docs, paths, workers):
+    todo = {}
+    for section_md, path in zip(docs, paths):
+        if path.exists() and path.stat().st_size > 0:
+            os.utime(path)  # LRU 정리용 마지막 사용 시각
+        elif path not in todo:
+            todo[path] = html_document(markdown_to_html(section_md))
+
+    errors = {}
+    if workers > 1 and len(todo) > 1:
+        try:
+            pool = _get_pool(workers)
+            futures = {path: pool.submit(timed_render, doc, path) for path, doc in todo.items()}
+            outcomes = {path: f.result() for path, f in futures.items()}
+            for err, seconds in outcomes.values():
+                PDF_RENDER_SECONDS.observe(seconds, kind='section')
+            errors = {path: err for path, (err, _) in outcomes.items()}
+        except BrokenProcessPool as e:
+            print(f"[PDF] 렌더링 프로세스 풀 중단 → 현재 프로세스에서 렌더링 ({e})")
+            _reset_pool()
+            errors = {}
+    for path, doc in todo.items():
+        if path not in errors:
+            errors[path] = _render_observed('section', doc, path)
+
+    failed = [err for err in errors.values() if err]
+    if failed:
+        raise RuntimeError(f"PDF 생성 중 오류가 발생했습니다. ({failed[0]})")
+
+    readers, rendered = [], len(todo)
+    for section_md, path in zip(docs, paths):
+        try:
+            readers.append(PdfReader(str(path)))
+        except FileNotFoundError:
+            # 캐시를 함께 쓰는 다른 B 프로세스가 정리하며 지움 → 다시 렌더링
+            err = _render_observed('section', html_document(markdown_to_html(section_md)), path)
+            if err:
+                raise RuntimeError(f"PDF 생성 중 오류가 발생했습니다. ({err})")
+            readers.append(PdfReader(str(path)))
+            rendered += 1
+
+    PDF_SECTIONS.inc(rendered, source='rendered')
+    PDF_SECTIONS.inc(len(paths) - rendered, source='cached')
+    stats = {'sections': len(paths), 'rendered': rendered, 'cached': len(paths) - rendered, 'workers': workers}
+    return readers, stats
+
+def _toc_html(entries, first_page):
+    """entries: [(name, 섹션 페이지 수)] → 목차 HTML (first_page: 첫 섹션의 시작 페이지)"""
+    rows, page = [], first_page
+    for name, count in entries:
+        rows.append(
+            f'<tr><td><code>{html.escape(name)}</code></td>'
+            f'<td style="text-align:right;">{page}</td></tr>'
+        )
+        page += count
+    if not rows:
+        return f'<h1>{REPORT_TITLE}</h1><p><em>No content</em>.</p>'
+    return (
+        f'<h1>{REPORT_TITLE}</h1><h2>Contents</h2>'
+        '<table style="width:100%;"><tr><th style="text-align:left;">File</th>'
+        '<th style="text-align:right;">Page</th></tr>'
+        f'{"".join(rows)}</table>'
+    )
+
+def _render_toc(entries, dest):
+    """목차 자신의 페이지 수에 따라 쪽 번호가 밀리므로, 페이지 수가 맞을 때까지 다시 렌더링"""
+    toc_pages = 1
+    for _ in range(3):
+        err = _render_observed('toc', html_document(_toc_html(entries, toc_pages + 1)), dest)
+        if err:
+            raise RuntimeError(f"PDF 생성 중 오류가 발생했습니다. ({err})")
+        actual = len(PdfReader(str(dest)).pages)
+        if actual == toc_pages:
+            break
+        toc_pages = actual
+    return toc_pages
+
+def render_report(sections, merged_md, pdf_path, mode=None, workers=None, cache_dir=None):
+    """
+    sections: [(name, markdown)] 파일별 조각, merged_md: single 모드에서 쓸 병합 Markdown.
+    sections 모드: 섹션별 PDF(캐시) + 목차 페이지 + 파일별 책갈피로 병합. 렌더링 통계 반환
+    """
+    pdf_path = Path(pdf_path)
+    mode = (mode or PDF_RENDER_MODE).lower()
+    if mode != 'sections' or PdfWriter is None:
+        err = _render_observed('single', html_document(markdown_to_html(merged_md)), pdf_path)
+        if err:
+            raise RuntimeError(f"PDF 생성 중 오류가 발생했습니다. ({err})")
+        return {'mode': 'single'}
+
+    readers, stats = render_sections(sections, cache_dir=cache_dir, workers=workers)
+    counts = [len(r.pages) for r in readers]
+
+    toc_path = pdf_path.with_name(f'{pdf_path.stem}.toc.pdf')
+    try:
+        toc_pages = _render_toc([(name, n) for (name, _), n in zip(sections, counts)], toc_path)
+        writer = PdfWriter()
+        # xhtml2pdf가 제목마다 만드는 책갈피는 버리고 파일당 하나만 단다
+        writer.append(str(toc_path), outline_item='Contents', import_outline=False)
+        for (name, _), reader in zip(sections, readers):
+            writer.append(reader, outline_item=name, import_outline=False)
+        with open(pdf_path, 'wb') as f:
+            writer.write(f)
+    finally:
+        if toc_path.exists():
+            toc_path.unlink()
+
+    stats.update(mode='sections', toc_pages=toc_pages, pages=toc_pages + sum(counts))
+    return stats
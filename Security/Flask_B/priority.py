@@ -0,0 +1,30 @@
+# 발견의 위험도 순위 (LLM 작업 순서, 예산이 다했을 때 빠진 파일 목록용).
+# Semgrep의 extra.severity(ERROR/WARNING/INFO, 최근 룰은 CRITICAL/HIGH/MEDIUM/LOW)와
+# extra.metadata.confidence(HIGH/MEDIUM/LOW)를 쓴다. 값이 없으면 가장 낮은 순위
+
+SEVERITY_RANK = {'CRITICAL': 4, 'ERROR': 3, 'HIGH': 3, 'WARNING': 2, 'MEDIUM': 2, 'INFO': 1, 'LOW': 1}
+CONFIDENCE_RANK = {'HIGH': 3, 'MEDIUM': 2, 'LOW': 1}
+
+def _extra(issue):
+    extra = issue.get('extra') if isinstance(issue, dict) else None
+    return extra if isinstance(extra, dict) else {}
+
+def issue_severity(issue):
+    return str(_extra(issue).get('severity') or '').upper()
+
+def issue_confidence(issue):
+    metadata = _extra(issue).get('metadata')
+    return str((metadata or {}).get('confidence') or '').upper() if isinstance(metadata, dict) else ''
+
+def issue_risk(issue):
+    """(심각도 순위, 신뢰도 순위). 클수록 위험"""
+    return SEVERITY_RANK.get(issue_severity(issue), 0), CONFIDENCE_RANK.get(issue_confidence(issue), 0)
+
+def file_risk(issues):
+    """파일의 위험도 = 가장 위험한 발견의 (심각도, 신뢰도) + 발견 수. 클수록 먼저 처리한다"""
+    top = max((issue_risk(i) for i in issues), default=(0, 0))
+    return top + (len(issues),)
+
+def top_issue(issues):
+    """가장 위험한 발견 (보고서 표시용). 없으면 None"""
+    return max(issues, key=issue_risk, default=None)
@@ -0,0 +1,84 @@
+# 중복 발견을 설명하기로 한 대표 파일이 실패하거나 예산으로 빠졌을 때, 그 파일에 기대던 조각/생략 목록을 확인한다
+import json
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import analyzer  # noqa: E402
+from llm_utils import Budget  # noqa: E402
+
+CODE = 'x = eval(y)\nq = sql(z)\n'
+
+def issue(check_id, line, severity, path):
+    return {'check_id': check_id, 'path': path, 'start': {'line': line}, 'extra': {'severity': severity}}
+
+def make_items(severity_b='INFO'):
+    # a.py: eval (대표), b.py: eval (a.py의 중복) + sql, c.py: eval (a.py의 중복)만
+    files = {
+        'a.py': [issue('eval', 1, 'INFO', 'a.py')],
+        'b.py': [issue('eval', 1, 'INFO', 'b.py'), issue('sql', 2, severity_b, 'b.py')],
+        'c.py': [issue('eval', 1, 'INFO', 'c.py')],
+    }
+    return [(name, name, lambda issues=issues: (json.dumps(issues), CODE)) for name, issues in files.items()]
+
+def run(monkeypatch, fake, items, budget=None):
+    monkeypatch.setattr(analyzer, 'generate_llm_md', fake)
+    meta, pieces = analyzer._generate_pieces(items, concurrency=1, use_cache=False, pack_tokens=0, dedup=True,
+                                             budget=budget)
+    return meta, {p['name']: p for p in pieces}
+
+def test_covered_files_point_to_their_canonical(monkeypatch):
+    meta, pieces = run(monkeypatch, lambda issue_text, code_text, **kw: 'explained', make_items())
+
+    assert sorted(pieces) == ['a.py', 'b.py', 'c.py']
+    assert pieces['c.py']['body'].startswith('_All findings in this file are identical')
+    assert 'see `a.py:1`' in pieces['b.py']['notes']
+    assert meta['failed_items'] == [] and meta['omitted'] == []
+
+def test_failed_canonical_does_not_leave_dangling_references(monkeypatch):
+    def fake(issue_text, code_text, **kw):
+        if '"eval"' in issue_text:
+            raise RuntimeError('boom')
+        return 'explained'
+
+    meta, pieces = run(monkeypatch, fake, make_items())
+
+    # c.py는 설명할 것이 하나도 남지 않으므로 조각 없이 실패로, b.py는 자기 발견만 설명하고 eval은 '설명 없음'
+    assert sorted(pieces) == ['b.py']
+    assert 'not explained in this report' in pieces['b.py']['notes']
+    assert 'see `a.py:1`' not in pieces['b.py']['notes']
+    assert meta['failure_count'] == 2
+    assert meta['failed_items'] == ['a.py: RuntimeError - boom', 'c.py: duplicates of findings in failed file(s) a.py']
+    assert meta['omitted'] == [] and meta['partial'] is False
+
+def test_budget_runs_out_before_canonical_file(monkeypatch):
+    def fake(issue_text, code_text, budget=None, **kw):
+        budget.settle(budget.reserve(100), 100)
+        return 'explained'
+
+    # b.py가 더 위험하므로 먼저 나가고, 남은 예산으로는 대표 파일 a.py를 시작할 수 없다
+    meta, pieces = run(monkeypatch, fake, make_items(severity_b='ERROR'), budget=Budget(tokens=150))
+
+    assert sorted(pieces) == ['b.py']
+    assert 'not explained in this report' in pieces['b.py']['notes']
+    assert meta['partial'] is True and meta['failed_items'] == []
+    omitted = {item['name']: item['findings'] for item in meta['omitted']}
+    assert omitted == {'a.py': 1, 'b.py': 1, 'c.py': 1}
+    assert 'findings in the 3 file(s) below were not explained' in analyzer.omitted_markdown(meta)
+
+@pytest.mark.parametrize('dedup', [True, False])
+def test_budget_omits_every_finding_of_unstarted_files(monkeypatch, dedup):
+    def fake(issue_text, code_text, budget=None, **kw):
+        budget.settle(budget.reserve(100), 100)
+        return 'explained'
+
+    monkeypatch.setattr(analyzer, 'generate_llm_md', fake)
+    meta, pieces = analyzer._generate_pieces(make_items(severity_b='ERROR'), concurrency=1, use_cache=False,
+                                             pack_tokens=0, dedup=dedup, budget=Budget(tokens=50))
+    assert pieces == []
+    # dedup 여부와 상관없이 설명되지 않은 발견 수는 같다
+    assert sum(item['findings'] for item in meta['omitted']) == 4
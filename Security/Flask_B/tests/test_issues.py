@@ -0,0 +1,75 @@
+# 스트리밍 발견 읽기(iter_issue_dicts/group_issues)가 json.load와 같은 결과를 내는지, 깨진 입력은 거부하는지 확인한다
+import io
+import json
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from issues import compact_issue, group_issues, iter_issue_dicts  # noqa: E402
+from common.issues import compact_metadata  # noqa: E402
+
+ISSUES = [
+    {
+        'check_id': 'python.eval', 'path': 'app.py', 'start': {'line': 3, 'col': 1, 'offset': 20},
+        'end': {'line': 3, 'col': 9}, 'source_line': 'eval(x)',
+        'extra': {'message': 'eval with "quotes", [brackets] and é', 'severity': 'ERROR',
+                  'metadata': {'confidence': 'HIGH', 'cwe': ['CWE-95'], 'fingerprint': 'x'}},
+    },
+    {'check_id': 'python.sql', 'path': 'db/query.py', 'start': {'line': 10}, 'extra': {'severity': 'WARNING'}},
+    {'check_id': 'python.eval', 'path': 'app.py', 'start': {'line': 8}, 'extra': {'message': 'x\ny'}},
+]
+
+DOCUMENTS = {
+    'compact': json.dumps(ISSUES, separators=(',', ':')),
+    'pretty': json.dumps(ISSUES, indent=2, ensure_ascii=False),
+    'empty': '[]',
+    'empty_pretty': '[\n]\n',
+}
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64 * 1024])
+@pytest.mark.parametrize('name', sorted(DOCUMENTS))
+def test_iter_matches_json_load(name, chunk_size):
+    text = DOCUMENTS[name]
+    assert list(iter_issue_dicts(io.StringIO(text), chunk_size=chunk_size)) == json.load(io.StringIO(text))
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64 * 1024])
+def test_iter_reads_ndjson(chunk_size):
+    text = ''.join(json.dumps(issue) + '\n' for issue in ISSUES) + json.dumps({'summary': {'findings': 3}}) + '\n'
+    issues = list(iter_issue_dicts(io.StringIO(text), chunk_size=chunk_size))
+    assert issues[:-1] == ISSUES and issues[-1] == {'summary': {'findings': 3}}
+
+@pytest.mark.parametrize('name', sorted(DOCUMENTS))
+def test_group_matches_json_load(name):
+    text = DOCUMENTS[name]
+    expected, metadata = {}, {}
+    for issue in json.load(io.StringIO(text)):
+        # 같은 룰의 발견은 처음 나온 발견의 metadata를 공유한다
+        rule = metadata.setdefault(issue['check_id'], compact_metadata((issue.get('extra') or {}).get('metadata')))
+        expected.setdefault(issue['path'], []).append(compact_issue(issue, rule))
+    assert group_issues(io.StringIO(text)) == expected
+
+def test_group_skips_entries_without_path():
+    text = json.dumps(ISSUES[1]) + '\n' + json.dumps({'summary': {'findings': 1}}) + '\n'
+    assert list(group_issues(io.StringIO(text))) == ['db/query.py']
+
+@pytest.mark.parametrize('cut', [1, 40, -2, -1])
+@pytest.mark.parametrize('chunk_size', [1, 7, 64 * 1024])
+def test_truncated_input_raises(cut, chunk_size):
+    text = DOCUMENTS['pretty'][:cut]
+    with pytest.raises(ValueError):
+        list(iter_issue_dicts(io.StringIO(text), chunk_size=chunk_size))
+
+def test_truncated_at_element_boundary_raises():
+    text = DOCUMENTS['compact']
+    boundary = text.index('},{') + 2
+    with pytest.raises(ValueError, match='unterminated'):
+        list(iter_issue_dicts(io.StringIO(text[:boundary])))
+
+@pytest.mark.parametrize('text', ['[1, 2]', '["a"]', '{"a": 1}\n[]\n3\n'])
+def test_non_object_elements_raise(text):
+    with pytest.raises(ValueError):
+        list(iter_issue_dicts(io.StringIO(text)))
@@ -0,0 +1,101 @@
+# LLM 응답 캐시: 잘린 응답은 저장하지 않고, API 주소가 다르면 적중하지 않으며, TTL/LRU로 지워지는지 확인한다
+import os
+import sys
+import types
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import llm_cache  # noqa: E402
+from llm_cache import LLMCache, fingerprint  # noqa: E402
+from llm_utils import LLMStats, generate_llm_md  # noqa: E402
+
+class FakeClient:
+    def __init__(self, base_url='http://llm-a', stop_reason='end_turn'):
+        self.base_url, self.stop_reason, self.calls = base_url, stop_reason, 0
+        self.messages = self
+
+    def create(self, **kwargs):
+        self.calls += 1
+        return types.SimpleNamespace(
+            content=[types.SimpleNamespace(text=f'answer {self.calls}')],
+            stop_reason=self.stop_reason,
+            usage=types.SimpleNamespace(input_tokens=10, output_tokens=10),
+        )
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMCache(tmp_path / 'llm.sqlite', max_bytes=1 << 20, ttl_sec=3600)
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, 'time', clock)
+    return clock
+
+def test_same_prompt_and_endpoint_hits(cache):
+    client, stats = FakeClient(), LLMStats()
+    assert generate_llm_md('[]', 'x = 1', client=client, cache=cache, stats=stats) == 'answer 1'
+    assert generate_llm_md('[]', 'x = 1', client=client, cache=cache, stats=stats) == 'answer 1'
+    assert client.calls == 1
+    assert stats.cache_summary() == {'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+
+def test_truncated_response_is_not_cached(cache):
+    client = FakeClient(stop_reason='max_tokens')
+    assert generate_llm_md('[]', 'x = 1', client=client, cache=cache) == 'answer 1'
+    assert generate_llm_md('[]', 'x = 1', client=client, cache=cache) == 'answer 2'
+    assert cache.stats()['entries'] == 0
+
+def test_different_base_url_misses(cache):
+    first, other = FakeClient('http://llm-a'), FakeClient('http://llm-b/')
+    generate_llm_md('[]', 'x = 1', client=first, cache=cache)
+    assert generate_llm_md('[]', 'x = 1', client=other, cache=cache) == 'answer 1'
+    assert other.calls == 1
+    # 끝의 '/'만 다른 같은 주소는 같은 키
+    again = FakeClient('http://llm-a/')
+    generate_llm_md('[]', 'x = 1', client=again, cache=cache)
+    assert again.calls == 0
+
+def test_fingerprint_separates_part_boundaries():
+    assert fingerprint('ab', 'c') != fingerprint('a', 'bc')
+    assert fingerprint('a', 'b') == fingerprint('a', 'b')
+
+def test_expired_entries_are_ignored_and_evicted(cache, clock):
+    cache.put('old', 'x')
+    clock.now += 1800
+    cache.put('new', 'y')
+    clock.now += 1801
+    # 'old'는 TTL(3600초)을 넘었으므로 조회되지 않고 지워진다
+    assert cache.get('old') is None
+    assert cache.get('new') == 'y'
+
+    cache.put('other', 'z')
+    clock.now += 1800
+    cache.put('last', 'w')
+    # 저장할 때 만료된 항목을 함께 지운다
+    assert cache.stats()['entries'] == 2
+    assert cache.get('new') is None and cache.get('other') == 'z'
+
+def test_size_cap_evicts_least_recently_used(tmp_path, clock):
+    cache = LLMCache(tmp_path / 'llm.sqlite', max_bytes=30, ttl_sec=0)
+    for key in ('a', 'b', 'c'):
+        cache.put(key, key * 10)
+        clock.now += 1
+    assert cache.stats()['bytes'] == 30
+
+    # 'a'를 최근에 읽었으므로 새 항목이 들어오면 'b'가 먼저 빠진다
+    assert cache.get('a') == 'a' * 10
+    clock.now += 1
+    cache.put('d', 'd' * 10)
+    assert cache.get('b') is None
+    assert [cache.get(k) is not None for k in ('a', 'c', 'd')] == [True, True, True]
+    assert cache.stats()['bytes'] <= 30
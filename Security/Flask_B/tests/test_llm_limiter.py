@@ -0,0 +1,94 @@
+# 로컬 LLM 스텁(bench/llm_stub.py)을 상대로 429/529 백오프와 분당 예산(RateLimiter)을 확인한다
+import os
+import sys
+import time
+import types
+
+import anthropic
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(HERE)), 'bench'))
+
+import llm_utils  # noqa: E402
+from llm_utils import RateLimiter, LLMStats, generate_llm_md, get_limiter  # noqa: E402
+import llm_stub  # noqa: E402
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**options):
+        server, state = llm_stub.serve(latency_ms=0, ms_per_token=0, **options)
+        servers.append(server)
+        client = anthropic.Anthropic(api_key='test', base_url=f'http://127.0.0.1:{server.server_address[1]}',
+                                     max_retries=0)
+        return client, state
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+@pytest.mark.parametrize('status', [429, 529])
+def test_retryable_status_pauses_limiter_and_retries(stub, status):
+    # 두 번째 요청마다 실패 → 첫 호출은 성공, 두 번째 호출은 한 번 실패 후 재시도로 성공
+    client, state = stub(fail_every=2, fail_status=status, retry_after='0.3')
+    limiter, stats = RateLimiter(), LLMStats()
+
+    assert generate_llm_md('[]', 'x = 1', client=client, limiter=limiter, stats=stats)
+    started = time.monotonic()
+    md = generate_llm_md('[{"check_id": "a"}]', 'x = 2', client=client, limiter=limiter, stats=stats)
+
+    assert 'Instructions' in md
+    assert state.snapshot()['rate_limited'] == 1
+    assert stats.as_dict()['retries'] == 1
+    assert stats.as_dict()['requests'] == 2
+    # 재시도는 Retry-After 동안 리미터 전체를 멈춘 뒤에야 나간다
+    assert time.monotonic() - started >= 0.3
+    assert limiter._paused_until > 0
+
+def test_gives_up_after_max_retries(stub, monkeypatch):
+    client, state = stub(fail_every=1, retry_after='0')
+    monkeypatch.setattr(llm_utils, 'LLM_MAX_RETRIES', 2)
+    stats = LLMStats()
+
+    with pytest.raises(anthropic.RateLimitError):
+        generate_llm_md('[]', 'x = 1', client=client, limiter=RateLimiter(), stats=stats)
+    assert state.snapshot()['rate_limited'] == 3
+    assert stats.as_dict()['retries'] == 2
+
+def test_limiter_reserves_output_cap_then_settles(stub):
+    client, _ = stub()
+    limiter = RateLimiter(tpm=1_000_000)
+    seen = []
+
+    class Recording:
+        def create(self, **kwargs):
+            # 요청이 나가는 동안에는 입력 추정치 + max_tokens가 잡혀 있어야 한다
+            seen.append((limiter._tokens, kwargs['max_tokens']))
+            return client.messages.create(**kwargs)
+
+    generate_llm_md('[]', 'x = 1', client=types.SimpleNamespace(messages=Recording()), limiter=limiter)
+
+    held, max_tokens = seen[0]
+    assert max_tokens == llm_utils.MAX_TOKENS
+    assert held > max_tokens
+    # 응답 후에는 실제 사용량(스텁이 돌려준 usage)으로 정산된다
+    assert 0 < limiter._tokens < max_tokens
+
+def test_failed_request_releases_reserved_tokens(stub, monkeypatch):
+    client, _ = stub(fail_every=1, retry_after=None)
+    monkeypatch.setattr(llm_utils, 'LLM_MAX_RETRIES', 0)
+    limiter = RateLimiter(tpm=1_000_000)
+
+    with pytest.raises(anthropic.RateLimitError):
+        llm_utils._create_with_backoff(client, limiter, None, 100, model=llm_utils.MODEL, max_tokens=50,
+                                       messages=[{'role': 'user', 'content': 'x'}])
+    # 요청 수는 남고 잡아 둔 토큰(100 + 50)은 돌려준다
+    assert limiter._requests == 1
+    assert limiter._tokens == 0
+
+def test_limiter_is_shared_by_the_process():
+    assert get_limiter() is get_limiter()
+    assert get_limiter().rpm == llm_utils.LLM_RPM and get_limiter().tpm == llm_utils.LLM_TPM
@@ -0,0 +1,105 @@
+# 작은 파일 여러 개를 한 요청으로 묶는 프로토콜(<<<FILE id>>> … <<<END id>>>)과 단건 재시도를 확인한다
+import json
+import os
+import sys
+import types
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import analyzer  # noqa: E402
+from llm_cache import LLMCache  # noqa: E402
+from llm_utils import split_pack_response, generate_llm_md_batch  # noqa: E402
+
+def section(section_id, body, end=None):
+    return f'<<<FILE {section_id}>>>\n{body}\n<<<END {end or section_id}>>>\n'
+
+class FakeClient:
+    """messages.create 스텁: reply(요청 본문) → 응답 텍스트"""
+
+    def __init__(self, reply):
+        self.reply, self.calls = reply, []
+        self.messages = self
+
+    def create(self, **kwargs):
+        content = kwargs['messages'][0]['content']
+        self.calls.append(content)
+        return types.SimpleNamespace(
+            content=[types.SimpleNamespace(text=self.reply(content))],
+            stop_reason='end_turn',
+            usage=types.SimpleNamespace(input_tokens=10, output_tokens=10),
+        )
+
+def test_split_keeps_complete_sections_only():
+    text = section('F0', 'zero') + section('F1', 'one', end='F9') + '<<<FILE F2>>>\ntruncated'
+    assert split_pack_response(text, ['F0', 'F1', 'F2']) == {'F0': 'zero'}
+
+def test_split_ignores_unknown_duplicate_and_empty_sections():
+    text = section('F7', 'stray') + section('F0', 'first') + section('F0', 'second') + section('F1', '  ')
+    assert split_pack_response(text, ['F0', 'F1']) == {'F0': 'first'}
+
+def test_split_allows_delimiters_inside_a_section():
+    # 다른 섹션의 구분선이 본문에 있어도(코드 블록, 줄 중간) 자기 END 줄에서만 끝난다
+    body = 'See `<<<END F0>>>` inline.\n```\n<<<FILE F1>>>\n<<<END F1>>>\n```\nInstructions'
+    text = section('F0', body) + section('F1', 'one')
+    assert split_pack_response(text, ['F0', 'F1']) == {'F0': body, 'F1': 'one'}
+
+def test_split_tolerates_trailing_spaces_and_surrounding_text():
+    text = 'Here you go:\n<<<FILE F0>>>  \nzero\n<<<END F0>>>\t\nThanks'
+    assert split_pack_response(text, ['F0']) == {'F0': 'zero'}
+
+@pytest.mark.parametrize('reply, cached', [
+    (lambda content: section('F0', 'zero') + section('F1', 'one'), True),
+    (lambda content: section('F0', 'zero'), False),
+])
+def test_batch_caches_only_fully_parsed_responses(tmp_path, reply, cached):
+    client = FakeClient(reply)
+    cache = LLMCache(tmp_path / 'cache.db', max_bytes=1 << 20, ttl_sec=3600)
+    entries = [('F0', 'a.py', '[]', 'a = 1'), ('F1', 'b.py', '[]', 'b = 2')]
+
+    first = generate_llm_md_batch(entries, client=client, cache=cache)
+    again = generate_llm_md_batch(entries, client=client, cache=cache)
+
+    assert first == again and first['F0'] == 'zero'
+    assert len(client.calls) == (1 if cached else 2)
+
+# ---- _generate_pieces: 묶음에서 빠진 파일은 단건 요청으로 ----
+
+def make_items(*names):
+    issues = [{'check_id': 'rule', 'start': {'line': 1}}]
+    return [(name, name, lambda name=name: (json.dumps(issues), f'{name} = 1')) for name in names]
+
+def single_or_pack(pack):
+    """묶음 요청이면 pack(본문), 단건 요청이면 파일 이름이 들어간 설명"""
+    def reply(content):
+        if '<<<FILE id>>>' in content:
+            return pack(content)
+        return 'single ' + content.split('```text\n', 1)[1].split(' = ', 1)[0]
+    return reply
+
+def generate(client, names):
+    meta, pieces = analyzer._generate_pieces(make_items(*names), concurrency=1, client=client, use_cache=False,
+                                             pack_tokens=10_000, dedup=False)
+    return meta, {p['name']: p['body'] for p in pieces}
+
+def test_missing_section_falls_back_to_single_request():
+    client = FakeClient(single_or_pack(lambda content: section('F0', 'packed a') + section('F2', 'packed c')))
+    meta, bodies = generate(client, ['a.py', 'b.py', 'c.py'])
+
+    assert bodies == {'a.py': 'packed a', 'b.py': 'single b.py', 'c.py': 'packed c'}
+    assert meta['packing']['packs'] == 1 and meta['packing']['fallback_files'] == 1
+    assert meta['success_count'] == 3 and meta['failure_count'] == 0
+    assert len(client.calls) == 2
+
+def test_failed_pack_request_retries_every_file():
+    def pack(content):
+        raise RuntimeError('pack request failed')
+
+    client = FakeClient(single_or_pack(pack))
+    meta, bodies = generate(client, ['a.py', 'b.py'])
+
+    assert bodies == {'a.py': 'single a.py', 'b.py': 'single b.py'}
+    assert meta['packing']['fallback_files'] == 2
+    assert meta['failed_items'] == []
@@ -1,5 +1,18 @@
-import zipfile
-def extract_zip(file_path, extracted_path):
-    with zipfile.ZipFile(file_path, 'r') as zip_file:
-        zip_file.extractall(extracted_path)
-    print(f'압축 해제 완료: {file_path} → {extracted_path}')
\ No newline at end of file
+import shared_path  # noqa: F401
+from common.unzip import extract  # 해제 구현과 제한(ZIP_MAX_*)은 A/B 공용
+
+def extract_zip(file_path, extracted_path, wanted=None):
+    """
+    wanted: 풀어야 할 상대 경로 집합(issues.json의 path). None이면 전부.
+    A는 ZIP이 상위 폴더 하나로 감싸져 있으면 그 안을 기준으로 경로를 만들므로,
+    여기서도 같은 경우 상위 폴더를 벗겨서 extracted_path/<path>에 기록한다.
+    반환: 해제 통계 (건너뛴 바이트 포함)
+    """
+    keep = None
+    if wanted is not None:
+        wanted = {str(p).replace('\\', '/').lstrip('/') for p in wanted}
+        keep = wanted.__contains__
+    _, stats = extract(file_path, extracted_path, keep=keep, strip_top=True)
+    print(f'압축 해제 완료: {file_path} → {extracted_path} '
+          f'({stats["extracted"]}개, 건너뜀 {stats["skipped"]}개 {stats["skipped_bytes"]} bytes)')
+    return stats
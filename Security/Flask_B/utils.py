@@ -1,8 +1,9 @@
 from pathlib import Path
 
-def make_dirs(base_dir):
+def make_dirs(base_dir, scratch_dir=None):
+    """scratch_dir: 해제된 트리만 다른 곳(tmpfs 등)에 둘 때"""
     received = Path(base_dir) / 'received'
-    extracted = Path(base_dir) / 'workspace' / 'extracted'
+    extracted = Path(scratch_dir) if scratch_dir else Path(base_dir) / 'workspace' / 'extracted'
     files_dir = Path(base_dir) / 'workspace' / 'files'
     markdowns_dir = Path(base_dir) / 'workspace' / 'markdowns'
     output_dir = Path(base_dir) / 'workspace' / 'output'
@@ -0,0 +1,124 @@
+"""
+결정적인 가짜 semgrep. bench/bin/semgrep이 이 스크립트를 실행한다.
+A(detector)가 쓰는 인자만 이해한다: --version, --config, --json, --jobs, --metrics,
+--include, --exclude, --max-target-bytes 그리고 파일/디렉토리 대상.
+gen_repo.SINKS의 정규식으로 취약 줄을 찾아 semgrep --json과 같은 모양으로 출력한다.
+
+지연 주입 (실제 semgrep 비용 흉내):
+  FAKE_SEMGREP_STARTUP_MS  프로세스당 고정 비용 (기본 300)
+  FAKE_SEMGREP_MS_PER_KB   스캔한 KB당 비용 (기본 0.5)
+"""
+import os
+import re
+import sys
+import json
+import time
+import fnmatch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from gen_repo import SINKS, LANGUAGES
+
+VERSION = "1.130.0"
+STARTUP_MS = float(os.environ.get("FAKE_SEMGREP_STARTUP_MS", "300"))
+MS_PER_KB = float(os.environ.get("FAKE_SEMGREP_MS_PER_KB", "0.5"))
+
+VALUE_FLAGS = {"--config", "--jobs", "--metrics", "--include", "--exclude", "--max-target-bytes", "--timeout"}
+
+# 확장자 → 그 언어의 룰
+RULES = {}
+for check_id, lang, _, pattern, severity, confidence, message in SINKS:
+    RULES.setdefault(LANGUAGES[lang][0], []).append((check_id, re.compile(pattern), severity, confidence, message))
+
+def parse_args(argv):
+    opts = {"--include": [], "--exclude": []}
+    targets = []
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg in VALUE_FLAGS:
+            value = argv[i + 1] if i + 1 < len(argv) else ""
+            if arg in ("--include", "--exclude"):
+                opts[arg].append(value)
+            else:
+                opts[arg] = value
+            i += 2
+            continue
+        if arg.startswith("--"):
+            opts[arg] = True
+        else:
+            targets.append(arg)
+        i += 1
+    return opts, targets
+
+def _matches(name, patterns):
+    return any(fnmatch.fnmatch(name, p) for p in patterns)
+
+def expand_targets(targets, includes, excludes, max_bytes):
+    """디렉토리 대상은 --include/--exclude/--max-target-bytes를 적용해 파일로 펼친다"""
+    files = []
+    for target in targets:
+        if os.path.isfile(target):
+            files.append(target)
+            continue
+        for root, dirs, names in os.walk(target):
+            dirs[:] = sorted(d for d in dirs if not _matches(d, excludes))
+            for name in sorted(names):
+                if includes and not _matches(name, includes):
+                    continue
+                if _matches(name, excludes):
+                    continue
+                path = os.path.join(root, name)
+                if max_bytes and os.path.getsize(path) > max_bytes:
+                    continue
+                files.append(path)
+    return files
+
+def scan_file(path):
+    rules = RULES.get(os.path.splitext(path)[1].lower(), [])
+    results = []
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    if not rules:
+        return results, len(text)
+    offset = 0
+    for line_no, line in enumerate(text.splitlines(keepends=True), 1):
+        for check_id, regex, severity, confidence, message in rules:
+            m = regex.search(line)
+            if not m:
+                continue
+            results.append({
+                "check_id": check_id,
+                "path": path,
+                "start": {"line": line_no, "col": m.start() + 1, "offset": offset + m.start()},
+                "end": {"line": line_no, "col": m.end() + 1, "offset": offset + m.end()},
+                "extra": {
+                    "message": message,
+                    "severity": severity,
+                    "metadata": {"confidence": confidence, "category": "security", "source": "bench"},
+                    "lines": line.rstrip("\n"),
+                },
+            })
+        offset += len(line)
+    return results, len(text)
+
+def main(argv):
+    if "--version" in argv:
+        print(VERSION)
+        return 0
+    opts, targets = parse_args(argv)
+    max_bytes = int(opts.get("--max-target-bytes") or 0)
+    files = expand_targets(targets, opts["--include"], opts["--exclude"], max_bytes)
+
+    results, scanned, total = [], [], 0
+    for path in files:
+        found, size = scan_file(path)
+        results.extend(found)
+        scanned.append(path)
+        total += size
+
+    time.sleep((STARTUP_MS + MS_PER_KB * total / 1024) / 1000)
+    json.dump({"version": VERSION, "results": results, "errors": [], "paths": {"scanned": scanned}}, sys.stdout)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,116 @@
+import os
+import sys
+import json
+import random
+import zipfile
+import argparse
+
+# 합성 저장소에 심는 취약 코드 한 줄 (fake_semgrep.py가 같은 정규식으로 찾아낸다)
+# (check_id, 언어, 코드 줄, 정규식, severity, confidence, 메시지)
+SINKS = [
+    ("bench.python.eval", "py", "result = eval(user_input)", r"\beval\(", "ERROR", "HIGH",
+     "eval() on user input allows code execution"),
+    ("bench.python.os-system", "py", "os.system('ls ' + path)", r"\bos\.system\(", "ERROR", "MEDIUM",
+     "os.system() with a concatenated command"),
+    ("bench.python.md5", "py", "digest = hashlib.md5(data).hexdigest()", r"hashlib\.md5\(", "WARNING", "HIGH",
+     "MD5 is not collision resistant"),
+    ("bench.js.innerhtml", "js", "el.innerHTML = req.query.name;", r"\.innerHTML\s*=", "WARNING", "MEDIUM",
+     "Assigning user input to innerHTML enables XSS"),
+    ("bench.js.eval", "js", "const out = eval(body.expr);", r"\beval\(", "ERROR", "HIGH",
+     "eval() on request data allows code execution"),
+    ("bench.java.exec", "java", "Runtime.getRuntime().exec(cmd);", r"Runtime\.getRuntime\(\)\.exec\(", "ERROR",
+     "MEDIUM", "Command built from input is executed"),
+    ("bench.java.sql", "java", 'stmt.executeQuery("SELECT * FROM t WHERE id=" + id);', r"executeQuery\(\".*\"\s*\+",
+     "ERROR", "HIGH", "SQL query built by string concatenation"),
+    ("bench.go.tls", "go", "cfg := &tls.Config{InsecureSkipVerify: true}", r"InsecureSkipVerify:\s*true", "WARNING",
+     "LOW", "TLS certificate verification is disabled"),
+]
+
+# 언어별 확장자와 평범한 코드 줄 (취약점 없음)
+LANGUAGES = {
+    "py": (".py", ["import os", "import hashlib", "", "def handler(user_input, path, data):",
+                   "    value = len(path) + 1", "    items = [x for x in range(value)]", "    return items"]),
+    "js": (".js", ["'use strict';", "function handler(req, el, body) {", "  const n = req.query.n || 0;",
+                   "  for (let i = 0; i < n; i++) { console.log(i); }", "  return n;", "}"]),
+    "java": (".java", ["class Handler {", "  int run(String cmd, String id) {", "    int n = cmd.length();",
+                       "    return n + id.length();", "  }", "}"]),
+    "go": (".go", ["package main", "", "import \"crypto/tls\"", "func handler() int {", "  x := 1",
+                   "  return x", "}"]),
+}
+
+def parse_mix(text):
+    """"py:50,js:30,java:20" → {"py": 0.5, "js": 0.3, "java": 0.2}"""
+    weights = {}
+    for part in text.split(","):
+        lang, _, weight = part.partition(":")
+        lang = lang.strip()
+        if lang not in LANGUAGES:
+            raise ValueError(f"unknown language: {lang} (choose from {', '.join(LANGUAGES)})")
+        weights[lang] = float(weight or 1)
+    total = sum(weights.values())
+    return {lang: w / total for lang, w in weights.items()}
+
+def _file_text(rng, lang, lines, density):
+    filler = LANGUAGES[lang][1]
+    sinks = [s for s in SINKS if s[1] == lang]
+    out, findings = [], 0
+    for i in range(lines):
+        if sinks and rng.random() < density:
+            out.append(rng.choice(sinks)[2])
+            findings += 1
+        else:
+            out.append(filler[i % len(filler)])
+    return "\n".join(out) + "\n", findings
+
+def generate_repo(dest_zip, files=200, mix="py:50,js:30,java:20", lines=120, density=0.02, dup_ratio=0.1,
+                  vendor_files=20, seed=0, root="bench-repo"):
+    """
+    합성 프로젝트 ZIP 생성. 같은 인자와 seed면 항상 같은 내용.
+    dup_ratio: 다른 파일을 그대로 복사한 파일 비율 (결과 캐시/중복 설명 병합 경로를 태운다)
+    vendor_files: node_modules/ 아래 파일 수 (탐색 단계에서 잘려야 하는 트리)
+    """
+    rng = random.Random(seed)
+    weights = parse_mix(mix)
+    langs, probs = list(weights), list(weights.values())
+    stats = {"files": 0, "bytes": 0, "findings": 0, "duplicates": 0, "languages": {}}
+    originals = []
+
+    with zipfile.ZipFile(dest_zip, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i in range(files):
+            if originals and rng.random() < dup_ratio:
+                lang, text, findings = rng.choice(originals)
+                stats["duplicates"] += 1
+            else:
+                lang = rng.choices(langs, probs)[0]
+                text, findings = _file_text(rng, lang, lines, density)
+                originals.append((lang, text, findings))
+            ext = LANGUAGES[lang][0]
+            name = f"{root}/src/pkg{i % 10}/mod_{i:05d}{ext}"
+            zf.writestr(name, text)
+            stats["files"] += 1
+            stats["bytes"] += len(text.encode("utf-8"))
+            stats["findings"] += findings
+            stats["languages"][lang] = stats["languages"].get(lang, 0) + 1
+        for i in range(vendor_files):
+            zf.writestr(f"{root}/node_modules/dep{i}/index.js", "module.exports = eval(x);\n" * 20)
+    stats["zip_bytes"] = os.path.getsize(dest_zip)
+    return stats
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="합성 벤치마크 저장소 ZIP 생성")
+    ap.add_argument("dest", help="출력 ZIP 경로")
+    ap.add_argument("--files", type=int, default=200)
+    ap.add_argument("--mix", default="py:50,js:30,java:20", help="언어 비율, 예: py:50,js:30,java:20,go:10")
+    ap.add_argument("--lines", type=int, default=120, help="파일당 줄 수")
+    ap.add_argument("--density", type=float, default=0.02, help="줄마다 취약 코드가 들어갈 확률")
+    ap.add_argument("--dup-ratio", type=float, default=0.1)
+    ap.add_argument("--vendor-files", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+    stats = generate_repo(args.dest, args.files, args.mix, args.lines, args.density, args.dup_ratio,
+                          args.vendor_files, args.seed)
+    json.dump(stats, sys.stdout, indent=2)
+    print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+지연을 주입하는 로컬 Anthropic Messages API 스텁 (POST /v1/messages).
+B를 ANTHROPIC_BASE_URL=http://127.0.0.1:<port> 로 띄우면 실제 API 대신 여기로 요청한다.
+묶음 요청(<<<FILE id>>> 형식)은 파일별 섹션으로 답한다.
+"""
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_PACK_FILE = re.compile(r"^# File ([\w.-]+): (.+)$", re.M)
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+def _answer(content):
+    """입력에 따라 정해지는 Markdown (같은 프롬프트면 같은 답)"""
+    findings = content.count('"check_id"')
+    tag = hashlib.sha1(content.encode("utf-8")).hexdigest()[:8]
+    body = [
+        f"### Summary ({findings} finding(s), ref {tag})",
+        "The flagged code passes untrusted input to a sensitive operation.",
+        "",
+        "### Risk",
+        "An attacker controlling the input can change program behaviour.",
+        "",
+        "### Fix",
+        "```text",
+        "validate and encode the input, use a safe API",
+        "```",
+        "",
+        "## Instructions",
+        "1. Replace the vulnerable call.",
+        "2. Add a regression test.",
+    ]
+    return "\n".join(body)
+
+class StubState:
+    def __init__(self, latency_ms=800.0, ms_per_token=2.0, fail_every=0, output_tokens=None, fail_status=429,
+                 retry_after="1"):
+        self.latency_ms = latency_ms
+        self.ms_per_token = ms_per_token
+        self.fail_every = fail_every
+        self.fail_status = fail_status
+        self.retry_after = retry_after
+        self.output_tokens = output_tokens
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.rate_limited = 0
+        self.input_tokens = 0
+        self.output_tokens_total = 0
+        self.active = 0
+        self.peak_active = 0
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "rate_limited": self.rate_limited,
+                "input_tokens": self.input_tokens,
+                "output_tokens": self.output_tokens_total,
+                "peak_concurrency": self.peak_active,
+            }
+
+class StubHandler(BaseHTTPRequestHandler):
+    state = None  # serve()가 서버마다 설정
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        raw = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/v1/messages"):
+            self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        req = json.loads(self.rfile.read(length) or b"{}")
+        state = self.state
+
+        with state.lock:
+            state.requests += 1
+            n = state.requests
+            limited = bool(state.fail_every) and n % state.fail_every == 0
+            if limited:
+                state.rate_limited += 1
+        if limited:
+            kind = "rate_limit_error" if state.fail_status == 429 else "overloaded_error"
+            self._send_json(state.fail_status,
+                            {"type": "error", "error": {"type": kind, "message": f"stub {state.fail_status}"}},
+                            {"retry-after": state.retry_after} if state.retry_after is not None else None)
+            return
+
+        system = req.get("system") or ""
+        if isinstance(system, list):
+            system = "".join(block.get("text", "") for block in system)
+        content = "".join(
+            m["content"] if isinstance(m["content"], str) else "".join(b.get("text", "") for b in m["content"])
+            for m in req.get("messages", [])
+        )
+
+        packed = _PACK_FILE.findall(content) if "<<<FILE" in system else []
+        if packed:
+            text = "\n\n".join(f"<<<FILE {fid}>>>\n{_answer(name + content)}\n<<<END {fid}>>>"
+                               for fid, name in packed)
+        else:
+            text = _answer(content)
+        out_tokens = state.output_tokens or estimate_tokens(text)
+        in_tokens = estimate_tokens(system) + estimate_tokens(content)
+
+        with state.lock:
+            state.active += 1
+            state.peak_active = max(state.peak_active, state.active)
+        try:
+            time.sleep((state.latency_ms + state.ms_per_token * out_tokens) / 1000)
+        finally:
+            with state.lock:
+                state.active -= 1
+                state.input_tokens += in_tokens
+                state.output_tokens_total += out_tokens
+
+        self._send_json(200, {
+            "id": f"msg_stub_{n}",
+            "type": "message",
+            "role": "assistant",
+            "model": req.get("model", "stub"),
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": in_tokens, "output_tokens": out_tokens},
+        })
+
+def serve(host="127.0.0.1", port=0, **options):
+    """백그라운드 스레드로 스텁 서버 시작 → (server, state). server.server_address[1]이 실제 포트"""
+    state = StubState(**options)
+    handler = type("BoundStubHandler", (StubHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="llm-stub", daemon=True).start()
+    return server, state
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="지연 주입 Anthropic Messages API 스텁")
+    ap.add_argument("--port", type=int, default=8787)
+    ap.add_argument("--latency-ms", type=float, default=800.0, help="요청당 고정 지연")
+    ap.add_argument("--ms-per-token", type=float, default=2.0, help="출력 토큰당 지연")
+    ap.add_argument("--fail-every", type=int, default=0, help="N번째 요청마다 실패 (0 = 없음)")
+    ap.add_argument("--fail-status", type=int, default=429, choices=(429, 529), help="실패 응답 상태 코드")
+    args = ap.parse_args(argv)
+    server, state = serve(port=args.port, latency_ms=args.latency_ms, ms_per_token=args.ms_per_token,
+                          fail_every=args.fail_every, fail_status=args.fail_status)
+    print(f"[LLM 스텁] http://127.0.0.1:{server.server_address[1]} (ANTHROPIC_BASE_URL)")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"[LLM 스텁] {state.snapshot()}")
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
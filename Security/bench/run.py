@@ -0,0 +1,402 @@
+"""
+엔드투엔드 벤치마크 러너.
+합성 저장소 ZIP을 만들고, 가짜 semgrep(bin/)과 LLM 스텁을 붙여 A/B를 실제 서버 프로세스로 띄운 뒤
+/analyze(전체 체인), /analyze NDJSON(첫 발견까지 시간), /deep-analyze(B 단독)를 돌려
+단계별 시간, 처리량, 최대 RSS, 디스크 기록량을 JSON으로 출력한다 (커밋 간 비교용).
+
+예) python bench/run.py --files 300 --runs 3 --out bench-results.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import platform
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SECURITY_DIR = os.path.dirname(BENCH_DIR)
+FLASK_A_DIR = os.path.join(SECURITY_DIR, "Flask_A")
+FLASK_B_DIR = os.path.join(SECURITY_DIR, "Flask_B")
+sys.path.insert(0, BENCH_DIR)
+
+from gen_repo import generate_repo
+from llm_stub import serve as serve_llm_stub
+
+JOB_PREFIX = "bench-"
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _tree_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+# ---- /proc 기반 프로세스 측정 (Linux). 없으면 None ----
+
+def _children(pid):
+    kids = []
+    try:
+        for tid in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tid}/children") as f:
+                kids.extend(int(c) for c in f.read().split())
+    except OSError:
+        pass
+    return kids
+
+def _process_tree(pid):
+    tree, stack = [], [pid]
+    while stack:
+        p = stack.pop()
+        tree.append(p)
+        stack.extend(_children(p))
+    return tree
+
+def _status_kb(pid, field):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def _write_bytes(pid):
+    try:
+        with open(f"/proc/{pid}/io") as f:
+            for line in f:
+                if line.startswith("write_bytes:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def process_sample(pid):
+    """프로세스 트리(서버 + 렌더링 풀 등 살아 있는 자식)의 최대 RSS / 현재 RSS / 기록 바이트"""
+    tree = _process_tree(pid)
+    hwm = [_status_kb(p, "VmHWM") for p in tree]
+    rss = [_status_kb(p, "VmRSS") for p in tree]
+    written = [_write_bytes(p) for p in tree]
+    return {
+        "peak_rss_kb": _status_kb(pid, "VmHWM"),
+        "tree_peak_rss_kb": sum(v for v in hwm if v) or None,
+        "tree_rss_kb": sum(v for v in rss if v) or None,
+        "processes": len(tree),
+        "write_bytes": sum(v for v in written if v is not None) if any(v is not None for v in written) else None,
+    }
+
+# ---- 서비스 프로세스 ----
+
+class Service:
+    def __init__(self, name, cwd, port, env):
+        self.name, self.cwd, self.port = name, cwd, port
+        self.url = f"http://127.0.0.1:{port}"
+        code = f"import app; app.app.run(host='127.0.0.1', port={port}, threaded=True, use_reloader=False)"
+        self.log = open(os.path.join(env["BENCH_WORKDIR"], f"{name}.log"), "wb")
+        self.proc = subprocess.Popen([sys.executable, "-c", code], cwd=cwd, env=env,
+                                     stdout=self.log, stderr=subprocess.STDOUT)
+
+    def wait_ready(self, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"{self.name} exited early (see {self.log.name})")
+            try:
+                if requests.get(self.url + "/health", timeout=2).ok:
+                    return
+            except requests.RequestException:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError(f"{self.name} did not become healthy in {timeout}s")
+
+    def stop(self):
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+        self.log.close()
+
+def service_env(workdir, stub_url, b_url, extra):
+    env = dict(os.environ)
+    env.update({
+        "BENCH_WORKDIR": workdir,
+        "PATH": os.path.join(BENCH_DIR, "bin") + os.pathsep + env.get("PATH", ""),
+        "PYTHON": sys.executable,
+        "ANTHROPIC_API_KEY": "bench",
+        "ANTHROPIC_BASE_URL": stub_url,
+        "FLASK_B_BASE_URL": b_url,
+        # 캐시는 벤치마크 작업 디렉토리에 격리 (서비스의 실제 캐시를 건드리지 않음)
+        "SEMGREP_CACHE_PATH": os.path.join(workdir, "cache", "findings.sqlite"),
+        "SEMGREP_RULES_DIR": os.path.join(workdir, "cache", "rules"),
+        "LLM_CACHE_PATH": os.path.join(workdir, "cache", "llm.sqlite"),
+        "PDF_SECTION_CACHE_DIR": os.path.join(workdir, "cache", "pdf_sections"),
+        "JANITOR_INTERVAL_SECONDS": "0",
+    })
+    env.update(extra)
+    return env
+
+def start_services(workdir, stub_url, extra_env, backends=1):
+    """→ (a, b, *나머지 B). backends > 1이면 B를 여러 개 띄우고 A에 FLASK_B_BASE_URLS로 모두 넘긴다"""
+    port_a, ports_b = _free_port(), [_free_port() for _ in range(max(1, backends))]
+    urls = [f"http://127.0.0.1:{port}" for port in ports_b]
+    env = service_env(workdir, stub_url, urls[0], extra_env)
+    if "FLASK_B_BASE_URLS" not in extra_env:
+        env["FLASK_B_BASE_URLS"] = ",".join(urls)
+    bs = [Service("flask_b" + (str(i) if i else ""), FLASK_B_DIR, port, env) for i, port in enumerate(ports_b)]
+    a = Service("flask_a", FLASK_A_DIR, port_a, env)
+    for b in bs:
+        b.wait_ready()
+    a.wait_ready()
+    return (a, *bs)
+
+# ---- 시나리오 ----
+
+def _job_dirs(job_id):
+    return [
+        os.path.join(FLASK_A_DIR, "uploads", job_id),
+        os.path.join(FLASK_A_DIR, "outputs", job_id),
+        os.path.join(FLASK_B_DIR, "received", job_id),
+        *(os.path.join(FLASK_B_DIR, "workspace", area, job_id)
+          for area in ("extracted", "files", "markdowns", "output")),
+    ]
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def run_pipeline(a, zip_path, job_id):
+    """A /analyze (JSON) → A 스캔 + B LLM/PDF 전체 체인"""
+    started = time.monotonic()
+    with open(zip_path, "rb") as f:
+        resp = requests.post(a.url + "/analyze", files={"file": ("repo.zip", f, "application/zip")},
+                             data={"job_id": job_id}, headers={"Accept": "application/json"}, timeout=3600)
+    wall = time.monotonic() - started
+    resp.raise_for_status()
+    body = resp.json()
+    scan = _read_json(os.path.join(FLASK_A_DIR, "outputs", job_id, "semgrep_stats.json")) or {}
+    discovery = scan.get("discovery") or {}
+    return {
+        "wall_time": round(wall, 3),
+        "scan_time": scan.get("wall_time"),
+        "files": discovery.get("files"),
+        "source_bytes": discovery.get("bytes"),
+        "semgrep_invocations": len(scan.get("batches") or []),
+        "findings_cache": scan.get("cache"),
+        "b": {k: body.get(k) for k in ("processed_total", "success_count", "llm_cache", "packing", "dedup", "pdf")},
+    }
+
+def run_stream(a, zip_path, job_id):
+    """A /analyze NDJSON → 첫 발견까지 시간(B 없이)"""
+    started = time.monotonic()
+    first = None
+    findings = 0
+    with open(zip_path, "rb") as f:
+        with requests.post(a.url + "/analyze", files={"file": ("repo.zip", f, "application/zip")},
+                           data={"job_id": job_id}, headers={"Accept": "application/x-ndjson"},
+                           stream=True, timeout=3600) as resp:
+            resp.raise_for_status()
+            for line in resp.iter_lines():
+                if not line:
+                    continue
+                record = json.loads(line)
+                if record.get("type") == "summary":
+                    continue
+                findings += 1
+                if first is None:
+                    first = time.monotonic() - started
+    return {
+        "wall_time": round(time.monotonic() - started, 3),
+        "time_to_first_finding": round(first, 3) if first is not None else None,
+        "findings": findings,
+    }
+
+def run_deep(b, zip_path, issues_path, job_id):
+    """B /deep-analyze 단독 (A가 만든 issues.json 재사용)"""
+    started = time.monotonic()
+    with open(zip_path, "rb") as zf, open(issues_path, "rb") as jf:
+        resp = requests.post(b.url + "/deep-analyze",
+                             files={"source_zip": ("source.zip", zf), "json_file": ("issues.json", jf)},
+                             data={"job_id": job_id}, headers={"Accept": "application/json"}, timeout=3600)
+    wall = time.monotonic() - started
+    resp.raise_for_status()
+    body = resp.json()
+    return {
+        "wall_time": round(wall, 3),
+        "files": body.get("processed_total"),
+        "pdf": body.get("pdf"),
+    }
+
+def _delta(before, after):
+    if before is None or after is None:
+        return None
+    return after - before
+
+def run_once(index, a, b, stub, zip_path, repo_stats, scenarios):
+    tag = f"{JOB_PREFIX}{os.getpid()}-{index}"
+    result = {"run": index}
+    before = {"a": process_sample(a.proc.pid), "b": process_sample(b.proc.pid), "llm": stub.snapshot()}
+
+    pipe_job = f"{tag}-pipe"
+    if "pipeline" in scenarios or "deep" in scenarios:
+        result["pipeline"] = run_pipeline(a, zip_path, pipe_job)
+        scan_time = result["pipeline"]["scan_time"]
+        if scan_time:
+            result["pipeline"]["scan_files_per_s"] = round(repo_stats["files"] / scan_time, 1)
+            result["pipeline"]["scan_mb_per_s"] = round(repo_stats["bytes"] / scan_time / 1e6, 2)
+    if "stream" in scenarios:
+        result["stream"] = run_stream(a, zip_path, f"{tag}-stream")
+    if "deep" in scenarios:
+        issues = os.path.join(FLASK_A_DIR, "outputs", pipe_job, "issues.json")
+        result["deep"] = run_deep(b, zip_path, issues, f"{tag}-deep")
+        if result["deep"]["files"]:
+            result["deep"]["files_per_s"] = round(result["deep"]["files"] / result["deep"]["wall_time"], 2)
+
+    after = {"a": process_sample(a.proc.pid), "b": process_sample(b.proc.pid), "llm": stub.snapshot()}
+    llm = {k: _delta(before["llm"][k], after["llm"][k]) for k in ("requests", "rate_limited",
+                                                                    "input_tokens", "output_tokens")}
+    llm["peak_concurrency"] = after["llm"]["peak_concurrency"]
+    result["llm"] = llm
+    result["processes"] = {
+        name: dict(after[name], write_bytes=_delta(before[name]["write_bytes"], after[name]["write_bytes"]))
+        for name in ("a", "b")
+    }
+    # 이번 실행이 만든 작업 디렉토리 크기 (정리 전)
+    result["job_dir_bytes"] = sum(_tree_size(p) for suffix in ("-pipe", "-stream", "-deep")
+                                  for p in _job_dirs(tag + suffix) if os.path.isdir(p))
+    return result, tag
+
+def summarize(runs):
+    """단계별 지표의 min/median/max (None 제외)"""
+    metrics = {
+        "pipeline.wall_time": ("pipeline", "wall_time"),
+        "pipeline.scan_time": ("pipeline", "scan_time"),
+        "stream.time_to_first_finding": ("stream", "time_to_first_finding"),
+        "stream.wall_time": ("stream", "wall_time"),
+        "deep.wall_time": ("deep", "wall_time"),
+    }
+    summary = {}
+    for name, (section, key) in metrics.items():
+        values = [r[section][key] for r in runs if section in r and r[section].get(key) is not None]
+        if values:
+            summary[name] = {"min": min(values), "median": statistics.median(values), "max": max(values)}
+    return summary
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=SECURITY_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="A/B 엔드투엔드 벤치마크")
+    ap.add_argument("--files", type=int, default=200)
+    ap.add_argument("--mix", default="py:50,js:30,java:20")
+    ap.add_argument("--lines", type=int, default=120)
+    ap.add_argument("--density", type=float, default=0.02)
+    ap.add_argument("--dup-ratio", type=float, default=0.1)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--cold", action="store_true", help="실행마다 캐시를 비우고 서비스를 다시 띄운다")
+    ap.add_argument("--scenarios", default="pipeline,stream,deep")
+    ap.add_argument("--llm-latency-ms", type=float, default=800.0)
+    ap.add_argument("--llm-ms-per-token", type=float, default=2.0)
+    ap.add_argument("--llm-fail-every", type=int, default=0)
+    ap.add_argument("--semgrep-startup-ms", type=float, default=300.0)
+    ap.add_argument("--semgrep-ms-per-kb", type=float, default=0.5)
+    ap.add_argument("--backends", type=int, default=1, help="띄울 B 프로세스 수 (A는 FLASK_B_BASE_URLS로 분산)")
+    ap.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                    help="두 서비스에 넘길 추가 환경변수 (예: SEMGREP_WORKERS=4)")
+    ap.add_argument("--keep", action="store_true", help="작업 디렉토리/로그를 지우지 않는다")
+    ap.add_argument("--out", help="결과 JSON 파일 (기본: 표준 출력)")
+    args = ap.parse_args(argv)
+
+    scenarios = {s.strip() for s in args.scenarios.split(",") if s.strip()}
+    extra_env = dict(item.split("=", 1) for item in args.env)
+    extra_env.update({
+        "FAKE_SEMGREP_STARTUP_MS": str(args.semgrep_startup_ms),
+        "FAKE_SEMGREP_MS_PER_KB": str(args.semgrep_ms_per_kb),
+    })
+
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    zip_path = os.path.join(workdir, "repo.zip")
+    repo_stats = generate_repo(zip_path, args.files, args.mix, args.lines, args.density, args.dup_ratio,
+                               seed=args.seed)
+    print(f"[벤치] 저장소 {repo_stats['files']}개 파일, {repo_stats['bytes']} bytes, "
+          f"발견 {repo_stats['findings']}개 → {workdir}", file=sys.stderr)
+
+    stub, stub_state = serve_llm_stub(latency_ms=args.llm_latency_ms, ms_per_token=args.llm_ms_per_token,
+                                      fail_every=args.llm_fail_every)
+    stub_url = f"http://127.0.0.1:{stub.server_address[1]}"
+
+    runs, tags, services = [], [], None
+    try:
+        for i in range(args.runs):
+            if services is None or args.cold:
+                if services is not None:
+                    for s in services:
+                        s.stop()
+                    shutil.rmtree(os.path.join(workdir, "cache"), ignore_errors=True)
+                services = start_services(workdir, stub_url, extra_env, args.backends)
+            a, b = services[0], services[1]
+            result, tag = run_once(i, a, b, stub_state, zip_path, repo_stats, scenarios)
+            result["cold"] = args.cold or i == 0
+            runs.append(result)
+            tags.append(tag)
+            print(f"[벤치] run {i}: " + ", ".join(
+                f"{name}={result[name]['wall_time']}s" for name in ("pipeline", "stream", "deep") if name in result
+            ), file=sys.stderr)
+    finally:
+        if services is not None:
+            for s in services:
+                s.stop()
+        stub.shutdown()
+        if not args.keep:
+            for tag in tags:
+                for suffix in ("-pipe", "-stream", "-deep"):
+                    for p in _job_dirs(tag + suffix):
+                        shutil.rmtree(p, ignore_errors=True)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": vars(args),
+        },
+        "repo": repo_stats,
+        "runs": runs,
+        "summary": summarize(runs),
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
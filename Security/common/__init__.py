@@ -0,0 +1,3 @@
+# A/B 공용 모듈: ZIP 해제(unzip), 작업 디렉토리 정리(janitor), 메트릭(metrics), 단계별 입장 제한(admission),
+# issues.json 읽기(issues). 서비스마다 다른 설정(메트릭 접두사, 보존 시간, 단계 목록, 풀 파일)은
+# 각 서비스의 같은 이름 모듈이 넘긴다. 서비스는 shared_path로 Security/를 sys.path에 넣고 import한다
@@ -0,0 +1,140 @@
+# admission.py
+# 단계별 동시 실행/대기열 제한. 어떤 단계를 얼마로 둘지는 각 서비스의 admission.py가 stage_limit()으로 정한다
+import os
+import math
+import time
+import threading
+from contextlib import contextmanager
+
+from .metrics import REGISTRY, span
+
+# 대기열에서 자리를 기다리는 최대 시간(초). 넘으면 503 + Retry-After
+ADMIT_WAIT_SECONDS = float(os.environ.get("ADMIT_WAIT_SECONDS", "30"))
+
+ADMISSION_ACTIVE = REGISTRY.gauge("admission_active", "Jobs holding a slot in each stage", ("stage",))
+ADMISSION_WAITING = REGISTRY.gauge("admission_waiting", "Jobs waiting for a slot in each stage", ("stage",))
+ADMISSION_WAIT = REGISTRY.histogram("admission_wait_seconds", "Time spent waiting for a stage slot", ("stage",))
+ADMISSION_REJECTED = REGISTRY.counter("admission_rejected_total", "Jobs turned away by stage and reason",
+                                      ("stage", "reason"))
+
+class Saturated(Exception):
+    """단계가 가득 참. status(429: 대기열 가득, 503: 대기 시간 초과)와 Retry-After(초)로 응답한다"""
+
+    def __init__(self, stage: str, status: int, retry_after: int):
+        super().__init__(f"{stage} is saturated, retry in {retry_after}s")
+        self.stage = stage
+        self.status = status
+        self.retry_after = retry_after
+
+class Ticket:
+    """StageLimit.acquire()가 돌려주는 자리. release()는 여러 번 불러도 한 번만 반납한다"""
+
+    def __init__(self, limit):
+        self._limit = limit
+        self._acquired = time.monotonic()
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        if self._limit is not None:
+            self._limit._release(time.monotonic() - self._acquired)
+
+class StageLimit:
+    """
+    단계별 동시 실행 수(limit) + 기다릴 수 있는 작업 수(queue) 제한. limit이 0이면 제한 없음.
+    Retry-After는 최근 점유 시간(EWMA)과 대기열 길이로 추정한다
+    """
+
+    def __init__(self, stage: str, limit: int, queue: int, wait: float = ADMIT_WAIT_SECONDS):
+        self.stage = stage
+        self.limit = max(0, limit)
+        self.queue = max(0, queue)
+        self.wait = wait
+        self.active = 0
+        self.waiting = 0
+        self._avg_hold = None
+        self._cond = threading.Condition()
+
+    def _publish(self):
+        ADMISSION_ACTIVE.set(self.active, stage=self.stage)
+        ADMISSION_WAITING.set(self.waiting, stage=self.stage)
+
+    def retry_after(self) -> int:
+        """대기열 뒤에 선 작업이 자리를 얻기까지 걸릴 예상 시간(초, 최소 1)"""
+        hold = self._avg_hold if self._avg_hold is not None else 1.0
+        return max(1, math.ceil(hold * (self.waiting + 1) / max(1, self.limit)))
+
+    def _reject(self, reason, status):
+        ADMISSION_REJECTED.inc(stage=self.stage, reason=reason)
+        return Saturated(self.stage, status, self.retry_after())
+
+    def check(self):
+        """자리도 대기열 여유도 없으면 바로 Saturated(429). 업로드를 저장하기 전에 빨리 거절할 때 쓴다"""
+        with self._cond:
+            if self.limit and self.active >= self.limit and self.waiting >= self.queue:
+                raise self._reject("queue_full", 429)
+
+    def acquire(self, block: bool = False) -> Ticket:
+        """
+        block=False: 대기열이 차 있으면 바로 Saturated(429), wait초 안에 자리가 나지 않으면 Saturated(503).
+        block=True: 백그라운드 작업자용. 대기열 한도 없이 자리가 날 때까지 기다린다
+        """
+        if not self.limit:
+            return Ticket(None)
+        # 기다린 시간도 작업 Timeline에 wait_<단계>로 남긴다
+        with span(f"wait_{self.stage}"):
+            return self._acquire(block)
+
+    def _acquire(self, block):
+        started = time.monotonic()
+        with self._cond:
+            if self.active >= self.limit:
+                if not block and self.waiting >= self.queue:
+                    raise self._reject("queue_full", 429)
+                deadline = None if block else started + self.wait
+                self.waiting += 1
+                self._publish()
+                try:
+                    while self.active >= self.limit:
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            raise self._reject("timeout", 503)
+                        self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+            self._publish()
+        ADMISSION_WAIT.observe(time.monotonic() - started, stage=self.stage)
+        return Ticket(self)
+
+    def _release(self, held):
+        with self._cond:
+            self.active -= 1
+            self._avg_hold = held if self._avg_hold is None else 0.8 * self._avg_hold + 0.2 * held
+            self._publish()
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self, block: bool = False):
+        ticket = self.acquire(block)
+        try:
+            yield
+        finally:
+            ticket.release()
+
+    def snapshot(self):
+        with self._cond:
+            return {"limit": self.limit, "queue": self.queue, "active": self.active, "waiting": self.waiting}
+
+def stage_limit(stage: str, limit: int, queue: int) -> StageLimit:
+    """ADMIT_{STAGE}_CONCURRENCY / ADMIT_{STAGE}_QUEUE 환경변수로 덮어쓸 수 있는 단계 제한"""
+    name = stage.upper()
+    return StageLimit(
+        stage,
+        int(os.environ.get(f"ADMIT_{name}_CONCURRENCY", str(limit))),
+        int(os.environ.get(f"ADMIT_{name}_QUEUE", str(queue))),
+    )
@@ -0,0 +1,57 @@
+# issues.py
+# issues.json/NDJSON 읽기와 보고서용 metadata 줄이기. A(analysis/issue.py)와 B(issues.py)가 같은 규칙을 쓴다
+import json
+
+# Semgrep의 extra 중 보고서(B의 프롬프트/우선순위/중복 판정, SARIF)가 쓰는 것만 남긴다.
+# lines(= source_line과 중복), fingerprint, metavars, dataflow_trace, engine_kind 등은 버린다
+METADATA_KEYS = (
+    "confidence", "likelihood", "impact", "category", "subcategory", "vulnerability_class",
+    "cwe", "owasp", "references", "source",
+)
+
+# issues.json을 읽을 때 한 번에 읽는 크기 (문자 수)
+READ_CHUNK = 64 * 1024
+# JSON 배열/NDJSON에서 원소 사이에 올 수 있는 문자
+_SEPARATORS = frozenset(" \t\r\n,[]")
+
+def compact_metadata(metadata):
+    """extra.metadata에서 METADATA_KEYS만. 남는 게 없으면 None"""
+    if not isinstance(metadata, dict):
+        return None
+    kept = {k: metadata[k] for k in METADATA_KEYS if metadata.get(k) not in (None, "", [])}
+    return kept or None
+
+def iter_issue_dicts(f, chunk_size=READ_CHUNK):
+    """
+    텍스트 스트림에서 발견 dict를 하나씩. JSON 배열(issues.json)과 NDJSON(한 줄에 하나) 둘 다 받는다.
+    파일 전체가 아니라 청크 하나 + 읽고 있는 원소 하나만 메모리에 둔다. 깨진 JSON이면 ValueError
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+    depth = 0  # 열린 '[' 수. 원소 경계에서 잘린 배열도 깨진 파일로 본다
+    while True:
+        while pos < len(buf) and buf[pos] in _SEPARATORS:
+            depth += (buf[pos] == "[") - (buf[pos] == "]")
+            pos += 1
+        if pos == len(buf):
+            if eof:
+                if depth:
+                    raise json.JSONDecodeError("unterminated JSON array", buf, pos)
+                return
+            buf, pos = f.read(chunk_size), 0
+            eof = not buf
+            continue
+        start = pos
+        try:
+            obj, pos = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # 원소가 청크 경계에 걸림 → 더 읽어서 다시. 끝까지 읽었는데도 실패면 깨진 파일
+            if eof:
+                raise
+            more = f.read(chunk_size)
+            eof = not more
+            buf, pos = buf[pos:] + more, 0
+            continue
+        if not isinstance(obj, dict):
+            raise json.JSONDecodeError("issue must be a JSON object", buf, start)
+        yield obj
@@ -0,0 +1,227 @@
+# janitor.py
+# 작업 디렉토리 TTL/용량 정리. 어떤 영역을 얼마나 보존할지는 각 서비스가 area()로 넘긴다
+import os
+import time
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterable, List, Optional
+
+# 주기적 정리 간격(초). 0이면 백그라운드 정리를 끈다
+JANITOR_INTERVAL = float(os.environ.get("JANITOR_INTERVAL_SECONDS", "600"))
+# 작업 디렉토리 전체 용량 상한. 넘으면 마지막 사용이 오래된 완료 작업부터 지운다 (0 = 상한 없음)
+JANITOR_MAX_BYTES = int(float(os.environ.get("JANITOR_MAX_GB", "0")) * 1024 ** 3)
+
+HOUR = 3600
+
+def hours(name, default):
+    """시간 단위 환경변수 → 초 (영역별 보존 시간)"""
+    return float(os.environ.get(name, default)) * HOUR
+
+def tree_size(path):
+    """심볼릭 링크를 따라가지 않는 디렉토리(또는 파일) 총 바이트"""
+    try:
+        if not os.path.isdir(path) or os.path.islink(path):
+            return os.lstat(path).st_size
+    except OSError:
+        return 0
+    total, stack = 0, [path]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        else:
+                            total += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return total
+
+def last_used(path):
+    """디렉토리 자신과 바로 아래 항목의 최신 mtime (사용 시 touch()로 갱신)"""
+    try:
+        newest = os.lstat(path).st_mtime
+    except OSError:
+        return 0.0
+    if os.path.isdir(path):
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        newest = max(newest, entry.stat(follow_symlinks=False).st_mtime)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+    return newest
+
+def touch(path):
+    """LRU 정리 기준이 되는 마지막 사용 시각 갱신 (없으면 무시)"""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+def _remove(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def area(name, path, ttl, jobs=True, keep=None):
+    """
+    정리 대상 영역. jobs=True면 하위 디렉토리 이름이 job_id (용량 상한 초과 시 작업 단위로 지움),
+    False면 하위 항목마다 TTL만 적용. keep: 지우지 않을 이름 집합을 돌려주는 함수
+    """
+    return {"name": name, "path": path, "ttl": ttl, "jobs": jobs, "keep": keep}
+
+class Janitor:
+    """
+    영역별 TTL 정리 + 전체 용량 상한(LRU) 정리를 백그라운드 스레드로 수행.
+    진행 중인 작업/요청(pin 또는 pinned() 콜백이 돌려준 job_id)은 지우지 않는다.
+    """
+
+    def __init__(self, areas: List[dict], pinned: Optional[Callable[[], Iterable[str]]] = None,
+                 max_bytes: int = JANITOR_MAX_BYTES, interval: float = JANITOR_INTERVAL):
+        self.areas = areas
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self._pinned_fn = pinned
+        self._pins = {}
+        self._lock = threading.Lock()
+        self._sweep_lock = threading.Lock()
+        self._started = False
+        self.last = None
+
+    @contextmanager
+    def pinned(self, job_id: str):
+        """with 블록 동안 job_id의 디렉토리를 정리 대상에서 제외 (중첩 가능)"""
+        with self._lock:
+            self._pins[job_id] = self._pins.get(job_id, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._pins[job_id] -= 1
+                if not self._pins[job_id]:
+                    del self._pins[job_id]
+
+    def _pinned_ids(self):
+        with self._lock:
+            ids = set(self._pins)
+        if self._pinned_fn is not None:
+            try:
+                ids.update(self._pinned_fn())
+            except Exception as e:
+                # 진행 중 작업을 알 수 없으면 이번 정리는 건너뛴다 (잘못 지우는 것보다 낫다)
+                print(f"[정리] 진행 중 작업 조회 실패 → 건너뜀 ({e})")
+                return None
+        return ids
+
+    def sweep(self):
+        """한 번 정리하고 통계 반환 (영역별 사용량, 지운 항목 수/바이트)"""
+        with self._sweep_lock:
+            started = time.time()
+            pinned = self._pinned_ids()
+            if pinned is None:
+                return self.last
+            usage = {}
+            jobs = {}  # job_id → {"parts": [(영역, 경로, 바이트)], "bytes", "last_used"}
+            removed = {"ttl": 0, "quota": 0, "bytes": 0}
+
+            for a in self.areas:
+                stat = usage.setdefault(a["name"], {"path": a["path"], "bytes": 0, "entries": 0})
+                keep = a["keep"]() if a["keep"] else ()
+                try:
+                    with os.scandir(a["path"]) as it:
+                        entries = [e for e in it if e.name not in keep]
+                except OSError:
+                    continue
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if a["jobs"] and not is_dir:
+                        continue  # A의 jobs.sqlite 등 작업 디렉토리가 아닌 파일
+                    if a["jobs"] and entry.name in pinned:
+                        stat["bytes"] += tree_size(entry.path)
+                        stat["entries"] += 1
+                        continue
+                    used, size = last_used(entry.path), tree_size(entry.path)
+                    if a["ttl"] and started - used > a["ttl"]:
+                        _remove(entry.path)
+                        removed["ttl"] += 1
+                        removed["bytes"] += size
+                        continue
+                    stat["bytes"] += size
+                    stat["entries"] += 1
+                    if a["jobs"]:
+                        job = jobs.setdefault(entry.name, {"parts": [], "bytes": 0, "last_used": 0.0})
+                        job["parts"].append((a["name"], entry.path, size))
+                        job["bytes"] += size
+                        job["last_used"] = max(job["last_used"], used)
+
+            total = sum(s["bytes"] for s in usage.values())
+            if self.max_bytes and total > self.max_bytes:
+                # 작업 단위로(모든 영역의 같은 job_id를 함께) 마지막 사용이 오래된 것부터
+                for job_id, job in sorted(jobs.items(), key=lambda kv: (kv[1]["last_used"], kv[0])):
+                    if total <= self.max_bytes:
+                        break
+                    for name, path, size in job["parts"]:
+                        _remove(path)
+                        usage[name]["bytes"] -= size
+                        usage[name]["entries"] -= 1
+                    total -= job["bytes"]
+                    removed["quota"] += 1
+                    removed["bytes"] += job["bytes"]
+
+            self.last = {
+                "areas": usage,
+                "total_bytes": total,
+                "max_bytes": self.max_bytes,
+                "pinned": len(pinned),
+                "removed": removed,
+                "swept_at": started,
+                "sweep_time": round(time.time() - started, 3),
+            }
+            if removed["ttl"] or removed["quota"]:
+                print(f"[정리] TTL 만료 {removed['ttl']}개, 용량 초과 작업 {removed['quota']}개 삭제 "
+                      f"({removed['bytes']} bytes), 사용량 {total} bytes")
+            return self.last
+
+    def start(self):
+        """여러 번 불려도 한 번만 시작. interval이 0이면 시작하지 않는다"""
+        with self._lock:
+            if self._started or not self.interval:
+                return
+            self._started = True
+        threading.Thread(target=self._loop, name="janitor", daemon=True).start()
+
+    def _loop(self):
+        while True:
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"[정리] 실패 → {e}")
+            time.sleep(self.interval)
+
+    def usage(self):
+        """마지막 정리 때의 영역별 사용량 + 디스크 여유 공간 (/health용)"""
+        report = dict(self.last) if self.last else {"areas": None}
+        disks = {}
+        for a in self.areas:
+            try:
+                du = shutil.disk_usage(a["path"])
+            except OSError:
+                continue
+            disks[a["name"]] = {"total": du.total, "used": du.used, "free": du.free}
+        report["disk"] = disks
+        return report
@@ -0,0 +1,282 @@
+# metrics.py
+# A/B 공용 메트릭 레지스트리와 작업별 단계 기록(span). 서비스 이름(메트릭 접두사)은 각 서비스의
+# metrics.py가 REGISTRY.configure()로 넘기고, 서비스 전용 메트릭도 거기서 등록한다
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterable, Optional
+
+# 1이면 단계(span)가 끝날 때마다 job_id/단계/소요 시간을 JSON 한 줄로 로그에 남긴다
+METRICS_LOG_SPANS = os.environ.get("METRICS_LOG_SPANS", "0").lower() in ("1", "true", "yes")
+
+# Prometheus 텍스트 형식 (/metrics 응답)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 초 단위 히스토그램 기본 구간 (ZIP 해제 ~ 수 분짜리 B 전송/LLM 생성까지)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}"
+
+def _num(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self, name):
+        """name: 접두사를 붙인 출력용 이름"""
+        lines = [f"# HELP {name} {self.help}", f"# TYPE {name} {self.kind}"]
+        lines.extend(self._samples(name))
+        return lines
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self, name):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+class Gauge(_Metric):
+    """set()으로 값을 넣거나, fn을 주면 출력할 때마다 fn()을 불러 값을 읽는다"""
+    kind = "gauge"
+
+    def __init__(self, name, help, labelnames=(), fn: Optional[Callable[[], float]] = None):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self, name):
+        if self.fn is not None:
+            try:
+                return [f"{name} {_num(self.fn())}"]
+            except Exception:
+                return []
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * len(self.buckets), 0.0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    def _samples(self, name):
+        with self._lock:
+            items = sorted((k, (list(c), s)) for k, (c, s) in self._values.items())
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = _labels(self.labelnames, key, ("le", _num(float(bound))))
+                lines.append(f"{name}_bucket{le} {cumulative}")
+            lines.append(f"{name}_sum{_labels(self.labelnames, key)} {_num(round(total, 6))}")
+            lines.append(f"{name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+class Registry:
+    """
+    프로세스 하나(= 서비스 하나)의 메트릭 목록. 이름에는 출력할 때 서비스 접두사(flask_a_, flask_b_)가 붙으므로
+    공용 메트릭을 import 시점에 등록해 두고 접두사는 나중에 configure()로 정해도 된다
+    """
+
+    def __init__(self, service: Optional[str] = None):
+        self.service = service
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def configure(self, service: str):
+        self.service = service
+
+    def _add(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=(), fn=None):
+        return self._add(Gauge(name, help, labelnames, fn))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        prefix = f"{self.service}_" if self.service else ""
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render(prefix + metric.name))
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+# ---- 공용 메트릭 ----
+STAGE_SECONDS = REGISTRY.histogram("stage_seconds", "Pipeline stage duration in seconds", ("stage",))
+STAGE_ERRORS = REGISTRY.counter("stage_errors_total", "Pipeline stages that raised", ("stage",))
+HTTP_REQUESTS = REGISTRY.counter("http_requests_total", "HTTP requests by endpoint and status",
+                                 ("endpoint", "method", "status"))
+HTTP_SECONDS = REGISTRY.histogram("http_request_seconds", "Time to produce response headers", ("endpoint",))
+HTTP_IN_FLIGHT = REGISTRY.gauge("http_requests_in_flight", "Requests currently being handled")
+
+EXTRACTED_BYTES = REGISTRY.counter("extracted_bytes_total", "Bytes written while extracting source ZIPs")
+EXTRACTED_FILES = REGISTRY.counter("extracted_files_total", "Files written while extracting source ZIPs")
+
+def record_extract(extract_stats):
+    if not extract_stats:
+        return
+    EXTRACTED_BYTES.inc(extract_stats.get("extracted_bytes", 0))
+    EXTRACTED_FILES.inc(extract_stats.get("extracted", 0))
+
+# ---- 작업별 단계 기록 (span) ----
+
+class Timeline:
+    """작업 하나의 단계별 시작 시점/소요 시간 (응답 JSON, Server-Timing 헤더, A의 timings.json용)"""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.started = time.monotonic()
+        self.stages = []
+        self._lock = threading.Lock()
+
+    def add(self, stage, started, seconds, error=None):
+        entry = {"stage": stage, "start": round(started - self.started, 4), "seconds": round(seconds, 4)}
+        if error:
+            entry["error"] = error
+        with self._lock:
+            self.stages.append(entry)
+
+    def as_dict(self):
+        with self._lock:
+            stages = list(self.stages)
+        return {"job_id": self.job_id, "total": round(time.monotonic() - self.started, 4), "stages": stages}
+
+    def server_timing(self, prefix=""):
+        """Server-Timing 헤더 값 (밀리초)"""
+        with self._lock:
+            stages = list(self.stages)
+        return ", ".join(f"{prefix}{s['stage']};dur={s['seconds'] * 1000:.1f}" for s in stages)
+
+def parse_server_timing(value):
+    """Server-Timing 헤더 → [{"stage", "seconds"}] (dur 없는 항목은 seconds=None)"""
+    stages = []
+    for entry in (value or "").split(","):
+        name, *params = [p.strip() for p in entry.split(";")]
+        if not name:
+            continue
+        seconds = None
+        for param in params:
+            key, _, val = param.partition("=")
+            if key == "dur":
+                try:
+                    seconds = round(float(val) / 1000, 4)
+                except ValueError:
+                    pass
+        stages.append({"stage": name, "seconds": seconds})
+    return stages
+
+_current = ContextVar("timeline", default=None)
+
+def current_timeline() -> Optional[Timeline]:
+    return _current.get()
+
+@contextmanager
+def job_timeline(job_id: str):
+    """with 블록 안의 span()이 이 작업의 Timeline에 기록된다. 같은 작업으로 중첩되면 바깥 것을 그대로 쓴다"""
+    timeline = _current.get()
+    if timeline is not None and timeline.job_id == job_id:
+        yield timeline
+        return
+    timeline = Timeline(job_id)
+    token = _current.set(timeline)
+    try:
+        yield timeline
+    finally:
+        _current.reset(token)
+
+@contextmanager
+def span(stage: str, timeline: Optional[Timeline] = None):
+    """
+    단계 하나의 소요 시간 → stage_seconds 히스토그램 + (있으면) 작업 Timeline.
+    timeline을 주지 않으면 job_timeline()으로 설정된 현재 작업을 쓴다 (제너레이터 안에서는 명시적으로 넘길 것)
+    """
+    timeline = timeline or _current.get()
+    started = time.monotonic()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        seconds = time.monotonic() - started
+        STAGE_SECONDS.observe(seconds, stage=stage)
+        if error:
+            STAGE_ERRORS.inc(stage=stage)
+        if timeline is not None:
+            timeline.add(stage, started, seconds, error)
+        if METRICS_LOG_SPANS:
+            record = {"service": REGISTRY.service, "job_id": timeline.job_id if timeline else None, "stage": stage,
+                      "seconds": round(seconds, 4)}
+            if error:
+                record["error"] = error
+            print("[span] " + json.dumps(record, ensure_ascii=False))
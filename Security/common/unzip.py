@@ -0,0 +1,118 @@
+# unzip.py
+# ZIP 해제 (zip bomb/경로 조작 방어, 필요한 엔트리만 스트리밍으로 기록).
+# 무엇을 풀지(keep)와 상위 폴더를 벗길지(strip_top)는 서비스가 넘긴다
+import os
+import zipfile
+
+# 압축 해제 제한: 파일 하나/전체 해제 크기, 압축률(zip bomb 방어)
+ZIP_MAX_FILE_BYTES = int(float(os.environ.get("ZIP_MAX_FILE_MB", "20")) * 1024 * 1024)
+ZIP_MAX_TOTAL_BYTES = int(float(os.environ.get("ZIP_MAX_TOTAL_MB", "2048")) * 1024 * 1024)
+ZIP_MAX_RATIO = float(os.environ.get("ZIP_MAX_RATIO", "200"))
+RATIO_CHECK_MIN_BYTES = 1024 * 1024  # 이보다 작은 파일은 압축률을 보지 않는다
+COPY_CHUNK = 1024 * 1024
+
+class UnsafeZipError(zipfile.BadZipFile):
+    """크기/압축률 제한 위반 또는 경로 조작 엔트리"""
+
+def safe_name(name):
+    """
+    ZIP 엔트리 이름 → 안전한 상대 경로('/' 구분). 절대 경로/드라이브/.. 포함이면 None
+    """
+    name = name.replace("\\", "/")
+    if name.startswith("/") or (len(name) > 1 and name[1] == ":"):
+        return None
+    parts = [p for p in name.split("/") if p not in ("", ".")]
+    if not parts or ".." in parts:
+        return None
+    return "/".join(parts)
+
+def top_level_dir(names):
+    """
+    모든 엔트리가 하나의 상위 폴더 아래에 있으면 그 폴더명 (필터 전 전체 목록 기준)
+    """
+    tops = {n.split("/", 1)[0] for n in names}
+    if len(tops) == 1 and any("/" in n for n in names):
+        return tops.pop()
+    return None
+
+def extract(zip_path, dest_dir, keep=None, strip_top=False):
+    """
+    중앙 디렉토리만 읽고 keep(rel_path)을 통과한 엔트리만 스트리밍으로 기록.
+    rel_path는 ZIP이 상위 폴더 하나로 감싸져 있으면 그 안을 기준으로 한 경로 (A의 issues.json path와 같은 기준).
+    strip_top=False: 상위 폴더째로 풀고 분석 루트를 그 폴더로 (A).
+    strip_top=True: 상위 폴더를 벗겨 dest_dir/<rel_path>에 기록 (B).
+    반환: (분석 루트, 통계)
+    """
+    stats = {
+        "entries": 0,
+        "extracted": 0,
+        "extracted_bytes": 0,
+        "skipped": 0,
+        "skipped_bytes": 0,
+        "too_large": 0,
+        "unsafe": 0,
+    }
+
+    with zipfile.ZipFile(zip_path, "r") as zip_ref:
+        infos = [i for i in zip_ref.infolist() if not i.is_dir()]
+        names = {}
+        for info in infos:
+            rel = safe_name(info.filename)
+            if rel is None:
+                stats["unsafe"] += 1
+                print(f"[경고] 위험한 ZIP 경로 무시: {info.filename}")
+                continue
+            names[info.filename] = rel
+        top = top_level_dir(list(names.values()))
+
+        for info in infos:
+            stats["entries"] += 1
+            rel = names.get(info.filename)
+            if rel is None:
+                continue
+
+            if rel == top:
+                # 상위 폴더와 이름이 같은 파일은 폴더와 함께 풀 수 없다
+                stats["skipped"] += 1
+                stats["skipped_bytes"] += info.file_size
+                print(f"[경고] 상위 폴더와 이름이 같은 ZIP 엔트리 무시: {info.filename}")
+                continue
+            scoped = rel.split("/", 1)[1] if top else rel
+            if keep is not None and not keep(scoped):
+                stats["skipped"] += 1
+                stats["skipped_bytes"] += info.file_size
+                continue
+            if info.file_size > ZIP_MAX_FILE_BYTES:
+                stats["too_large"] += 1
+                stats["skipped"] += 1
+                stats["skipped_bytes"] += info.file_size
+                continue
+            if (info.file_size >= RATIO_CHECK_MIN_BYTES
+                    and info.file_size > ZIP_MAX_RATIO * max(info.compress_size, 1)):
+                raise UnsafeZipError(f"compression ratio too high: {info.filename}")
+            if stats["extracted_bytes"] + info.file_size > ZIP_MAX_TOTAL_BYTES:
+                raise UnsafeZipError("archive exceeds total extraction limit")
+
+            dst = os.path.join(dest_dir, *(scoped if strip_top else rel).split("/"))
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            written = 0
+            with zip_ref.open(info) as src, open(dst, "wb") as out:
+                while True:
+                    chunk = src.read(COPY_CHUNK)
+                    if not chunk:
+                        break
+                    written += len(chunk)
+                    # 헤더의 크기를 믿지 않고 실제로 풀린 바이트로 다시 확인
+                    if written > info.file_size or written > ZIP_MAX_FILE_BYTES:
+                        out.close()
+                        os.remove(dst)
+                        raise UnsafeZipError(f"entry larger than declared: {info.filename}")
+                    out.write(chunk)
+            stats["extracted"] += 1
+            stats["extracted_bytes"] += written
+
+    if top is not None and not strip_top and os.path.isdir(os.path.join(dest_dir, top)):
+        print("[자동 진입] →", os.path.join(dest_dir, top))
+        dest_dir = os.path.join(dest_dir, top)
+
+    return dest_dir, stats